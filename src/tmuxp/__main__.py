@@ -0,0 +1,5 @@
+"""Run tmuxp with ``python -m tmuxp``."""
+from .cli import cli
+
+if __name__ == "__main__":
+    cli()
@@ -1,10 +1,27 @@
-"""Configuration parser for YAML and JSON files."""
+"""Configuration parser for YAML and JSON files.
+
+YAML and JSON are read and written by the fastest backend available: libyaml's C
+loader and dumper if PyYAML was built with it, and :mod:`orjson` if it's
+installed. Otherwise, and for data the fast backends can't handle or would write
+differently, the pure Python ones are used.
+
+>>> [backend.name for backend in YAML_BACKENDS][-1]
+'pyyaml'
+>>> [backend.name for backend in JSON_BACKENDS][-1]
+'json'
+"""
 import json
 import pathlib
+import re
 import typing as t
 
 import yaml
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 if t.TYPE_CHECKING:
     from typing_extensions import TypeAlias
 
@@ -13,6 +30,112 @@ if t.TYPE_CHECKING:
     RawConfigData: TypeAlias = t.Dict[t.Any, t.Any]
 
 
+class Backend(t.NamedTuple):
+    """Parser and serializer of a format."""
+
+    name: str
+    #: Return data parsed from a string
+    load: t.Callable[[str], t.Any]
+    #: Return data serialized with an indent
+    dump: t.Callable[[t.Any, int], str]
+
+
+def _yaml_backend(name: str, loader: t.Type[t.Any], dumper: t.Type[t.Any]) -> Backend:
+    return Backend(
+        name=name,
+        load=lambda content: yaml.load(content, Loader=loader),
+        dump=lambda content, indent: yaml.dump(
+            content,
+            indent=indent,
+            default_flow_style=False,
+            Dumper=dumper,
+        ),
+    )
+
+
+#: Characters :func:`json.dumps` escapes differently from orjson, or at all
+_JSON_ESCAPED = re.compile(r"[^\x20-\x7e\n\r\t]")
+
+
+def _orjson_identical(content: t.Any) -> bool:
+    """Return True if orjson writes ``content`` the same as :func:`json.dumps`.
+
+    :func:`json.dumps` escapes non-ASCII characters, which orjson writes as is,
+    and the two format floats differently.
+
+    >>> _orjson_identical({"window_name": "editor", "panes": [None, True, 1]})
+    True
+    >>> _orjson_identical({"window_name": "café"})
+    False
+    >>> _orjson_identical({"sleep_before": 0.5})
+    False
+    """
+    stack = [content]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            for key in value:
+                if not isinstance(key, str) or _JSON_ESCAPED.search(key):
+                    return False
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+        elif isinstance(value, str):
+            if _JSON_ESCAPED.search(value):
+                return False
+        elif isinstance(value, int):
+            # orjson writes 64-bit integers only
+            if not -(2**63) <= value < 2**64:
+                return False
+        elif value is not None:
+            return False
+    return True
+
+
+def _orjson_dump(content: t.Any, indent: int) -> str:
+    # orjson only writes an indent of 2
+    if indent != 2 or not _orjson_identical(content):
+        return json.dumps(content, indent=indent)
+    return t.cast(str, orjson.dumps(content, option=orjson.OPT_INDENT_2).decode())
+
+
+#: YAML backends available, fastest first
+YAML_BACKENDS: t.List[Backend] = [
+    _yaml_backend("pyyaml", yaml.SafeLoader, yaml.SafeDumper),
+]
+if getattr(yaml, "__with_libyaml__", False):
+    YAML_BACKENDS.insert(
+        0, _yaml_backend("libyaml", yaml.CSafeLoader, yaml.CSafeDumper)
+    )
+
+#: JSON backends available, fastest first
+JSON_BACKENDS: t.List[Backend] = [
+    Backend(
+        name="json",
+        load=json.loads,
+        dump=lambda content, indent: json.dumps(content, indent=indent),
+    ),
+]
+if orjson is not None:
+    JSON_BACKENDS.insert(
+        0, Backend(name="orjson", load=orjson.loads, dump=_orjson_dump)
+    )
+
+
+def get_backend(format: "FormatLiteral") -> Backend:
+    """Return backend used for ``format``.
+
+    >>> get_backend("json").name in ["json", "orjson"]
+    True
+    """
+    if format == "yaml":
+        return YAML_BACKENDS[0]
+    elif format == "json":
+        return JSON_BACKENDS[0]
+    else:
+        raise NotImplementedError(f"{format} not supported in configuration")
+
+
 class ConfigReader:
     r"""Parse string data (YAML and JSON) into a dictionary.
 
@@ -36,18 +159,7 @@ class ConfigReader:
         >>> ConfigReader._load("yaml", 'session_name: my session')
         {'session_name': 'my session'}
         """
-        if format == "yaml":
-            return t.cast(
-                t.Dict[str, t.Any],
-                yaml.load(
-                    content,
-                    Loader=yaml.SafeLoader,
-                ),
-            )
-        elif format == "json":
-            return t.cast(t.Dict[str, t.Any], json.loads(content))
-        else:
-            raise NotImplementedError(f"{format} not supported in configuration")
+        return t.cast(t.Dict[str, t.Any], get_backend(format).load(content))
 
     @classmethod
     def load(cls, format: "FormatLiteral", content: str) -> "ConfigReader":
@@ -172,20 +284,7 @@ class ConfigReader:
         >>> ConfigReader._dump("json", { "session_name": "my session" })
         '{\n  "session_name": "my session"\n}'
         """
-        if format == "yaml":
-            return yaml.dump(
-                content,
-                indent=2,
-                default_flow_style=False,
-                Dumper=yaml.SafeDumper,
-            )
-        elif format == "json":
-            return json.dumps(
-                content,
-                indent=2,
-            )
-        else:
-            raise NotImplementedError(f"{format} not supported in config")
+        return get_backend(format).dump(content, 2)
 
     def dump(self, format: "FormatLiteral", indent: int = 2, **kwargs: t.Any) -> str:
         r"""Dump via ConfigReader instance.
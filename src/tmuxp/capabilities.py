@@ -0,0 +1,221 @@
+"""tmux version and feature checks, probed once per process.
+
+libtmux's :func:`~libtmux.common.has_gte_version` and friends run ``tmux -V``
+every time they are called. tmuxp checks versions for each session, window and
+pane it builds, so it reads them from a registry instead. The registry probes each
+tmux binary once, keyed by its path and modification time, so an upgraded tmux is
+probed again.
+
+With ``persist=True`` (used by the ``tmuxp`` command) probes are also saved in
+the cache directory (see :func:`get_cache_dir`), sparing the ``tmux -V`` of
+later runs.
+
+>>> capabilities = get_capabilities()
+>>> capabilities.has_gte_version("1.8")
+True
+
+>>> get_capabilities() is capabilities
+True
+"""
+
+import json
+import logging
+import os
+import pathlib
+import re
+import shutil
+import subprocess
+import sys
+import typing as t
+
+from libtmux import exc as libtmux_exc
+from libtmux._compat import LooseVersion
+from libtmux.common import TMUX_MAX_VERSION, TMUX_MIN_VERSION
+
+logger = logging.getLogger(__name__)
+
+#: tmux features tmuxp checks for, by the tmux version adding them
+FEATURES = {
+    # new-session -x / -y for the size of detached sessions
+    "new-session-size": "2.6",
+    # client-attached and client-session-changed hooks
+    "client-hooks": "2.6",
+    # new-window -e and split-window -e
+    "new-window-environment": "3.0",
+    # set-option -p, options of a single pane such as remain-on-exit
+    "pane-options": "3.0",
+    # attach-session -f no-output,ignore-size, for control mode clients
+    "attach-flags": "3.2",
+}
+
+#: File in the cache directory probes are persisted to
+CACHE_FILE = "capabilities.json"
+
+_registry: t.Dict[t.Tuple[str, int], "Capabilities"] = {}
+
+
+class Capabilities:
+    """Version and features of a tmux binary.
+
+    >>> capabilities = Capabilities("/usr/bin/tmux", "2.9")
+    >>> capabilities.supports("new-session-size")
+    True
+
+    >>> capabilities.supports("new-window-environment")
+    False
+    """
+
+    def __init__(self, tmux_bin: str, version: str) -> None:
+        self.tmux_bin = tmux_bin
+        self.version = LooseVersion(version)
+        self.features = {
+            feature: self.has_gte_version(min_version)
+            for feature, min_version in FEATURES.items()
+        }
+
+    def __repr__(self) -> str:
+        """Representation of :class:`Capabilities` object."""
+        return f"{self.__class__.__name__}({self.tmux_bin!r}, {str(self.version)!r})"
+
+    def supports(self, feature: str) -> bool:
+        """Return True if tmux has ``feature``, a key of :data:`FEATURES`."""
+        return self.features[feature]
+
+    def has_gte_version(self, min_version: str) -> bool:
+        """Return True if tmux version greater or equal to ``min_version``."""
+        return self.version >= LooseVersion(min_version)
+
+    def has_lt_version(self, max_version: str) -> bool:
+        """Return True if tmux version less than ``max_version``."""
+        return self.version < LooseVersion(max_version)
+
+    def has_minimum_version(self) -> bool:
+        """Raise :exc:`libtmux.exc.VersionTooLow` if tmux is too old for libtmux."""
+        if self.version < LooseVersion(TMUX_MIN_VERSION):
+            raise libtmux_exc.VersionTooLow(
+                "libtmux only supports tmux {} and greater. This system"
+                " has {} installed. Upgrade your tmux to use libtmux.".format(
+                    TMUX_MIN_VERSION, self.version
+                )
+            )
+        return True
+
+
+def get_cache_dir() -> pathlib.Path:
+    """Return tmuxp cache directory.
+
+    ``TMUXP_CACHEDIR`` environmental variable has precedence if set, then
+    ``$XDG_CACHE_HOME/tmuxp``, defaulting to ``~/.cache/tmuxp``.
+    """
+    if "TMUXP_CACHEDIR" in os.environ:
+        return pathlib.Path(os.environ["TMUXP_CACHEDIR"]).expanduser()
+    cache_home = os.environ.get("XDG_CACHE_HOME", "~/.cache")
+    return pathlib.Path(cache_home).expanduser() / "tmuxp"
+
+
+def parse_version(output: str) -> str:
+    """Return version from ``tmux -V`` output, the same as libtmux does.
+
+    >>> parse_version("tmux 3.3a")
+    '3.3'
+
+    >>> parse_version("tmux next-3.4")
+    '3.4'
+
+    >>> parse_version("tmux master")
+    '3.3-master'
+    """
+    version = output.split("tmux ")[1]
+    if version == "master":
+        return f"{TMUX_MAX_VERSION}-master"
+    return re.sub(r"[a-z-]", "", version)
+
+
+def _probe(tmux_bin: str) -> str:
+    proc = subprocess.run(
+        [tmux_bin, "-V"], capture_output=True, encoding="utf-8", check=False
+    )
+    stderr = proc.stderr.strip()
+    if stderr:
+        if stderr == "tmux: unknown option -- V":
+            if sys.platform.startswith("openbsd"):  # openbsd has no tmux -V
+                return f"{TMUX_MAX_VERSION}-openbsd"
+            raise libtmux_exc.LibTmuxException(
+                "libtmux supports tmux %s and greater. This system"
+                " is running tmux 1.3 or earlier." % TMUX_MIN_VERSION
+            )
+        raise libtmux_exc.VersionTooLow(stderr)
+    return parse_version(proc.stdout.strip())
+
+
+def _cache_key(tmux_bin: str, mtime: int) -> str:
+    return f"{tmux_bin}:{mtime}"
+
+
+def _read_cache() -> t.Dict[str, str]:
+    try:
+        cache = json.loads((get_cache_dir() / CACHE_FILE).read_text())
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def _write_cache(key: str, version: str) -> None:
+    tmux_bin = key.rsplit(":", 1)[0]
+    cache = {k: v for k, v in _read_cache().items() if k.rsplit(":", 1)[0] != tmux_bin}
+    cache[key] = version
+    cache_dir = get_cache_dir()
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        (cache_dir / CACHE_FILE).write_text(json.dumps(cache))
+    except OSError as e:
+        logger.debug(f"couldn't save tmux capabilities: {e}")
+
+
+def get_capabilities(
+    tmux_bin: t.Optional[str] = None, persist: bool = False
+) -> Capabilities:
+    """Return :class:`Capabilities` of ``tmux_bin``, the ``tmux`` in PATH by default.
+
+    Parameters
+    ----------
+    tmux_bin : str, optional
+        path of tmux binary
+    persist : bool
+        read and save probes in the cache directory
+
+    Raises
+    ------
+    :exc:`libtmux.exc.TmuxCommandNotFound`
+        if there's no tmux binary
+    """
+    if tmux_bin is None:
+        tmux_bin = shutil.which("tmux")
+        if tmux_bin is None:
+            raise libtmux_exc.TmuxCommandNotFound()
+    tmux_bin = os.path.realpath(tmux_bin)
+
+    try:
+        mtime = pathlib.Path(tmux_bin).stat().st_mtime_ns
+    except OSError as e:
+        raise libtmux_exc.TmuxCommandNotFound() from e
+
+    capabilities = _registry.get((tmux_bin, mtime))
+    if capabilities is not None:
+        return capabilities
+
+    key = _cache_key(tmux_bin, mtime)
+    version = _read_cache().get(key) if persist else None
+    if version is None:
+        version = _probe(tmux_bin)
+        logger.debug(f"probed {tmux_bin}: tmux {version}")
+        if persist:
+            _write_cache(key, version)
+
+    capabilities = _registry[(tmux_bin, mtime)] = Capabilities(tmux_bin, version)
+    return capabilities
+
+
+def clear() -> None:
+    """Forget probed tmux binaries, they are probed again when next needed."""
+    _registry.clear()
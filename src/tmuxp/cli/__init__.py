@@ -7,11 +7,11 @@ import sys
 import typing as t
 
 from libtmux.__about__ import __version__ as libtmux_version
-from libtmux.common import has_minimum_version
 from libtmux.exc import TmuxCommandNotFound
 
 from .. import exc
 from ..__about__ import __version__
+from ..capabilities import get_capabilities
 from ..log import setup_logger
 from .convert import command_convert, create_convert_subparser
 from .debug_info import command_debug_info, create_debug_info_subparser
@@ -24,6 +24,12 @@ from .import_config import (
 )
 from .load import CLILoadNamespace, command_load, create_load_subparser
 from .ls import command_ls, create_ls_subparser
+from .materialize import (
+    CLIMaterializeNamespace,
+    command_materialize,
+    create_materialize_subparser,
+)
+from .pool import CLIPoolNamespace, command_pool, create_pool_subparser
 from .shell import CLIShellNamespace, command_shell, create_shell_subparser
 from .utils import tmuxp_echo
 
@@ -34,7 +40,16 @@ if t.TYPE_CHECKING:
 
     CLIVerbosity: TypeAlias = t.Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
     CLISubparserName: TypeAlias = t.Literal[
-        "ls", "load", "freeze", "convert", "edit", "import", "shell", "debug-info"
+        "ls",
+        "load",
+        "pool",
+        "materialize",
+        "freeze",
+        "convert",
+        "edit",
+        "import",
+        "shell",
+        "debug-info",
     ]
     CLIImportSubparserName: TypeAlias = t.Literal["teamocil", "tmuxinator"]
 
@@ -59,6 +74,14 @@ def create_parser() -> argparse.ArgumentParser:
     subparsers = parser.add_subparsers(dest="subparser_name")
     load_parser = subparsers.add_parser("load", help="load tmuxp workspaces")
     create_load_subparser(load_parser)
+    pool_parser = subparsers.add_parser(
+        "pool", help="keep pre-built copies of workspaces for tmuxp load"
+    )
+    create_pool_subparser(pool_parser)
+    materialize_parser = subparsers.add_parser(
+        "materialize", help="build the panes of a lazy window, run by tmux hooks"
+    )
+    create_materialize_subparser(materialize_parser)
     shell_parser = subparsers.add_parser(
         "shell", help="launch python shell for tmux server, session, window and pane"
     )
@@ -112,7 +135,7 @@ def cli(_args: t.Optional[t.List[str]] = None) -> None:
     http://tmuxp.git-pull.com/
     """
     try:
-        has_minimum_version()
+        get_capabilities(persist=True).has_minimum_version()
     except TmuxCommandNotFound:
         tmuxp_echo("tmux not found. tmuxp requires you install tmux first.")
         sys.exit()
@@ -133,6 +156,16 @@ def cli(_args: t.Optional[t.List[str]] = None) -> None:
             args=CLILoadNamespace(**vars(args)),
             parser=parser,
         )
+    elif args.subparser_name == "pool":
+        command_pool(
+            args=CLIPoolNamespace(**vars(args)),
+            parser=parser,
+        )
+    elif args.subparser_name == "materialize":
+        command_materialize(
+            args=CLIMaterializeNamespace(**vars(args)),
+            parser=parser,
+        )
     elif args.subparser_name == "shell":
         command_shell(
             args=CLIShellNamespace(**vars(args)),
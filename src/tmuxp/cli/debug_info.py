@@ -9,9 +9,11 @@ import typing as t
 
 from colorama import Fore
 from libtmux.__about__ import __version__ as libtmux_version
-from libtmux.common import get_version, tmux_cmd
+from libtmux.common import tmux_cmd
 
 from ..__about__ import __version__
+from .._internal.config_reader import get_backend
+from ..capabilities import get_capabilities
 from .utils import tmuxp_echo
 
 tmuxp_path = pathlib.Path(__file__).parent.parent
@@ -64,12 +66,14 @@ def command_debug_info(
         output_break(),
         "python version: %s" % " ".join(sys.version.split("\n")),
         "system PATH: %s" % os.environ["PATH"],
-        "tmux version: %s" % get_version(),
+        "tmux version: %s" % get_capabilities().version,
         "libtmux version: %s" % libtmux_version,
         "tmuxp version: %s" % __version__,
         "tmux path: %s" % shutil.which("tmux"),
         "tmuxp path: %s" % tmuxp_path,
         "shell: %s" % os.environ["SHELL"],
+        "yaml backend: %s" % get_backend("yaml").name,
+        "json backend: %s" % get_backend("json").name,
         output_break(),
         "tmux sessions:\n%s" % format_tmux_resp(tmux_cmd("list-sessions")),
         "tmux windows:\n%s" % format_tmux_resp(tmux_cmd("list-windows")),
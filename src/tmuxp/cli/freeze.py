@@ -8,10 +8,12 @@ import typing as t
 from libtmux.server import Server
 
 from tmuxp._internal.config_reader import ConfigReader
+from tmuxp.control import ControlModeServer
 from tmuxp.exc import TmuxpException
 from tmuxp.workspace.finders import get_workspace_dir
 
 from .. import exc, util
+from ..snapshot import ServerSnapshot
 from ..workspace import freezer
 from .utils import prompt, prompt_choices, prompt_yes_no
 
@@ -27,6 +29,7 @@ class CLIFreezeNamespace(argparse.Namespace):
     session_name: str
     socket_name: t.Optional[str]
     socket_path: t.Optional[str]
+    control_mode: bool
     workspace_format: t.Optional["CLIOutputFormatLiteral"]
     save_to: t.Optional[str]
     answer_yes: t.Optional[bool]
@@ -50,6 +53,12 @@ def create_freeze_subparser(
     parser.add_argument(
         "-L", dest="socket_name", metavar="socket-name", help="pass-through for tmux -L"
     )
+    parser.add_argument(
+        "--control-mode",
+        dest="control_mode",
+        action="store_true",
+        help="send tmux commands over one control mode (tmux -C) connection",
+    )
     parser.add_argument(
         "-f",
         "--workspace-format",
@@ -96,13 +105,16 @@ def command_freeze(
     If SESSION_NAME is provided, snapshot that session. Otherwise, use the current
     session.
     """
-    server = Server(socket_name=args.socket_name, socket_path=args.socket_path)
+    server_cls: t.Type[Server] = ControlModeServer if args.control_mode else Server
+    server = server_cls(socket_name=args.socket_name, socket_path=args.socket_path)
+
+    snapshot = ServerSnapshot(server)
 
     try:
         if args.session_name:
-            session = server.sessions.get(session_name=args.session_name, default=None)
+            session = snapshot.session(session_name=args.session_name)
         else:
-            session = util.get_session(server)
+            session = util.get_session(server, snapshot=snapshot)
 
         if not session:
             raise exc.SessionNotFound()
@@ -110,7 +122,7 @@ def command_freeze(
         print(e)
         return
 
-    frozen_workspace = freezer.freeze(session)
+    frozen_workspace = freezer.freeze(session, snapshot=snapshot)
     workspace = freezer.inline(frozen_workspace)
     configparser = ConfigReader(workspace)
 
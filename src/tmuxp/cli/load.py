@@ -6,19 +6,24 @@ import os
 import pathlib
 import shutil
 import sys
+import threading
 import typing as t
+from concurrent.futures import ThreadPoolExecutor
 
-from libtmux.common import has_gte_version
-from libtmux.server import Server
 from libtmux.session import Session
 
 from tmuxp.types import StrPath
 
-from .. import exc, log, util
+from .. import exc, log, trace, util
 from .._internal import config_reader
-from ..workspace import loader
-from ..workspace.builder import WorkspaceBuilder
+from ..capabilities import get_capabilities
+from ..control import ControlModeServer
+from ..snapshot import ServerSnapshot
+from ..workspace import cache as workspace_cache, loader, pool
+from ..workspace.builder import LAZY_WINDOW_OPTION, WorkspaceBuilder
+from ..workspace.events import BuildEvent
 from ..workspace.finders import find_workspace_file, get_workspace_dir
+from ..workspace.planner import compile_workspace
 from .utils import prompt_choices, prompt_yes_no, style, tmuxp_echo
 
 if t.TYPE_CHECKING:
@@ -33,6 +38,11 @@ if t.TYPE_CHECKING:
         new_session_name: NotRequired[t.Optional[str]]
 
 
+#: Held while asking what to do with a session that failed to load, so
+#: sessions loaded in parallel (``--jobs``) don't prompt at the same time
+_prompt_lock = threading.Lock()
+
+
 class CLILoadNamespace(argparse.Namespace):
     """Typed :class:`argparse.Namespace` for tmuxp load command."""
 
@@ -45,6 +55,17 @@ class CLILoadNamespace(argparse.Namespace):
     append: t.Optional[bool]
     colors: t.Optional["CLIColorsLiteral"]
     log_file: t.Optional[str]
+    batch: bool
+    control_mode: bool
+    nonblocking_delays: bool
+    two_phase: bool
+    trace: t.Optional[str]
+    resume: bool
+    sync: bool
+    plan: bool
+    cache: bool
+    jobs: int
+    progress: bool
 
 
 def set_layout_hook(session: Session, hook_name: str) -> None:
@@ -81,7 +102,13 @@ def set_layout_hook(session: Session, hook_name: str) -> None:
     cmd = ["set-hook", "-t", session.id, hook_name]
     hook_cmd = []
     attached_window = session.attached_window
+    # lazy windows get their layout when they're built
+    lazy_windows = session.cmd(
+        "list-windows", "-F", f"#{{?{LAZY_WINDOW_OPTION},#{{window_id}},}}"
+    ).stdout
     for window in session.windows:
+        if window.window_id in lazy_windows:
+            continue
         # unfortunately, select-layout won't work unless
         # we've literally selected the window at least once
         # with the client
@@ -151,6 +178,51 @@ def load_plugins(session_config: t.Dict[str, t.Any]) -> t.List[t.Any]:
     return plugins
 
 
+def progress_printer(
+    session_config: t.Dict[str, t.Any], stream: t.Optional[t.TextIO] = None
+) -> t.Callable[[BuildEvent], None]:
+    r"""Return build event subscriber writing progress of the build to ``stream``.
+
+    ``stream`` is stderr by default.
+
+    >>> import io
+    >>> stream = io.StringIO()
+    >>> show = progress_printer(
+    ...     {"session_name": "dev", "windows": [{"panes": [{}, {}]}]}, stream
+    ... )
+    >>> show(BuildEvent("window_created", 0))
+    >>> show(BuildEvent("pane_created", 0))
+    >>> show(BuildEvent("build_finished", 0))
+    >>> stream.getvalue().split("\r")[-1].endswith(
+    ...     "dev: 1/1 windows, 1/2 panes, 0 commands\n"
+    ... )
+    True
+    """
+    windows = len(session_config["windows"])
+    panes = sum(len(window["panes"]) for window in session_config["windows"])
+    counts = {"window_created": 0, "pane_created": 0, "command_sent": 0}
+    out = stream if stream is not None else sys.stderr
+
+    def show(event: BuildEvent) -> None:
+        if event.kind in counts:
+            counts[event.kind] += 1
+        out.write(
+            "\r{} {}: {}/{} windows, {}/{} panes, {} commands{}".format(
+                style("[Building]", fg="green"),
+                session_config["session_name"],
+                counts["window_created"],
+                windows,
+                counts["pane_created"],
+                panes,
+                counts["command_sent"],
+                "\n" if event.kind == "build_finished" else "",
+            )
+        )
+        out.flush()
+
+    return show
+
+
 def _reattach(builder: WorkspaceBuilder) -> None:
     """
     Reattach session (depending on env being inside tmux already or not).
@@ -178,6 +250,8 @@ def _reattach(builder: WorkspaceBuilder) -> None:
         builder.session.switch_client()
 
     else:
+        # the trace ends when the client attaches, not when it detaches
+        trace.stop()
         builder.session.attach_session()
 
 
@@ -191,20 +265,21 @@ def _load_attached(builder: WorkspaceBuilder, detached: bool) -> None:
     detached : bool
     """
     builder.build()
+    builder.events.flush()
     assert builder.session is not None
 
     if "TMUX" in os.environ:  # tmuxp ran from inside tmux
         # unset TMUX, save it, e.g. '/tmp/tmux-1000/default,30668,0'
         tmux_env = os.environ.pop("TMUX")
 
-        if has_gte_version("2.6"):
+        if get_capabilities().supports("client-hooks"):
             set_layout_hook(builder.session, "client-session-changed")
 
         builder.session.switch_client()  # switch client to new session
 
         os.environ["TMUX"] = tmux_env  # set TMUX back again
     else:
-        if has_gte_version("2.6"):
+        if get_capabilities().supports("client-hooks"):
             # if attaching for first time
             set_layout_hook(builder.session, "client-attached")
 
@@ -212,6 +287,7 @@ def _load_attached(builder: WorkspaceBuilder, detached: bool) -> None:
             set_layout_hook(builder.session, "client-session-changed")
 
         if not detached:
+            trace.stop()
             builder.session.attach_session()
 
 
@@ -224,10 +300,11 @@ def _load_detached(builder: WorkspaceBuilder) -> None:
     builder: :class:`workspace.builder.WorkspaceBuilder`
     """
     builder.build()
+    builder.events.flush()
 
     assert builder.session is not None
 
-    if has_gte_version("2.6"):  # prepare for both cases
+    if get_capabilities().supports("client-hooks"):  # prepare for both cases
         set_layout_hook(builder.session, "client-attached")
         set_layout_hook(builder.session, "client-session-changed")
 
@@ -244,8 +321,9 @@ def _load_append_windows_to_current_session(builder: WorkspaceBuilder) -> None:
     """
     current_attached_session = builder.find_current_attached_session()
     builder.build(current_attached_session, append=True)
+    builder.events.flush()
     assert builder.session is not None
-    if has_gte_version("2.6"):  # prepare for both cases
+    if get_capabilities().supports("client-hooks"):  # prepare for both cases
         set_layout_hook(builder.session, "client-attached")
         set_layout_hook(builder.session, "client-session-changed")
 
@@ -274,6 +352,15 @@ def load_workspace(
     detached: bool = False,
     answer_yes: bool = False,
     append: bool = False,
+    batch: bool = False,
+    control_mode: bool = False,
+    nonblocking_delays: bool = False,
+    two_phase: bool = False,
+    sync: bool = False,
+    resume: bool = False,
+    plan: bool = False,
+    progress: bool = False,
+    cache: bool = False,
 ) -> t.Optional[Session]:
     """Entrypoint for ``tmuxp load``, load a tmuxp "workspace" session via config file.
 
@@ -298,16 +385,38 @@ def load_workspace(
     append : bool
        Assume current when given prompt to append windows in same session.
        Default False.
+    batch : bool
+       Send each window's tmux commands in one invocation. Default False.
+    control_mode : bool
+       Send tmux commands over one ``tmux -C`` connection. Default False.
+    nonblocking_delays : bool
+       Run each pane's delays without holding up other panes. Default False.
+    two_phase : bool
+       Create all windows and panes, then send their commands concurrently.
+       Default False.
+    sync : bool
+       If the session exists, create its missing windows and panes and set
+       changed options. Default False.
+    resume : bool
+       If the session exists and its build failed, continue the build from the
+       window that failed. Default False.
+    plan : bool
+       Print the build plan instead of loading the workspace. Default False.
+    progress : bool
+       Show progress of the build on stderr. Default False.
+    cache : bool
+       Reuse the expanded and trickled workspace of an earlier load of the same
+       file, see :mod:`tmuxp.workspace.cache`. Default False.
 
     Notes
     -----
     tmuxp will check and load a workspace file. The file will use ConfigReader
-    to load a JSON/YAML into a :py:obj:`dict`. Then :func:`loader.expand` and
-    :func:`loader.trickle` will be used to expand any shorthands, template
-    variables, or file paths relative to where the config/script is executed
-    from.
+    to load a JSON/YAML into a :py:obj:`dict`. Then :func:`loader.normalize`
+    will be used to expand any shorthands, template variables, or file paths
+    relative to where the config/script is executed from, and to trickle down
+    inherited values, in one pass.
 
-    :func:`loader.expand` accepts the directory of the config file, so the
+    :func:`loader.normalize` accepts the directory of the config file, so the
     user's workspace can resolve absolute paths relative to where the
     workspace file is. In otherwords, if a workspace file at */var/moo/hi.yaml*
     has *./* in its workspaces, we want to be sure any file path with *./* is
@@ -376,22 +485,39 @@ def load_workspace(
         + style(str(workspace_file), fg="blue", bold=True)
     )
 
-    # ConfigReader allows us to open a yaml or json file as a dict
-    raw_workspace = config_reader.ConfigReader._from_file(workspace_file) or {}
+    cached_workspace = None
+    if cache:
+        with trace.span("read cached workspace", path=str(workspace_file)):
+            key = workspace_cache.cache_key(workspace_file)
+            cached_workspace = workspace_cache.load(key)
 
-    # shapes workspaces relative to config / profile file location
-    expanded_workspace = loader.expand(
-        raw_workspace, cwd=os.path.dirname(workspace_file)
-    )
+    if cached_workspace is not None:
+        expanded_workspace = cached_workspace
+    else:
+        # ConfigReader allows us to open a yaml or json file as a dict
+        with trace.span("read workspace", path=str(workspace_file)):
+            raw_workspace = config_reader.ConfigReader._from_file(workspace_file) or {}
+
+        # shapes workspaces relative to config / profile file location and
+        # propagates workspace inheritance (e.g. session -> window, window -> pane)
+        with trace.span("normalize"):
+            expanded_workspace = loader.normalize(
+                raw_workspace, cwd=os.path.dirname(workspace_file)
+            )
+
+        if cache:
+            workspace_cache.store(key, expanded_workspace)
 
     # Overridden session name
     if new_session_name:
         expanded_workspace["session_name"] = new_session_name
 
-    # propagate workspace inheritance (e.g. session -> window, window -> pane)
-    expanded_workspace = loader.trickle(expanded_workspace)
+    if plan:
+        tmuxp_echo(str(compile_workspace(expanded_workspace)))
+        return None
 
-    t = Server(  # create tmux server object
+    server_cls = ControlModeServer if control_mode else trace.TracedServer
+    t = server_cls(  # create tmux server object
         socket_name=socket_name,
         socket_path=socket_path,
         config_file=tmux_config_file,
@@ -400,20 +526,60 @@ def load_workspace(
 
     shutil.which("tmux")  # raise exception if tmux not found
 
+    # take a pre-built copy kept by ``tmuxp pool``, if there is one (a single
+    # list-sessions when there is none)
+    claimed = None
+    if not append and "session_name" in expanded_workspace:
+        claimed = pool.claim(t, expanded_workspace)
+
     try:  # load WorkspaceBuilder object for tmuxp workspace / tmux server
+        with trace.span("load plugins"):
+            plugins = load_plugins(expanded_workspace)
         builder = WorkspaceBuilder(
             session_config=expanded_workspace,
-            plugins=load_plugins(expanded_workspace),
+            plugins=plugins,
             server=t,
+            batch=batch,
+            nonblocking_delays=nonblocking_delays,
+            two_phase=two_phase,
+            snapshot=ServerSnapshot(t),
         )
     except exc.EmptyWorkspaceException:
         tmuxp_echo("%s is empty or parsed no workspace data" % workspace_file)
         return None
 
+    if progress:
+        builder.events.subscribe(progress_printer(expanded_workspace))
+
     session_name = expanded_workspace["session_name"]
 
+    if claimed is not None:
+        tmuxp_echo(
+            style("[Pool] ", fg="green")
+            + f"Claimed pre-built {style(session_name, fg='green')}"
+        )
+        if not detached:
+            _reattach(builder)
+        return _setup_plugins(builder)
+
     # if the session already exists, prompt the user to attach
     if builder.session_exists(session_name) and not append:
+        if resume:
+            if builder.resume():
+                tmuxp_echo(f"Resumed {style(session_name, fg='green')}")
+            else:
+                tmuxp_echo(
+                    f"{style(session_name, fg='green')} has no failed build to resume"
+                )
+        elif sync:
+            changes = builder.sync()
+            tmuxp_echo(
+                "Synced {}: {} change{}".format(
+                    style(session_name, fg="green"),
+                    len(changes),
+                    "" if len(changes) == 1 else "s",
+                )
+            )
         if not detached and (
             answer_yes
             or prompt_yes_no(
@@ -462,23 +628,25 @@ def load_workspace(
     except exc.TmuxpException as e:
         import traceback
 
-        tmuxp_echo(traceback.format_exc())
-        tmuxp_echo(str(e))
+        with _prompt_lock:
+            tmuxp_echo(traceback.format_exc())
+            tmuxp_echo(str(e))
 
-        choice = prompt_choices(
-            "Error loading workspace. (k)ill, (a)ttach, (d)etach?",
-            choices=["k", "a", "d"],
-            default="k",
-        )
+            choice = prompt_choices(
+                "Error loading workspace. (k)ill, (a)ttach, (d)etach?",
+                choices=["k", "a", "d"],
+                default="k",
+            )
 
-        if choice == "k":
-            if builder.session is not None:
-                builder.session.kill_session()
-                tmuxp_echo("Session killed.")
-        elif choice == "a":
-            _reattach(builder)
-        else:
-            sys.exit()
+            if choice == "k":
+                if builder.session is not None:
+                    builder.session.kill_session()
+                    tmuxp_echo("Session killed.")
+            elif choice == "a":
+                _reattach(builder)
+            else:
+                tmuxp_echo("Continue building it with tmuxp load --resume")
+                sys.exit()
 
     return _setup_plugins(builder)
 
@@ -539,6 +707,88 @@ def create_load_subparser(parser: argparse.ArgumentParser) -> argparse.ArgumentP
         action="store_true",
         help="load workspace, appending windows to the current session",
     )
+    parser.add_argument(
+        "--batch",
+        dest="batch",
+        action="store_true",
+        help="send each window's tmux commands in a single tmux invocation",
+    )
+    parser.add_argument(
+        "--control-mode",
+        dest="control_mode",
+        action="store_true",
+        help="send tmux commands over one control mode (tmux -C) connection",
+    )
+    parser.add_argument(
+        "--nonblocking-delays",
+        dest="nonblocking_delays",
+        action="store_true",
+        help="run each pane's sleep_before, sleep_after and wait_for without "
+        "holding up the other panes",
+    )
+    parser.add_argument(
+        "--two-phase",
+        dest="two_phase",
+        action="store_true",
+        help="create all windows and panes first, then send the panes' commands "
+        "concurrently",
+    )
+    parser.add_argument(
+        "--sync",
+        dest="sync",
+        action="store_true",
+        help="if the session is running, only create its missing windows and panes "
+        "and set changed options",
+    )
+    parser.add_argument(
+        "--resume",
+        dest="resume",
+        action="store_true",
+        help="if the session's build failed, continue it from the window that "
+        "failed",
+    )
+    parser.add_argument(
+        "--plan",
+        dest="plan",
+        action="store_true",
+        help="print the tmux commands that would build the workspace, then exit",
+    )
+    parser.add_argument(
+        "--cache",
+        dest="cache",
+        action="store_true",
+        help="reuse the parsed and expanded workspace of an earlier load of the "
+        "same file, unless it or the environment variables it uses changed",
+    )
+    parser.add_argument(
+        "--progress",
+        dest="progress",
+        action="store_true",
+        default=False,
+        help="show the progress of the build on stderr",
+    )
+    parser.add_argument(
+        "--no-progress",
+        dest="progress",
+        action="store_false",
+        default=False,
+        help="don't show the progress of the build (default)",
+    )
+    trace_file = parser.add_argument(
+        "--trace",
+        dest="trace",
+        metavar="file_path",
+        help="write a Chrome trace (for Perfetto) of the load to file_path",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        metavar="N",
+        type=int,
+        default=1,
+        help="build up to N detached sessions at once when loading several files",
+    )
     colorsgroup = parser.add_mutually_exclusive_group()
 
     colorsgroup.add_argument(
@@ -571,6 +821,7 @@ def create_load_subparser(parser: argparse.ArgumentParser) -> argparse.ArgumentP
         workspace_files.complete = shtab.FILE  # type: ignore
         tmux_config_file.complete = shtab.FILE  # type: ignore
         log_file.complete = shtab.FILE  # type: ignore
+        trace_file.complete = shtab.FILE  # type: ignore
     except ImportError:
         pass
 
@@ -601,7 +852,7 @@ def command_load(
 
     If multiple WORKSPACE_FILEs are provided, workspaces will be created for all of
     them. The last one provided will be attached. The others will be created in
-    detached mode.
+    detached mode, up to ``--jobs`` of them at the same time.
     """
     util.oh_my_zsh_auto_title()
 
@@ -621,6 +872,15 @@ def command_load(
         "colors": args.colors,
         "detached": args.detached,
         "append": args.append,
+        "batch": args.batch,
+        "control_mode": args.control_mode,
+        "nonblocking_delays": args.nonblocking_delays,
+        "two_phase": args.two_phase,
+        "sync": args.sync,
+        "resume": args.resume,
+        "plan": args.plan,
+        "cache": args.cache,
+        "progress": args.progress,
     }
 
     if args.workspace_files is None or len(args.workspace_files) == 0:
@@ -630,25 +890,46 @@ def command_load(
         sys.exit()
         return
 
-    last_idx = len(args.workspace_files) - 1
-    original_detached_option = tmux_options.pop("detached")
-    original_new_session_name = tmux_options.pop("new_session_name")
-
-    for idx, workspace_file in enumerate(args.workspace_files):
-        workspace_file = find_workspace_file(
-            workspace_file, workspace_dir=get_workspace_dir()
-        )
-
-        detached = original_detached_option
-        new_session_name = original_new_session_name
-
-        if last_idx > 0 and idx < last_idx:
-            detached = True
-            new_session_name = None
+    if args.trace:
+        trace.start(args.trace)
+    try:
+        original_detached_option = tmux_options.pop("detached")
+        original_new_session_name = tmux_options.pop("new_session_name")
+
+        workspace_files = [
+            find_workspace_file(workspace_file, workspace_dir=get_workspace_dir())
+            for workspace_file in args.workspace_files
+        ]
+        *detached_files, last_file = workspace_files
+
+        if args.jobs > 1 and len(detached_files) > 1 and not args.plan:
+            with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+                futures = [
+                    executor.submit(
+                        load_workspace,
+                        workspace_file,
+                        detached=True,
+                        new_session_name=None,
+                        **tmux_options,
+                    )
+                    for workspace_file in detached_files
+                ]
+                for future in futures:
+                    future.result()
+        else:
+            for workspace_file in detached_files:
+                load_workspace(
+                    workspace_file,
+                    detached=True,
+                    new_session_name=None,
+                    **tmux_options,
+                )
 
         load_workspace(
-            workspace_file,
-            detached=detached,
-            new_session_name=new_session_name,
+            last_file,
+            detached=original_detached_option,
+            new_session_name=original_new_session_name,
             **tmux_options,
         )
+    finally:
+        trace.stop()
@@ -0,0 +1,79 @@
+"""CLI for ``tmuxp materialize`` subcommand."""
+import argparse
+import importlib
+import json
+import logging
+import typing as t
+
+from libtmux.server import Server
+
+from ..workspace.builder import LAZY_PLUGINS_OPTION, WorkspaceBuilder
+
+if t.TYPE_CHECKING:
+    from libtmux.session import Session
+
+logger = logging.getLogger(__name__)
+
+
+class CLIMaterializeNamespace(argparse.Namespace):
+    """Typed :class:`argparse.Namespace` for tmuxp materialize command."""
+
+    window_id: str
+    socket_name: t.Optional[str]
+    socket_path: t.Optional[str]
+
+
+def create_materialize_subparser(
+    parser: argparse.ArgumentParser,
+) -> argparse.ArgumentParser:
+    """Augment :class:`argparse.ArgumentParser` with ``materialize`` subcommand."""
+    parser.add_argument("window_id", metavar="window-id", help="e.g. @3")
+    parser.add_argument(
+        "-S", dest="socket_path", metavar="socket-path", help="pass-through for tmux -S"
+    )
+    parser.add_argument(
+        "-L", dest="socket_name", metavar="socket-name", help="pass-through for tmux -L"
+    )
+    return parser
+
+
+def load_session_plugins(session: "Session") -> t.List[t.Any]:
+    """Return plugins the workspace of ``session`` was loaded with.
+
+    Plugins that can't be loaded are logged and skipped, ``tmuxp materialize``
+    runs from a hook without a terminal to prompt in.
+    """
+    proc = session.cmd("show-options", "-qv", LAZY_PLUGINS_OPTION)
+    if not proc.stdout:
+        return []
+
+    plugins = []
+    for plugin in json.loads("\n".join(proc.stdout)):
+        module_name, _, plugin_name = plugin.rpartition(".")
+        try:
+            plugins.append(getattr(importlib.import_module(module_name), plugin_name)())
+        except Exception as e:
+            logger.warning(f"couldn't load plugin {plugin}: {e}")
+    return plugins
+
+
+def command_materialize(
+    args: CLIMaterializeNamespace,
+    parser: t.Optional[argparse.ArgumentParser] = None,
+) -> None:
+    """Entrypoint for ``tmuxp materialize``, build panes of a lazy window.
+
+    Run by the hook of sessions with lazy windows, when a window is selected.
+    """
+    server = Server(socket_name=args.socket_name, socket_path=args.socket_path)
+    window = server.windows.get(window_id=args.window_id, default=None)
+    if window is None:
+        logger.debug(f"window {args.window_id} not found")
+        return
+
+    builder = WorkspaceBuilder(
+        session_config={"session_name": window.session.session_name, "windows": []},
+        server=server,
+        plugins=load_session_plugins(window.session),
+    )
+    builder.materialize_window(window)
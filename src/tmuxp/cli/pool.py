@@ -0,0 +1,198 @@
+"""CLI for ``tmuxp pool`` subcommand."""
+import argparse
+import logging
+import os
+import pathlib
+import time
+import typing as t
+
+from libtmux.server import Server
+
+from .._internal import config_reader
+from ..capabilities import get_capabilities
+from ..workspace import loader
+from ..workspace.builder import WorkspaceBuilder
+from ..workspace.finders import find_workspace_file, get_workspace_dir
+from ..workspace.pool import (
+    SOURCE_OPTION,
+    pool_session_name,
+    pooled_sessions,
+    session_source,
+    workspace_digest,
+)
+from .load import load_plugins, set_layout_hook
+from .utils import style, tmuxp_echo
+
+logger = logging.getLogger(__name__)
+
+
+class CLIPoolNamespace(argparse.Namespace):
+    """Typed :class:`argparse.Namespace` for tmuxp pool command."""
+
+    workspace_files: t.List[str]
+    socket_name: t.Optional[str]
+    socket_path: t.Optional[str]
+    tmux_config_file: t.Optional[str]
+    size: int
+    interval: float
+    once: bool
+    kill: bool
+
+
+def create_pool_subparser(
+    parser: argparse.ArgumentParser,
+) -> argparse.ArgumentParser:
+    """Augment :class:`argparse.ArgumentParser` with ``pool`` subcommand."""
+    parser.add_argument(
+        "workspace_files",
+        metavar="workspace-file",
+        nargs="+",
+        help="filepath to session or filename of session in tmuxp workspace "
+        "directory",
+    )
+    parser.add_argument(
+        "-L",
+        dest="socket_name",
+        metavar="socket_name",
+        action="store",
+        help="passthru to tmux(1) -L",
+    )
+    parser.add_argument(
+        "-S",
+        dest="socket_path",
+        metavar="socket_path",
+        action="store",
+        help="passthru to tmux(1) -S",
+    )
+    parser.add_argument(
+        "-f",
+        dest="tmux_config_file",
+        metavar="tmux_config_file",
+        help="passthru to tmux(1) -f",
+    )
+    parser.add_argument(
+        "-n",
+        "--size",
+        dest="size",
+        metavar="N",
+        type=int,
+        default=1,
+        help="number of pre-built copies to keep of each workspace",
+    )
+    parser.add_argument(
+        "--interval",
+        dest="interval",
+        metavar="SECONDS",
+        type=float,
+        default=1.0,
+        help="seconds between checks for claimed copies to replace",
+    )
+    parser.add_argument(
+        "--once",
+        dest="once",
+        action="store_true",
+        help="fill the pool once and exit",
+    )
+    parser.add_argument(
+        "--kill",
+        dest="kill",
+        action="store_true",
+        help="kill the pooled copies of the workspaces and exit",
+    )
+    return parser
+
+
+def _expand_workspace_file(workspace_file: pathlib.Path) -> t.Dict[str, t.Any]:
+    raw_workspace = config_reader.ConfigReader._from_file(workspace_file) or {}
+    return loader.normalize(raw_workspace, cwd=os.path.dirname(workspace_file))
+
+
+def fill_pool(
+    server: Server,
+    workspace_file: pathlib.Path,
+    size: int,
+) -> int:
+    """Build copies of ``workspace_file`` until ``size`` of them are pooled.
+
+    Copies built from an older version of the file are killed. Returns the number
+    of copies built.
+    """
+    session_config = _expand_workspace_file(workspace_file)
+    digest = workspace_digest(session_config)
+    source = str(workspace_file)
+
+    for session in pooled_sessions(server):
+        assert session.session_name is not None
+        if session_source(session) == source and digest not in session.session_name:
+            logger.debug(f"killing stale pooled session {session.session_name}")
+            session.kill_session()
+
+    missing = max(0, size - len(pooled_sessions(server, digest)))
+    for _ in range(missing):
+        session_name = pool_session_name(digest)
+        builder = WorkspaceBuilder(
+            session_config={**session_config, "session_name": session_name},
+            plugins=load_plugins(session_config),
+            server=server,
+        )
+        try:
+            builder.build()
+        except Exception:
+            if server.has_session(session_name):
+                server.kill_session(session_name)
+            raise
+
+        builder.session.set_option(SOURCE_OPTION, source)
+        if get_capabilities().supports("client-hooks"):
+            set_layout_hook(builder.session, "client-attached")
+            set_layout_hook(builder.session, "client-session-changed")
+
+    return missing
+
+
+def command_pool(
+    args: CLIPoolNamespace,
+    parser: t.Optional[argparse.ArgumentParser] = None,
+) -> None:
+    """Entrypoint for ``tmuxp pool``, keep pre-built copies of workspaces.
+
+    ``tmuxp load`` claims a copy when loading one of the workspaces, the pool
+    builds a replacement within ``--interval`` seconds.
+    """
+    server = Server(
+        socket_name=args.socket_name,
+        socket_path=args.socket_path,
+        config_file=args.tmux_config_file,
+    )
+    workspace_files = [
+        pathlib.Path(find_workspace_file(f, workspace_dir=get_workspace_dir()))
+        for f in args.workspace_files
+    ]
+
+    if args.kill:
+        sources = {str(f) for f in workspace_files}
+        for session in pooled_sessions(server):
+            if session_source(session) in sources:
+                session.kill_session()
+        return
+
+    while True:
+        for workspace_file in workspace_files:
+            try:
+                built = fill_pool(server, workspace_file, args.size)
+            except Exception as e:
+                tmuxp_echo(
+                    style("[Pool] ", fg="red")
+                    + f"Couldn't build {workspace_file}: {style(str(e), fg='yellow')}"
+                )
+                if args.once:
+                    raise
+                continue
+            if built:
+                tmuxp_echo(
+                    style("[Pool] ", fg="green") + f"Built {built} of {workspace_file}"
+                )
+
+        if args.once:
+            return
+        time.sleep(args.interval)
@@ -8,6 +8,8 @@ from libtmux.server import Server
 
 from .. import util
 from .._compat import PY3, PYMINOR
+from ..control import ControlModeServer
+from ..snapshot import ServerSnapshot
 
 if t.TYPE_CHECKING:
     from typing_extensions import TypeAlias
@@ -24,6 +26,7 @@ class CLIShellNamespace(argparse.Namespace):
     session_name: str
     socket_name: t.Optional[str]
     socket_path: t.Optional[str]
+    control_mode: bool
     colors: t.Optional["CLIColorsLiteral"]
     log_file: t.Optional[str]
     window_name: t.Optional[str]
@@ -43,6 +46,12 @@ def create_shell_subparser(parser: argparse.ArgumentParser) -> argparse.Argument
     parser.add_argument(
         "-L", dest="socket_name", metavar="socket-name", help="pass-through for tmux -L"
     )
+    parser.add_argument(
+        "--control-mode",
+        dest="control_mode",
+        action="store_true",
+        help="send tmux commands over one control mode (tmux -C) connection",
+    )
     parser.add_argument(
         "-c",
         dest="command",
@@ -156,21 +165,29 @@ def command_shell(
         ):
             args.socket_path = str(env_socket_path)
 
-    server = Server(socket_name=args.socket_name, socket_path=args.socket_path)
+    server_cls: t.Type[Server] = ControlModeServer if args.control_mode else Server
+    server = server_cls(socket_name=args.socket_name, socket_path=args.socket_path)
 
     server.raise_if_dead()
 
-    current_pane = util.get_current_pane(server=server)
+    snapshot = ServerSnapshot(server)
+    current_pane = util.get_current_pane(server=server, snapshot=snapshot)
 
     session = util.get_session(
-        server=server, session_name=args.session_name, current_pane=current_pane
+        server=server,
+        session_name=args.session_name,
+        current_pane=current_pane,
+        snapshot=snapshot,
     )
 
     window = util.get_window(
-        session=session, window_name=args.window_name, current_pane=current_pane
+        session=session,
+        window_name=args.window_name,
+        current_pane=current_pane,
+        snapshot=snapshot,
     )
 
-    pane = util.get_pane(window=window, current_pane=current_pane)
+    pane = util.get_pane(window=window, current_pane=current_pane, snapshot=snapshot)
 
     if args.command is not None:
         exec(args.command)
@@ -0,0 +1,528 @@
+r"""Persistent tmux control mode (``tmux -C``) connection for tmuxp.
+
+Every :meth:`libtmux.Server.cmd` starts a new ``tmux(1)`` client process. A
+:class:`ControlModeServer` instead keeps one control mode client attached to the
+server and writes commands to it, reading each reply from its ``%begin`` /
+``%end`` block. Loading, freezing or inspecting a session then pays the client
+startup once rather than once per command.
+
+Commands fall back to a regular ``tmux`` process when no control client can be
+attached (e.g. before the server has any session, or with tmux older than 3.2),
+and for commands that act on the calling client or terminal, see
+:data:`SUBPROCESS_COMMANDS`. Sessions, windows and panes of a
+:class:`ControlModeServer` are :class:`ControlModeSession`,
+:class:`ControlModeWindow` and :class:`ControlModePane`, which list and refresh
+objects over the same connection. The control client attaches with ``no-output`` and
+``ignore-size``, so it doesn't change the size of the user's session or receive
+its output.
+"""
+
+import logging
+import re
+import shutil
+import subprocess
+import threading
+import typing as t
+import weakref
+
+from libtmux import exc as libtmux_exc, neo
+from libtmux._internal.query_list import QueryList
+from libtmux.common import tmux_cmd
+from libtmux.pane import Pane
+from libtmux.server import Server
+from libtmux.session import Session
+from libtmux.window import Window
+
+from . import trace
+from .capabilities import get_capabilities
+from .util import server_args
+from .workspace.batch import OBJ_FIELDS, format_fields, parse_fields
+
+logger = logging.getLogger(__name__)
+
+#: Commands always run in their own ``tmux`` process. They act on the client
+#: running them (attach, switch, detach), or depend on its environment and working
+#: directory (new-session).
+SUBPROCESS_COMMANDS = frozenset(
+    [
+        "new-session",
+        "new",
+        "attach-session",
+        "attach",
+        "a",
+        "switch-client",
+        "switchc",
+        "detach-client",
+        "detach",
+        "kill-server",
+        "start-server",
+        "start",
+    ]
+)
+
+#: Commands after which the control client is closed rather than kept attached
+#: alongside the user's own client.
+CLOSE_COMMANDS = frozenset(["attach-session", "attach", "a", "kill-server"])
+
+#: Printed after a chained command line, marks the end of its replies
+SENTINEL = "tmuxp-control-mode-sentinel"
+
+SAFE_WORD_RE = re.compile(r"[\w@:.,/+=-]+")
+
+ObjT = t.TypeVar("ObjT", bound=neo.Obj)
+
+
+def quote(arg: str) -> str:
+    r"""Return ``arg`` quoted for a tmux command line.
+
+    >>> quote("select-layout")
+    'select-layout'
+
+    >>> quote("echo '$HOME'")
+    "'echo '\\''$HOME'\\'''"
+
+    >>> quote("")
+    "''"
+    """
+    if SAFE_WORD_RE.fullmatch(arg):
+        return arg
+    return "'{}'".format(arg.replace("'", "'\\''").replace("\n", "'\"\\n\"'"))
+
+
+def command_line(args: t.Sequence[t.Any]) -> t.Tuple[int, str]:
+    r"""Return number of commands and tmux command line for ``tmux(1)`` arguments.
+
+    Separators follow tmux's own argument parsing: ``;`` (or an argument ending
+    with ``;``) ends a command, a trailing ``\;`` is a literal ``;``.
+
+    >>> command_line(["display-message", "-p", "hi"])
+    (1, 'display-message -p hi')
+
+    >>> command_line(["send-keys", "ls;", "send-keys", "echo\\;", "Enter"])
+    (2, "send-keys ls ; send-keys 'echo;' Enter")
+    """
+    commands: t.List[t.List[str]] = [[]]
+    for arg in map(str, args):
+        if arg.endswith(";") and not arg.endswith("\\;"):
+            if arg[:-1]:
+                commands[-1].append(arg[:-1])
+            commands.append([])
+            continue
+        if arg.endswith("\\;"):
+            arg = arg[:-2] + ";"
+        commands[-1].append(arg)
+
+    commands = [command for command in commands if command]
+    line = " ; ".join(" ".join(quote(arg) for arg in command) for command in commands)
+    return len(commands), line
+
+
+class ControlModeCmd(tmux_cmd):
+    """Result of a command sent over control mode, in the shape of :class:`tmux_cmd`."""
+
+    def __init__(
+        self,
+        cmd: t.List[str],
+        stdout: t.List[str],
+        stderr: t.List[str],
+    ) -> None:
+        self.cmd = cmd
+        self.returncode = 1 if stderr else 0
+
+        while stdout and stdout[-1] == "":
+            stdout.pop()
+        self.stderr = [line for line in stderr if line]
+
+        if "has-session" in cmd and self.stderr and not stdout:
+            self.stdout = [self.stderr[0]]
+        else:
+            self.stdout = stdout
+
+
+class ControlModeClient:
+    """A ``tmux -C`` client process commands are written to.
+
+    Connects lazily on the first :meth:`cmd`. Returns ``None`` if it can't connect,
+    callers then run the command in a regular ``tmux`` process.
+    """
+
+    def __init__(self, server_args: t.List[str]) -> None:
+        self.server_args = server_args
+        self.process: t.Optional["subprocess.Popen[str]"] = None
+        self._lock = threading.RLock()
+
+    @property
+    def connected(self) -> bool:
+        """Return True if the control client is running."""
+        return self.process is not None and self.process.poll() is None
+
+    def connect(self) -> bool:
+        """Attach a control mode client to the server, return True on success."""
+        if self.connected:
+            return True
+
+        tmux_bin = shutil.which("tmux")
+        if tmux_bin is None:
+            return False
+
+        # without these flags the control client would be one more client of the
+        # user's session, shrinking it to its size
+        if not get_capabilities().supports("attach-flags"):
+            return False
+        attach = ["attach-session", "-f", "no-output,ignore-size"]
+
+        self.process = subprocess.Popen(
+            [tmux_bin, *self.server_args, "-C", *attach],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            encoding="utf-8",
+            errors="backslashreplace",
+        )
+
+        # Reply to attach-session itself, fails if the server has no sessions
+        reply = self._read_block()
+        if reply is None or reply[1]:
+            logger.debug("tmux control mode unavailable: %s", reply)
+            self.close()
+            return False
+
+        logger.debug("tmux control mode client started")
+        return True
+
+    def close(self) -> None:
+        """Detach the control mode client."""
+        with self._lock:
+            process, self.process = self.process, None
+            if process is None:
+                return
+            try:
+                if process.stdin is not None:
+                    process.stdin.close()
+                process.wait(timeout=1)
+            except (OSError, subprocess.TimeoutExpired):
+                process.kill()
+                process.wait()
+            if process.stdout is not None:
+                process.stdout.close()
+
+    def cmd(self, *args: t.Any) -> t.Optional[ControlModeCmd]:
+        """Run a command over control mode, return ``None`` if unavailable."""
+        argv = [str(arg) for arg in args]
+        with trace.span(
+            argv[0] if argv else "tmux", cat="tmux-control", argv=argv
+        ) as span_args:
+            proc = self._cmd(*args)
+            span_args["returncode"] = proc.returncode if proc is not None else None
+        return proc
+
+    def _cmd(self, *args: t.Any) -> t.Optional[ControlModeCmd]:
+        with self._lock:
+            if not self.connect():
+                return None
+
+            count, line = command_line(args)
+            if count == 0:
+                return None
+            if count > 1:
+                # A failing command skips the rest of the line, so mark its end
+                line += f"\ndisplay-message -p {SENTINEL}"
+
+            assert self.process is not None
+            assert self.process.stdin is not None
+            try:
+                self.process.stdin.write(line + "\n")
+                self.process.stdin.flush()
+            except OSError:
+                self.close()
+                return None
+
+            stdout: t.List[str] = []
+            stderr: t.List[str] = []
+            while True:
+                reply = self._read_block()
+                if reply is None:
+                    # e.g. the attached session was killed
+                    self.close()
+                    break
+
+                lines, error = reply
+                if count > 1 and lines == [SENTINEL] and not error:
+                    break
+                (stderr if error else stdout).extend(lines)
+                if count == 1:
+                    break
+
+            return ControlModeCmd(["tmux", *self.server_args, *args], stdout, stderr)
+
+    def _read_block(self) -> t.Optional[t.Tuple[t.List[str], bool]]:
+        """Return lines of the next reply and whether it is an error."""
+        assert self.process is not None
+        assert self.process.stdout is not None
+
+        begin: t.Optional[t.List[str]] = None
+        lines: t.List[str] = []
+        for line in self.process.stdout:
+            line = line.rstrip("\n")
+            if begin is None:
+                # Notifications (%output, %window-add, ...) come between replies
+                if line.startswith("%begin "):
+                    begin = line.split(" ")[1:3]
+                continue
+            if line.startswith(("%end ", "%error ")) and line.split(" ")[1:3] == begin:
+                return lines, line.startswith("%error ")
+            lines.append(line)
+        return None
+
+
+def fetch_objs(
+    server: Server,
+    list_cmd: "neo.ListCmd",
+    list_extra_args: "t.Optional[neo.ListExtraArgs]" = None,
+) -> "neo.OutputsRaw":
+    """List objects like :func:`libtmux.neo.fetch_objs`.
+
+    Objects of an open :class:`ControlModeServer` are listed over its control
+    client, those of other servers with :func:`libtmux.neo.fetch_objs`.
+    """
+    if isinstance(server, ControlModeServer) and not server.closed:
+        proc = server.control.cmd(
+            list_cmd, *(list_extra_args or ()), "-F", format_fields(OBJ_FIELDS)
+        )
+        if proc is not None:
+            if proc.stderr:
+                raise libtmux_exc.LibTmuxException(proc.stderr)
+            return [parse_fields(OBJ_FIELDS, line) for line in proc.stdout]
+    return neo.fetch_objs(server, list_cmd, list_extra_args)
+
+
+def fetch_obj(
+    server: Server,
+    obj_key: str,
+    obj_id: str,
+    list_cmd: "neo.ListCmd" = "list-panes",
+    list_extra_args: "t.Optional[neo.ListExtraArgs]" = None,
+) -> "neo.OutputRaw":
+    """Return object ``obj_id`` like :func:`libtmux.neo.fetch_obj`."""
+    for obj in fetch_objs(server, list_cmd, list_extra_args):
+        if obj.get(obj_key) == obj_id:
+            return obj
+    raise libtmux_exc.TmuxObjectDoesNotExist(
+        obj_key=obj_key,
+        obj_id=obj_id,
+        list_cmd=list_cmd,
+        list_extra_args=list_extra_args,
+    )
+
+
+def _update(obj: neo.Obj, fields: "neo.OutputRaw") -> None:
+    for key, value in fields.items():
+        setattr(obj, key, value)
+
+
+def _as(cls: t.Type[ObjT], obj: neo.Obj) -> ObjT:
+    """Return copy of libtmux object ``obj`` as control mode class ``cls``."""
+    return cls(**{field: getattr(obj, field) for field in obj.__dataclass_fields__})
+
+
+class ControlModeSession(Session):
+    """:class:`libtmux.Session` listing its windows and panes over control mode."""
+
+    def refresh(self) -> None:
+        """Refresh session attributes from tmux."""
+        assert isinstance(self.session_id, str)
+        _update(
+            self, fetch_obj(self.server, "session_id", self.session_id, "list-sessions")
+        )
+
+    @classmethod
+    def from_session_id(cls, server: Server, session_id: str) -> "ControlModeSession":
+        """Create session from existing ``session_id``."""
+        return cls(
+            server=server,
+            **fetch_obj(server, "session_id", session_id, "list-sessions"),
+        )
+
+    @property
+    def windows(self) -> QueryList[Window]:  # type:ignore
+        """Windows belonging to the session."""
+        return QueryList(
+            [
+                ControlModeWindow(server=self.server, **obj)
+                for obj in fetch_objs(
+                    self.server, "list-windows", ["-t", str(self.session_id)]
+                )
+                if obj.get("session_id") == self.session_id
+            ]
+        )
+
+    @property
+    def panes(self) -> QueryList[Pane]:  # type:ignore
+        """Panes belonging to the session."""
+        return QueryList(
+            [
+                ControlModePane(server=self.server, **obj)
+                for obj in fetch_objs(
+                    self.server, "list-panes", ["-s", "-t", str(self.session_id)]
+                )
+                if obj.get("session_id") == self.session_id
+            ]
+        )
+
+    def new_window(self, *args: t.Any, **kwargs: t.Any) -> Window:
+        """Create window, see :meth:`libtmux.Session.new_window`."""
+        return _as(ControlModeWindow, super().new_window(*args, **kwargs))
+
+
+class ControlModeWindow(Window):
+    """:class:`libtmux.Window` listing its session and panes over control mode."""
+
+    def refresh(self) -> None:
+        """Refresh window attributes from tmux."""
+        assert isinstance(self.window_id, str)
+        _update(
+            self, fetch_obj(self.server, "window_id", self.window_id, "list-windows")
+        )
+
+    @classmethod
+    def from_window_id(cls, server: Server, window_id: str) -> "ControlModeWindow":
+        """Create window from existing ``window_id``."""
+        return cls(
+            server=server,
+            **fetch_obj(server, "window_id", window_id, "list-windows", ("-a",)),
+        )
+
+    @property
+    def session(self) -> Session:
+        """Parent session of the window."""
+        assert isinstance(self.session_id, str)
+        return ControlModeSession.from_session_id(self.server, self.session_id)
+
+    @property
+    def panes(self) -> QueryList[Pane]:  # type:ignore
+        """Panes belonging to the window."""
+        return QueryList(
+            [
+                ControlModePane(server=self.server, **obj)
+                for obj in fetch_objs(
+                    self.server, "list-panes", ["-t", str(self.window_id)]
+                )
+                if obj.get("window_id") == self.window_id
+            ]
+        )
+
+    def split_window(self, *args: t.Any, **kwargs: t.Any) -> Pane:
+        """Split window, see :meth:`libtmux.Window.split_window`."""
+        return _as(ControlModePane, super().split_window(*args, **kwargs))
+
+
+class ControlModePane(Pane):
+    """:class:`libtmux.Pane` listing its window over control mode."""
+
+    def refresh(self) -> None:
+        """Refresh pane attributes from tmux."""
+        assert isinstance(self.pane_id, str)
+        _update(
+            self, fetch_obj(self.server, "pane_id", self.pane_id, "list-panes", ("-a",))
+        )
+
+    @classmethod
+    def from_pane_id(cls, server: Server, pane_id: str) -> "ControlModePane":
+        """Create pane from existing ``pane_id``."""
+        return cls(
+            server=server,
+            **fetch_obj(server, "pane_id", pane_id, "list-panes", ("-a",)),
+        )
+
+    @property
+    def window(self) -> Window:
+        """Parent window of the pane."""
+        assert isinstance(self.window_id, str)
+        return ControlModeWindow.from_window_id(self.server, self.window_id)
+
+
+class ControlModeServer(trace.TracedServer):
+    """:class:`libtmux.Server` sending commands over one ``tmux -C`` connection.
+
+    Examples
+    --------
+    >>> control_server = ControlModeServer(socket_name=server.socket_name)
+    >>> control_server.cmd("display-message", "-p", "hi").stdout
+    ['hi']
+
+    >>> control_server.control.connected
+    True
+
+    Listing objects of this server goes over the same connection:
+
+    >>> control_server.sessions[0] == session
+    True
+
+    >>> control_server.sessions[0].windows[0].panes[0]
+    ControlModePane(...)
+
+    >>> control_server.close()
+    """
+
+    def __init__(self, *args: t.Any, **kwargs: t.Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.control = ControlModeClient(server_args(self))
+        self._finalizer = weakref.finalize(self, self.control.close)
+
+    @property
+    def closed(self) -> bool:
+        """Return True once :meth:`close` was called."""
+        return not self._finalizer.alive
+
+    def cmd(self, *args: t.Any, **kwargs: t.Any) -> tmux_cmd:
+        """Run tmux command over control mode, see :meth:`libtmux.Server.cmd`."""
+        cmd = str(args[0]) if args else ""
+        if cmd in CLOSE_COMMANDS:
+            self.control.close()
+        if cmd not in SUBPROCESS_COMMANDS and not kwargs and not self.closed:
+            proc = self.control.cmd(*args)
+            if proc is not None:
+                return proc
+        return super().cmd(*args, **kwargs)
+
+    def close(self) -> None:
+        """Detach the control mode client, commands go back to ``tmux`` processes."""
+        self._finalizer()
+
+    @property
+    def sessions(self) -> QueryList[Session]:  # type:ignore
+        """Sessions belonging to the server."""
+        try:
+            return QueryList(
+                [
+                    ControlModeSession(server=self, **obj)
+                    for obj in fetch_objs(self, "list-sessions")
+                ]
+            )
+        except Exception:
+            # like libtmux, e.g. when no server is running
+            return QueryList([])
+
+    @property
+    def windows(self) -> QueryList[Window]:  # type:ignore
+        """Windows belonging to the server."""
+        return QueryList(
+            [
+                ControlModeWindow(server=self, **obj)
+                for obj in fetch_objs(self, "list-windows", ("-a",))
+            ]
+        )
+
+    @property
+    def panes(self) -> QueryList[Pane]:  # type:ignore
+        """Panes belonging to the server."""
+        return QueryList(
+            [
+                ControlModePane(server=self, **obj)
+                for obj in fetch_objs(self, "list-panes", ["-s"])
+            ]
+        )
+
+    def new_session(self, *args: t.Any, **kwargs: t.Any) -> Session:
+        """Create session, see :meth:`libtmux.Server.new_session`."""
+        return _as(ControlModeSession, super().new_session(*args, **kwargs))
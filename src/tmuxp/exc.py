@@ -2,6 +2,7 @@
 import typing as t
 
 from libtmux._internal.query_list import ObjectDoesNotExist
+from libtmux.exc import LibTmuxException
 
 from ._compat import implements_to_string
 
@@ -89,6 +90,50 @@ class ActiveSessionMissingWorkspaceException(WorkspaceError):
         return super().__init__("No session active.", *args, **kwargs)
 
 
+class TmuxCommandBatchError(TmuxpException, LibTmuxException):
+    """Batched tmux command invocation returned an error."""
+
+    def __init__(
+        self,
+        stderr: t.List[str],
+        commands: t.List[t.List[str]],
+        *args: object,
+        **kwargs: object,
+    ) -> None:
+        self.stderr = stderr
+        self.commands = commands
+        return super().__init__(
+            "tmux error in batch of {} commands: {}".format(
+                len(commands), "\n".join(stderr)
+            ),
+            *args,
+            **kwargs,
+        )
+
+
+class WaitForTimeout(TmuxpException):
+    """Pane wasn't ready within the timeout of its ``wait_for`` condition."""
+
+    def __init__(self, target: str, condition: str, *args: object) -> None:
+        self.target = target
+        self.condition = condition
+        return super().__init__(
+            f"Timed out waiting for pane {target}: {condition}", *args
+        )
+
+
+class UnsupportedWorkspaceFeature(WorkspaceError):
+    """Builder can't build features the workspace uses."""
+
+    def __init__(
+        self, builder: str, features: t.List[str], *args: object, **kwargs: object
+    ) -> None:
+        self.features = features
+        return super().__init__(
+            f"{builder} can't build {', '.join(features)}", *args, **kwargs
+        )
+
+
 class TmuxpPluginException(TmuxpException):
     """Base Exception for Tmuxp Errors."""
 
@@ -126,3 +171,12 @@ class BeforeLoadScriptError(Exception):
     def __str__(self) -> str:
         """Return shell error message."""
         return self.message
+
+
+class WindowTooSmall(TmuxpException):
+    """Window is too small for the panes of a layout."""
+
+    def __init__(self, panes: int, size: int, *args: object, **kwargs: object) -> None:
+        return super().__init__(
+            f"{panes} panes don't fit in {size} lines or columns", *args, **kwargs
+        )
@@ -3,9 +3,9 @@ import typing as t
 
 import libtmux
 from libtmux._compat import LegacyVersion as Version
-from libtmux.common import get_version
 
 from .__about__ import __version__
+from .capabilities import get_capabilities
 from .exc import TmuxpPluginException
 
 #: Minimum version of tmux required to run libtmux
@@ -146,7 +146,7 @@ class TmuxpPlugin:
         self.plugin_name = config["plugin_name"]
 
         # Dependency versions
-        self.tmux_version = get_version()
+        self.tmux_version = get_capabilities().version
         self.libtmux_version = libtmux.__about__.__version__
         self.tmuxp_version = Version(__version__)
 
@@ -0,0 +1,158 @@
+"""Snapshot of a tmux server's sessions, windows and panes, listed once.
+
+libtmux lists objects again each time ``server.sessions``, ``session.windows`` or
+``window.panes`` is read, and :meth:`libtmux.Server.has_session` is another
+query. On servers with many panes, looking up the current pane, then its session
+and window repeats the same listing.
+
+:class:`ServerSnapshot` lists all panes with one ``list-panes -a`` query, which
+includes the fields of their windows and sessions, and indexes them by id and
+name. It's kept until :meth:`ServerSnapshot.invalidate` is called, e.g. after
+building a session.
+"""
+
+import logging
+import os
+import typing as t
+
+from libtmux import exc
+from libtmux._internal.query_list import QueryList
+from libtmux.pane import Pane
+from libtmux.session import Session
+from libtmux.window import Window
+
+from .control import fetch_objs
+
+if t.TYPE_CHECKING:
+    from libtmux.server import Server
+
+logger = logging.getLogger(__name__)
+
+
+class ServerSnapshot:
+    """Sessions, windows and panes of ``server``, fetched on first use.
+
+    Examples
+    --------
+    >>> snapshot = ServerSnapshot(server)
+    >>> snapshot.session(session_name=session.session_name) == session
+    True
+
+    >>> window = snapshot.windows_of(session)[0]
+    >>> [pane.pane_id for pane in snapshot.panes_of(window)] == [
+    ...     pane.pane_id for pane in window.panes
+    ... ]
+    True
+
+    >>> snapshot.queries
+    1
+
+    Changes to the server show once the snapshot is invalidated:
+
+    >>> _ = session.new_window(window_name="added")
+    >>> len(snapshot.windows_of(session)) == len(session.windows) - 1
+    True
+
+    >>> snapshot.invalidate()
+    >>> len(snapshot.windows_of(session)) == len(session.windows)
+    True
+    """
+
+    def __init__(self, server: "Server") -> None:
+        self.server = server
+        #: Number of ``list-panes`` queries made
+        self.queries = 0
+        self._rows: t.Optional[t.List[t.Dict[str, t.Any]]] = None
+        self._sessions: t.Dict[str, Session] = {}
+        self._windows: t.Dict[str, Window] = {}
+        self._panes: t.Dict[str, Pane] = {}
+
+    def invalidate(self) -> None:
+        """Forget the listing, the server is listed again when next needed."""
+        self._rows = None
+
+    def _fetch(self) -> None:
+        if self._rows is not None:
+            return
+
+        self.queries += 1
+        try:
+            self._rows = fetch_objs(self.server, "list-panes", ["-a"])
+        except exc.LibTmuxException as e:
+            # no server running
+            logger.debug(f"no panes listed: {e}")
+            self._rows = []
+
+        # listed in order: sessions, their windows by index, then panes by index.
+        # Sessions and windows get the fields of their active pane.
+        self._sessions, self._windows, self._panes = {}, {}, {}
+        for row in self._rows:
+            self._panes[row["pane_id"]] = Pane(server=self.server, **row)
+            active = row.get("pane_active") == "1"
+            if row["window_id"] not in self._windows or active:
+                self._windows[row["window_id"]] = Window(server=self.server, **row)
+            if row["session_id"] not in self._sessions or (
+                active and row.get("window_active") == "1"
+            ):
+                self._sessions[row["session_id"]] = Session(server=self.server, **row)
+
+    @property
+    def sessions(self) -> QueryList[Session]:  # type:ignore
+        """Return sessions of the server."""
+        self._fetch()
+        return QueryList(list(self._sessions.values()))
+
+    @property
+    def windows(self) -> QueryList[Window]:  # type:ignore
+        """Return windows of all sessions."""
+        self._fetch()
+        return QueryList(list(self._windows.values()))
+
+    @property
+    def panes(self) -> QueryList[Pane]:  # type:ignore
+        """Return panes of all windows."""
+        self._fetch()
+        return QueryList(list(self._panes.values()))
+
+    def session(
+        self,
+        session_id: t.Optional[str] = None,
+        session_name: t.Optional[str] = None,
+    ) -> t.Optional[Session]:
+        """Return session by id or name, None if it doesn't exist."""
+        self._fetch()
+        if session_id is not None:
+            return self._sessions.get(session_id)
+        return next(
+            (s for s in self.sessions if s.session_name == session_name),
+            None,
+        )
+
+    def has_session(self, session_name: str) -> bool:
+        """Return True if session ``session_name`` exists."""
+        return self.session(session_name=session_name) is not None
+
+    def window(self, window_id: str) -> t.Optional[Window]:
+        """Return window by id, None if it doesn't exist."""
+        self._fetch()
+        return self._windows.get(window_id)
+
+    def pane(self, pane_id: str) -> t.Optional[Pane]:
+        """Return pane by id, None if it doesn't exist."""
+        self._fetch()
+        return self._panes.get(pane_id)
+
+    def windows_of(self, session: Session) -> QueryList[Window]:  # type:ignore
+        """Return windows of ``session``, by index."""
+        return QueryList(
+            [w for w in self.windows if w.session_id == session.session_id]
+        )
+
+    def panes_of(self, window: Window) -> QueryList[Pane]:  # type:ignore
+        """Return panes of ``window``, by index."""
+        return QueryList([p for p in self.panes if p.window_id == window.window_id])
+
+    def current_pane(self) -> t.Optional[Pane]:
+        """Return pane of ``$TMUX_PANE``, if it's on this server."""
+        pane_id = os.getenv("TMUX_PANE")
+        return self.pane(pane_id) if pane_id is not None else None
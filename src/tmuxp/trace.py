@@ -0,0 +1,160 @@
+"""Trace where the time of a tmuxp load goes, as Chrome trace events.
+
+``tmuxp load --trace FILE`` records a span for reading, expanding and trickling
+the workspace, loading plugins, ``before_script``, creating each window and pane,
+each plugin hook and every tmux command, with its arguments and exit code. The
+file is in Chrome's trace event format, it opens in Perfetto
+(https://ui.perfetto.dev) or ``chrome://tracing``.
+
+Spans are only recorded between :func:`start` and :func:`stop`, :func:`span`
+does nothing otherwise. tmux commands are recorded by the servers tmuxp loads
+with, :class:`TracedServer` (and the control mode server deriving from it);
+libtmux itself is left as it is.
+
+>>> traced_server = TracedServer(socket_name=server.socket_name)
+>>> tracer = start()
+>>> with span("expand", path="~/.tmuxp/a.yaml"):
+...     pass
+>>> traced_server.cmd("display-message", "-p", "hi").stdout
+['hi']
+>>> stop() is tracer
+True
+
+>>> [(event["name"], event["cat"]) for event in tracer.events]
+[('expand', 'tmuxp'), ('display-message', 'tmux')]
+"""
+
+import contextlib
+import json
+import logging
+import os
+import pathlib
+import threading
+import time
+import typing as t
+
+from libtmux.common import tmux_cmd
+from libtmux.server import Server
+
+if t.TYPE_CHECKING:
+    from .types import StrPath
+
+logger = logging.getLogger(__name__)
+
+_tracer: t.Optional["Tracer"] = None
+
+
+class Tracer:
+    """Spans recorded as Chrome trace events, written by :meth:`write`."""
+
+    def __init__(self, path: t.Optional["StrPath"] = None) -> None:
+        self.path = path
+        self.events: t.List[t.Dict[str, t.Any]] = []
+        self._start = time.perf_counter()
+        self._threads: t.Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def _timestamp(self) -> float:
+        """Return microseconds since the tracer started."""
+        return (time.perf_counter() - self._start) * 1e6
+
+    @contextlib.contextmanager
+    def span(
+        self, name: str, cat: str = "tmuxp", **args: t.Any
+    ) -> t.Iterator[t.Dict[str, t.Any]]:
+        """Record duration of the ``with`` block, yield ``args`` to add to."""
+        start = self._timestamp()
+        try:
+            yield args
+        except BaseException as e:
+            args["error"] = repr(e)
+            raise
+        finally:
+            tid = threading.get_native_id()
+            event = {
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": start,
+                "dur": self._timestamp() - start,
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": args,
+            }
+            with self._lock:
+                self.events.append(event)
+                self._threads[tid] = threading.current_thread().name
+
+    def trace_events(self) -> t.Dict[str, t.Any]:
+        """Return recorded spans in Chrome's JSON object format."""
+        with self._lock:
+            threads = [
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": tid,
+                    "args": {"name": name},
+                }
+                for tid, name in self._threads.items()
+            ]
+            events = sorted(self.events, key=lambda event: event["ts"])
+        return {"traceEvents": threads + events, "displayTimeUnit": "ms"}
+
+    def write(self, path: "StrPath") -> None:
+        """Write recorded spans to ``path``."""
+        pathlib.Path(path).write_text(json.dumps(self.trace_events(), default=str))
+
+
+class TracedServer(Server):
+    """:class:`libtmux.Server` recording a span for each command while tracing."""
+
+    def cmd(self, *args: t.Any, **kwargs: t.Any) -> tmux_cmd:
+        """Run tmux command, see :meth:`libtmux.Server.cmd`."""
+        argv = [str(arg) for arg in args]
+        with span(argv[0] if argv else "tmux", cat="tmux", argv=argv) as span_args:
+            proc = super().cmd(*args, **kwargs)
+            span_args["returncode"] = proc.returncode
+        return proc
+
+
+def start(path: t.Optional["StrPath"] = None) -> Tracer:
+    """Start recording spans, written to ``path`` (if passed) by :func:`stop`."""
+    global _tracer
+    if _tracer is not None:
+        stop()
+    _tracer = Tracer(path)
+    return _tracer
+
+
+def stop() -> t.Optional[Tracer]:
+    """Stop recording spans, write them if the trace has a path.
+
+    Returns the stopped :class:`Tracer`, None if no trace was started.
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is None:
+        return None
+
+    if tracer.path is not None:
+        tracer.write(tracer.path)
+        logger.info(f"trace written to {tracer.path}")
+    return tracer
+
+
+@contextlib.contextmanager
+def span(
+    name: str, cat: str = "tmuxp", **args: t.Any
+) -> t.Iterator[t.Dict[str, t.Any]]:
+    """Record duration of the ``with`` block if tracing, yield ``args`` to add to.
+
+    >>> with span("before_script", script="./bootstrap") as args:
+    ...     args["returncode"] = 0
+    """
+    tracer = _tracer
+    if tracer is None:
+        yield args
+        return
+    with tracer.span(name, cat, **args) as span_args:
+        yield span_args
@@ -1,4 +1,5 @@
 """Utility and helper methods for tmuxp."""
+import asyncio
 import logging
 import os
 import pathlib
@@ -17,6 +18,8 @@ if t.TYPE_CHECKING:
     from libtmux.session import Session
     from libtmux.window import Window
 
+    from .snapshot import ServerSnapshot
+
 logger = logging.getLogger(__name__)
 
 PY2 = sys.version_info[0] == 2
@@ -61,6 +64,54 @@ def run_before_script(
             raise
 
 
+async def run_before_script_async(
+    script_file: t.Union[str, pathlib.Path], cwd: t.Optional[pathlib.Path] = None
+) -> int:
+    """Execute a shell script in an asyncio subprocess, streaming its output.
+
+    Async version of :func:`run_before_script`, the event loop keeps running while
+    the script does.
+    """
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *shlex.split(str(script_file)),
+            stderr=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            cwd=cwd,
+        )
+    except OSError as e:
+        if e.errno == 2:
+            raise exc.BeforeLoadScriptNotExists(
+                e,
+                os.path.abspath(script_file),  # NOQA: PTH100
+            ) from e
+        else:
+            raise
+
+    async def read_stderr() -> bytes:
+        assert proc.stderr is not None
+        return await proc.stderr.read()
+
+    stderr_task = asyncio.ensure_future(read_stderr())
+    assert proc.stdout is not None
+    async for line in proc.stdout:
+        sys.stdout.write(console_to_str(line))
+    stderr = await stderr_task
+    await proc.wait()
+
+    if proc.returncode:
+        stderr_strlist = console_to_str(stderr).split("\n")
+        stderr_str = "\n".join(list(filter(None, stderr_strlist)))  # filter empty
+
+        raise exc.BeforeLoadScriptError(
+            proc.returncode,
+            os.path.abspath(script_file),  # NOQA: PTH100
+            stderr_str,
+        )
+    assert proc.returncode is not None
+    return proc.returncode
+
+
 def oh_my_zsh_auto_title() -> None:
     """Give warning and offer to fix ``DISABLE_AUTO_TITLE``.
 
@@ -85,8 +136,12 @@ def oh_my_zsh_auto_title() -> None:
         )
 
 
-def get_current_pane(server: "Server") -> t.Optional["Pane"]:
-    """Return Pane if one found in env."""
+def get_current_pane(
+    server: "Server", snapshot: t.Optional["ServerSnapshot"] = None
+) -> t.Optional["Pane"]:
+    """Return Pane if one found in env, looked up in ``snapshot`` if passed."""
+    if snapshot is not None:
+        return snapshot.current_pane()
     if os.getenv("TMUX_PANE") is not None:
         try:
             return next(p for p in server.panes if p.pane_id == os.getenv("TMUX_PANE"))
@@ -99,19 +154,24 @@ def get_session(
     server: "Server",
     session_name: t.Optional[str] = None,
     current_pane: t.Optional["Pane"] = None,
+    snapshot: t.Optional["ServerSnapshot"] = None,
 ) -> "Session":
-    """Get tmux session for server by session name, respects current pane, if passed."""
+    """Get tmux session for server by session name, respects current pane, if passed.
+
+    Sessions are looked up in ``snapshot`` if passed.
+    """
     try:
+        sessions = snapshot.sessions if snapshot is not None else server.sessions
         if session_name:
-            session = server.sessions.get(session_name=session_name)
+            session = sessions.get(session_name=session_name)
         elif current_pane is not None:
-            session = server.sessions.get(session_id=current_pane.session_id)
+            session = sessions.get(session_id=current_pane.session_id)
         else:
-            current_pane = get_current_pane(server)
+            current_pane = get_current_pane(server, snapshot=snapshot)
             if current_pane:
-                session = server.sessions.get(session_id=current_pane.session_id)
+                session = sessions.get(session_id=current_pane.session_id)
             else:
-                session = server.sessions[0]
+                session = sessions[0]
 
     except Exception as e:
         if session_name:
@@ -126,15 +186,22 @@ def get_window(
     session: "Session",
     window_name: t.Optional[str] = None,
     current_pane: t.Optional["Pane"] = None,
+    snapshot: t.Optional["ServerSnapshot"] = None,
 ) -> "Window":
-    """Get tmux window for server by window name, respects current pane, if passed."""
+    """Get tmux window for server by window name, respects current pane, if passed.
+
+    Windows are looked up in ``snapshot`` if passed.
+    """
     try:
+        windows = (
+            snapshot.windows_of(session) if snapshot is not None else session.windows
+        )
         if window_name:
-            window = session.windows.get(window_name=window_name)
+            window = windows.get(window_name=window_name)
         elif current_pane is not None:
-            window = session.windows.get(window_id=current_pane.window_id)
+            window = windows.get(window_id=current_pane.window_id)
         else:
-            window = session.windows[0]
+            window = windows[0]
     except Exception as e:
         if window_name:
             raise exc.WindowNotFound(window_target=window_name) from e
@@ -146,11 +213,24 @@ def get_window(
     return window
 
 
-def get_pane(window: "Window", current_pane: t.Optional["Pane"] = None) -> "Pane":
-    """Get tmux pane for server by pane name, respects current pane, if passed."""
+def get_pane(
+    window: "Window",
+    current_pane: t.Optional["Pane"] = None,
+    snapshot: t.Optional["ServerSnapshot"] = None,
+) -> "Pane":
+    """Get tmux pane for server by pane name, respects current pane, if passed.
+
+    Panes are looked up in ``snapshot`` if passed.
+    """
     pane = None
     try:
-        if current_pane is not None:
+        if snapshot is not None:
+            panes = snapshot.panes_of(window)
+            if current_pane is not None:
+                pane = panes.get(pane_id=current_pane.pane_id, default=None)
+            else:
+                pane = panes.get(pane_active="1", default=None)
+        elif current_pane is not None:
             pane = window.panes.get(pane_id=current_pane.pane_id)
         else:
             pane = window.attached_pane
@@ -163,3 +243,27 @@ def get_pane(window: "Window", current_pane: t.Optional["Pane"] = None) -> "Pane
         raise exc.PaneNotFound()
 
     return pane
+
+
+def server_args(server: "Server") -> t.List[str]:
+    """Return ``tmux(1)`` arguments selecting ``server``.
+
+    Used where tmux is run without libtmux, e.g. for asyncio subprocesses, piping
+    stdin to ``load-buffer`` and control mode clients.
+
+    >>> from libtmux.server import Server
+    >>> server_args(Server(socket_name="demo", colors=256))
+    ['-Ldemo', '-2']
+    """
+    args = []
+    if server.socket_name:
+        args.append(f"-L{server.socket_name}")
+    if server.socket_path:
+        args.append(f"-S{server.socket_path}")
+    if server.config_file:
+        args.append(f"-f{server.config_file}")
+    if server.colors == 256:
+        args.append("-2")
+    elif server.colors == 88:
+        args.append("-8")
+    return args
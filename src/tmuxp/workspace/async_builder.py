@@ -0,0 +1,642 @@
+"""Build tmux workspaces from asyncio code.
+
+:class:`AsyncWorkspaceBuilder` has the same workflow as
+:class:`~tmuxp.workspace.builder.WorkspaceBuilder`, with ``async`` methods. tmux
+commands run through :func:`tmux_cmd_async`, an :func:`asyncio.create_subprocess_exec`
+transport, so the event loop keeps running while tmux works.
+
+Steps that don't depend on each other overlap:
+
+- session options, global options and environment variables are set at once
+- each pane's commands (``send-keys``, ``sleep_before``, ``sleep_after``,
+  ``wait_for``) run as a task of their own, while the next panes and windows are
+  created. :meth:`AsyncWorkspaceBuilder.build` returns when all of them are done.
+- ``before_script`` output is streamed while it runs, see
+  :func:`~tmuxp.util.run_before_script_async`
+
+Windows and panes are still created in order, so they get the same indexes, and
+the same windows and panes are active, as with
+:class:`~tmuxp.workspace.builder.WorkspaceBuilder`. Lazy windows and pasted
+commands aren't supported, :meth:`AsyncWorkspaceBuilder.build` raises
+:exc:`~tmuxp.exc.UnsupportedWorkspaceFeature` for them.
+"""
+
+import asyncio
+import functools
+import logging
+import shutil
+import typing as t
+
+from libtmux.exc import TmuxCommandNotFound
+from libtmux.pane import Pane
+from libtmux.session import Session
+from libtmux.window import Window
+
+from .. import exc, util
+from ..capabilities import get_capabilities
+from . import layout as layouts, readiness
+from .batch import (
+    PANE_FIELDS,
+    WINDOW_FIELDS,
+    format_fields,
+    option_value,
+    parse_fields,
+)
+
+if t.TYPE_CHECKING:
+    from libtmux.server import Server
+
+logger = logging.getLogger(__name__)
+
+#: Fields printed (``-P -F``) for sessions created by the builder
+SESSION_FIELDS = [field for field in WINDOW_FIELDS if field.startswith("session_")] + [
+    "window_id",
+    "pane_id",
+]
+
+
+class AsyncTmuxCmd:
+    """Result of :func:`tmux_cmd_async`, like :class:`libtmux.common.tmux_cmd`."""
+
+    def __init__(
+        self,
+        cmd: t.List[str],
+        stdout: t.List[str],
+        stderr: t.List[str],
+        returncode: t.Optional[int],
+    ) -> None:
+        self.cmd = cmd
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = returncode
+
+
+async def tmux_cmd_async(server: "Server", *args: t.Any) -> AsyncTmuxCmd:
+    """Run tmux command on ``server`` in a subprocess, without blocking the loop.
+
+    >>> import asyncio
+    >>> proc = asyncio.run(tmux_cmd_async(server, "display-message", "-p", "hi"))
+    >>> proc.stdout
+    ['hi']
+    """
+    tmux_bin = shutil.which("tmux")
+    if not tmux_bin:
+        raise TmuxCommandNotFound()
+
+    cmd = [tmux_bin, *util.server_args(server), *(str(arg) for arg in args)]
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout_bytes, stderr_bytes = await proc.communicate()
+
+    stdout = stdout_bytes.decode(errors="backslashreplace").split("\n")
+    while stdout and stdout[-1] == "":
+        stdout.pop()
+    stderr = [
+        line
+        for line in stderr_bytes.decode(errors="backslashreplace").split("\n")
+        if line
+    ]
+    return AsyncTmuxCmd(cmd, stdout, stderr, proc.returncode)
+
+
+class AsyncWorkspaceBuilder:
+    """Load workspace from workspace :py:obj:`dict` object, with asyncio.
+
+    Takes the same expanded and trickled workspace as
+    :class:`~tmuxp.workspace.builder.WorkspaceBuilder`.
+
+    Examples
+    --------
+    >>> import asyncio
+    >>> from tmuxp.workspace import loader
+    >>> session_config = loader.trickle(loader.expand({
+    ...     "session_name": "async workspace",
+    ...     "windows": [
+    ...         {"window_name": "editor", "panes": ["echo one", "echo two"]},
+    ...         {"window_name": "logs", "panes": ["echo three"]},
+    ...     ],
+    ... }))
+    >>> builder = AsyncWorkspaceBuilder(session_config=session_config, server=server)
+    >>> asyncio.run(builder.build())
+
+    >>> sorted([window.name for window in builder.session.windows])
+    ['editor', 'logs']
+
+    Several workspaces can be built concurrently on one event loop, e.g. with
+    :func:`asyncio.gather`.
+    """
+
+    _session: t.Optional[Session]
+
+    def __init__(
+        self,
+        session_config: t.Dict[str, t.Any],
+        server: "Server",
+        plugins: t.Optional[t.List[t.Any]] = None,
+    ) -> None:
+        """Initialize workspace loading.
+
+        Parameters
+        ----------
+        session_config : dict
+            session config, includes a :py:obj:`list` of ``windows``.
+
+        server : :class:`libtmux.Server`
+            tmux server to build session in, only used for its socket and
+            configuration: commands run through :func:`tmux_cmd_async`
+
+        plugins : list
+            plugins to be used for this session
+        """
+        if not session_config:
+            raise exc.EmptyWorkspaceException()
+
+        self.session_config = session_config
+        self.server = server
+        self.plugins = plugins or []
+        self._session = None
+        self._pane_tasks: t.List["asyncio.Future[None]"] = []
+        self._base_index: t.Optional[int] = None
+        self._initial_window: t.Optional[str] = None
+
+    @property
+    def session(self) -> Session:
+        """Return session built by :meth:`build`."""
+        if self._session is None:
+            raise exc.SessionMissingWorkspaceException()
+        return self._session
+
+    async def cmd(self, *args: t.Any) -> AsyncTmuxCmd:
+        """Run tmux command, raise :exc:`~tmuxp.exc.TmuxCommandBatchError` on errors."""
+        proc = await tmux_cmd_async(self.server, *args)
+        if proc.stderr:
+            raise exc.TmuxCommandBatchError(proc.stderr, [[str(arg) for arg in args]])
+        return proc
+
+    async def session_exists(self, session_name: str) -> bool:
+        """Return true if tmux session already exists."""
+        proc = await tmux_cmd_async(self.server, "has-session", f"-t={session_name}")
+        return proc.returncode == 0
+
+    def unsupported(self) -> t.List[str]:
+        """Return features of the workspace this builder can't build."""
+        unsupported = []
+        windows = self.session_config["windows"]
+        if any(window_config.get("lazy") for window_config in windows):
+            unsupported.append("lazy windows")
+        if any(
+            pane_config.get("paste", window_config.get("paste", False))
+            for window_config in windows
+            for pane_config in window_config["panes"]
+        ):
+            unsupported.append("pasted commands")
+        return unsupported
+
+    async def _new_session(self) -> Session:
+        args = ["-d", "-P", "-F", format_fields(SESSION_FIELDS)]
+        args += ["-s", self.session_config["session_name"]]
+        if "start_directory" in self.session_config:
+            args += ["-c", self.session_config["start_directory"]]
+        if get_capabilities().supports("new-session-size"):
+            args += ["-x", "800", "-y", "600"]
+        proc = await self.cmd("new-session", *args)
+        return Session(
+            server=self.server, **parse_fields(SESSION_FIELDS, proc.stdout[0])
+        )
+
+    async def build(
+        self, session: t.Optional[Session] = None, append: bool = False
+    ) -> None:
+        """Build tmux workspace in session, a new session if not passed.
+
+        Returns once all panes have been sent their commands.
+
+        Parameters
+        ----------
+        session : :class:`libtmux.Session`
+            session to build workspace in
+        append : bool
+            append windows in current active session
+
+        Raises
+        ------
+        :exc:`~tmuxp.exc.UnsupportedWorkspaceFeature`
+            the workspace has lazy windows or pasted commands
+        """
+        unsupported = self.unsupported()
+        if unsupported:
+            raise exc.UnsupportedWorkspaceFeature(type(self).__name__, unsupported)
+
+        self._initial_window = None
+        if session is None:
+            session = await self._new_session()
+            # like WorkspaceBuilder, the initial window becomes the first one,
+            # unless session options could have made it start differently
+            if not self.session_config.get("options") and not self.session_config.get(
+                "global_options"
+            ):
+                self._initial_window = session.window_id
+        assert session.session_id is not None
+        self._session = session
+
+        for plugin in self.plugins:
+            plugin.before_workspace_builder(session)
+
+        if "before_script" in self.session_config:
+            try:
+                await util.run_before_script_async(
+                    self.session_config["before_script"],
+                    cwd=self.session_config.get("start_directory"),
+                )
+            except Exception:
+                await tmux_cmd_async(
+                    self.server, "kill-session", "-t", session.session_id
+                )
+                raise
+
+        await asyncio.gather(
+            *[
+                self.cmd("set-option", "-t", session.session_id, k, option_value(v))
+                for k, v in self.session_config.get("options", {}).items()
+            ],
+            *[
+                self.cmd("set-option", "-g", k, option_value(v))
+                for k, v in self.session_config.get("global_options", {}).items()
+            ],
+            *[
+                self.cmd("set-environment", "-t", session.session_id, k, str(v))
+                for k, v in self.session_config.get("environment", {}).items()
+            ],
+        )
+
+        try:
+            focus = None
+            async for window, window_config in self.iter_create_windows(
+                session, append
+            ):
+                for plugin in self.plugins:
+                    plugin.on_window_create(window)
+
+                focus_pane = None
+                async for pane, pane_config in self.iter_create_panes(
+                    window, window_config
+                ):
+                    if pane_config.get("focus"):
+                        focus_pane = pane
+
+                if window_config.get("focus"):
+                    focus = window
+
+                await self.config_after_window(window, window_config)
+
+                if focus_pane is not None:
+                    await self.cmd("select-pane", "-t", focus_pane.pane_id)
+
+                for plugin in self.plugins:
+                    plugin.after_window_finished(window)
+
+            if focus is not None:
+                await self.cmd("select-window", "-t", focus.window_id)
+        finally:
+            tasks, self._pane_tasks = self._pane_tasks, []
+            await asyncio.gather(*tasks)
+
+    async def _windows(self, session: Session) -> t.List[t.Dict[str, str]]:
+        assert session.session_id is not None
+        proc = await self.cmd(
+            "list-windows",
+            "-t",
+            session.session_id,
+            "-F",
+            format_fields(["window_id", "window_active"]),
+        )
+        return [
+            parse_fields(["window_id", "window_active"], line) for line in proc.stdout
+        ]
+
+    async def iter_create_windows(
+        self, session: Session, append: bool = False
+    ) -> t.AsyncIterator[t.Tuple[Window, t.Dict[str, t.Any]]]:
+        """Yield :class:`libtmux.Window` created for each window of the workspace.
+
+        Applies ``options`` to window.
+
+        Parameters
+        ----------
+        session : :class:`libtmux.Session`
+            session to create windows in
+        append : bool
+            append windows in current active session
+        """
+        assert session.session_id is not None
+        for window_iterator, window_config in enumerate(
+            self.session_config["windows"], start=1
+        ):
+            first_window: t.Optional[str] = None
+            reuse_window: t.Optional[str] = None
+            options = window_config.get("options")
+            if (
+                window_iterator == 1
+                and not append
+                and self._initial_window is not None
+                # windows renaming themselves replace the initial window, see
+                # WorkspaceBuilder.iter_create_windows
+                and not (isinstance(options, dict) and options.get("automatic-rename"))
+            ):
+                reuse_window = self._initial_window
+            elif window_iterator == 1 and not append:
+                windows = await self._windows(session)
+                if len(windows) == 1:
+                    first_window = windows[0]["window_id"]
+                    await self.cmd(
+                        "move-window",
+                        "-s",
+                        first_window,
+                        "-t",
+                        f"{session.session_id}:99",
+                    )
+
+            panes = window_config["panes"]
+            start_directory = window_config.get("start_directory", None)
+            if panes and "start_directory" in panes[0]:
+                start_directory = panes[0]["start_directory"]
+
+            window_shell = window_config.get("window_shell", None)
+            if panes and panes[0].get("shell", "") != "":
+                window_shell = panes[0]["shell"]
+
+            environment = (
+                panes[0].get("environment", window_config.get("environment"))
+                if panes
+                else window_config.get("environment")
+            )
+            if environment and not get_capabilities().supports(
+                "new-window-environment"
+            ):
+                logger.warning(
+                    "Cannot set environment for new windows. "
+                    "You need tmux 3.0 or newer for this."
+                )
+                environment = None
+
+            args = ["-d", "-P", "-F", format_fields(WINDOW_FIELDS)]
+            if start_directory:
+                args += ["-c", start_directory]
+            if window_config.get("window_name") is not None:
+                args += ["-n", window_config["window_name"]]
+            args += [
+                "-t",
+                f"{session.session_id}:{window_config.get('window_index', '')}",
+            ]
+            if environment:
+                args += [f"-e{k}={v}" for k, v in environment.items()]
+            if window_shell:
+                args.append(window_shell)
+
+            if reuse_window is not None:
+                proc = await self._reuse_window(
+                    reuse_window,
+                    window_config,
+                    start_directory=start_directory,
+                    window_shell=window_shell,
+                    environment=environment,
+                )
+            else:
+                proc = await self.cmd("new-window", *args)
+            window = Window(
+                server=self.server, **parse_fields(WINDOW_FIELDS, proc.stdout[0])
+            )
+
+            if first_window is not None:
+                await self.cmd("kill-window", "-t", first_window)
+
+            await asyncio.gather(
+                *[
+                    self.cmd(
+                        "set-window-option",
+                        "-t",
+                        window.window_id,
+                        key,
+                        option_value(val),
+                    )
+                    for key, val in (window_config.get("options") or {}).items()
+                ]
+            )
+
+            if window_config.get("focus"):
+                await self.cmd("select-window", "-t", window.window_id)
+
+            yield window, window_config
+
+    async def _reuse_window(
+        self,
+        window_id: str,
+        window_config: t.Dict[str, t.Any],
+        start_directory: t.Optional[str],
+        window_shell: t.Optional[str],
+        environment: t.Optional[t.Dict[str, str]],
+    ) -> AsyncTmuxCmd:
+        """Turn the session's initial window into the first window of the workspace.
+
+        Like :func:`~tmuxp.workspace.builder._reuse_window`, returns the window's
+        fields printed like ``new-window -P``.
+        """
+        if window_config.get("window_name") is not None:
+            await self.cmd(
+                "rename-window", "-t", window_id, window_config["window_name"]
+            )
+        if (
+            window_shell
+            or environment
+            or self.session_config.get("environment")
+            or (
+                start_directory
+                and start_directory != self.session_config.get("start_directory")
+            )
+        ):
+            args = ["-k", "-t", window_id]
+            if start_directory:
+                args += ["-c", start_directory]
+            if environment:
+                args += [f"-e{k}={v}" for k, v in environment.items()]
+            if window_shell:
+                args.append(window_shell)
+            await self.cmd("respawn-pane", *args)
+
+        window_index = str(window_config.get("window_index", ""))
+        if window_index != "":
+            proc = await self.cmd("display-message", "-p", "-t", window_id, "#I")
+            if proc.stdout != [window_index]:
+                assert self._session is not None
+                await self.cmd(
+                    "move-window",
+                    "-s",
+                    window_id,
+                    "-t",
+                    f"{self._session.session_id}:{window_index}",
+                )
+        return await self.cmd(
+            "display-message", "-p", "-t", window_id, format_fields(WINDOW_FIELDS)
+        )
+
+    async def _pane_base_index(self) -> int:
+        if self._base_index is None:
+            proc = await self.cmd("show-window-options", "-gv", "pane-base-index")
+            self._base_index = int(proc.stdout[0]) if proc.stdout else 0
+        return self._base_index
+
+    async def iter_create_panes(
+        self, window: Window, window_config: t.Dict[str, t.Any]
+    ) -> t.AsyncIterator[t.Tuple[Pane, t.Dict[str, t.Any]]]:
+        """Yield :class:`libtmux.Pane` created for each pane of ``window_config``.
+
+        The commands of each pane are sent by a task started before the pane is
+        yielded; :meth:`build` waits for them.
+
+        Parameters
+        ----------
+        window : :class:`libtmux.Window`
+            window to create panes for
+        window_config : dict
+            config section for window
+        """
+        assert window.window_id is not None
+        panes = window_config["panes"]
+        layout = window_config.get("layout")
+        spec = layout if layouts.is_layout_spec(layout) else None
+        if spec is not None:
+            layouts.validate_layout(spec, len(panes))
+
+        pane_base_index = await self._pane_base_index()
+        pane_id: t.Optional[str] = None
+        for pane_position, pane_config in enumerate(panes):
+            if pane_position == 0:
+                proc = await self.cmd(
+                    "display-message",
+                    "-p",
+                    "-t",
+                    f"{window.window_id}.{pane_base_index}",
+                    format_fields(PANE_FIELDS),
+                )
+            else:
+                assert pane_id is not None
+                # not detached: the last pane is active, as with WorkspaceBuilder
+                args = ["-P", "-F", format_fields(PANE_FIELDS), "-t", pane_id]
+                if spec is not None:
+                    args += layouts.split_args(spec, pane_position, len(panes))
+                else:
+                    args.append("-v")
+                start_directory = pane_config.get(
+                    "start_directory", window_config.get("start_directory")
+                )
+                if start_directory is not None:
+                    args += ["-c", start_directory]
+                environment = pane_config.get(
+                    "environment", window_config.get("environment")
+                )
+                if environment and get_capabilities().supports(
+                    "new-window-environment"
+                ):
+                    args += [f"-e{k}={v}" for k, v in environment.items()]
+                shell = pane_config.get("shell", window_config.get("window_shell"))
+                if shell:
+                    args.append(shell)
+                proc = await self.cmd("split-window", *args)
+
+            pane = Pane(server=self.server, **parse_fields(PANE_FIELDS, proc.stdout[0]))
+            pane_id = pane.pane_id
+
+            if layout and spec is None:
+                await self.cmd("select-layout", "-t", window.window_id, layout)
+
+            self._pane_tasks.append(
+                asyncio.ensure_future(
+                    self._send_commands(pane, pane_config, window_config)
+                )
+            )
+
+            yield pane, pane_config
+
+        if spec is not None:
+            proc = await self.cmd(
+                "display-message",
+                "-p",
+                "-t",
+                window.window_id,
+                layouts.WINDOW_SIZE_FORMAT,
+            )
+            width, height, count = (int(value) for value in proc.stdout[0].split())
+            await self.cmd(
+                "select-layout",
+                "-t",
+                window.window_id,
+                layouts.layout_string(spec, count, width, height),
+            )
+
+    async def _send_commands(
+        self,
+        pane: Pane,
+        pane_config: t.Dict[str, t.Any],
+        window_config: t.Dict[str, t.Any],
+    ) -> None:
+        """Send ``shell_command`` of ``pane_config``, with its delays and waits."""
+        assert pane.pane_id is not None
+        if "suppress_history" in pane_config:
+            suppress = pane_config["suppress_history"]
+        else:
+            suppress = window_config.get("suppress_history", True)
+
+        loop = asyncio.get_running_loop()
+        enter = pane_config.get("enter", True)
+        sleep_before = pane_config.get("sleep_before", None)
+        sleep_after = pane_config.get("sleep_after", None)
+        wait_for = pane_config.get("wait_for", None)
+        for cmd in pane_config["shell_command"]:
+            enter = cmd.get("enter", enter)
+            sleep_before = cmd.get("sleep_before", sleep_before)
+            sleep_after = cmd.get("sleep_after", sleep_after)
+            # the pane's condition only applies to its first command
+            wait_for, condition = None, cmd.get("wait_for", wait_for)
+
+            if sleep_before is not None:
+                await asyncio.sleep(sleep_before)
+
+            if condition is not None:
+                await loop.run_in_executor(
+                    None,
+                    functools.partial(
+                        readiness.wait_for, self.server, pane.pane_id, condition
+                    ),
+                )
+
+            keys = [(" " if suppress else "") + cmd["cmd"]]
+            if enter:
+                keys.append("Enter")
+            await self.cmd("send-keys", "-t", pane.pane_id, *keys)
+
+            if sleep_after is not None:
+                await asyncio.sleep(sleep_after)
+
+    async def config_after_window(
+        self, window: Window, window_config: t.Dict[str, t.Any]
+    ) -> None:
+        """Set ``options_after`` of window, once its panes are created.
+
+        Parameters
+        ----------
+        window : :class:`libtmux.Window`
+            window to create panes for
+        window_config : dict
+            config section for window
+        """
+        await asyncio.gather(
+            *[
+                self.cmd(
+                    "set-window-option", "-t", window.window_id, key, option_value(val)
+                )
+                for key, val in (window_config.get("options_after") or {}).items()
+            ]
+        )
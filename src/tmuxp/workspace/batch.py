@@ -0,0 +1,189 @@
+r"""Batched tmux command execution for tmuxp workspaces.
+
+tmux accepts several commands in a single invocation when they are separated by
+``;`` (``tmux cmd1 \\; cmd2``). :class:`CommandBatch` queues commands and sends
+them that way, so building a window costs one ``tmux(1)`` process instead of one
+per ``split-window``, ``select-layout`` and ``send-keys``.
+"""
+
+import logging
+import typing as t
+
+from libtmux.formats import FORMAT_SEPARATOR
+from libtmux.neo import Obj
+
+from .. import exc
+
+if t.TYPE_CHECKING:
+    from libtmux.server import Server
+
+logger = logging.getLogger(__name__)
+
+#: Upper bound (in bytes) for the arguments of a single tmux invocation. The tmux
+#: client sends its whole command line to the server in one message, which tmux
+#: caps at 16 KiB.
+MAX_BATCH_SIZE = 12000
+
+#: Fields of libtmux objects, sessions, windows and panes share one dataclass
+OBJ_FIELDS = [field for field in Obj.__dataclass_fields__ if field != "server"]
+
+#: Fields printed (``-P -F``) for windows created in a batch
+WINDOW_FIELDS = OBJ_FIELDS
+
+#: Fields printed (``-P -F``) for panes created in a batch
+PANE_FIELDS = [
+    field
+    for field in WINDOW_FIELDS
+    if field.startswith("pane_")
+    or field in ["session_id", "session_name", "window_id", "window_index"]
+]
+
+
+def format_fields(fields: t.List[str]) -> str:
+    """Return tmux ``-F`` format string for ``fields``.
+
+    >>> format_fields(["window_id", "pane_id"]).split(FORMAT_SEPARATOR)
+    ['#{window_id}', '#{pane_id}', '']
+    """
+    return "".join(f"#{{{field}}}{FORMAT_SEPARATOR}" for field in fields)
+
+
+def parse_fields(fields: t.List[str], line: str) -> t.Dict[str, str]:
+    """Return mapping of ``fields`` from a line printed via :func:`format_fields`.
+
+    Empty values are dropped, the same as :func:`libtmux.neo.fetch_objs`.
+
+    >>> parse_fields(["window_id", "pane_id"], f"@1{FORMAT_SEPARATOR}")
+    {'window_id': '@1'}
+    """
+    return {k: v for k, v in zip(fields, line.split(FORMAT_SEPARATOR)) if v}
+
+
+def option_value(value: t.Union[str, int, bool]) -> t.Union[str, int]:
+    """Return tmux option value, ``True``/``False`` become ``on``/``off``.
+
+    Mirrors :meth:`libtmux.Window.set_window_option`.
+
+    >>> option_value(True)
+    'on'
+
+    >>> option_value(5)
+    5
+    """
+    if isinstance(value, bool):
+        return "on" if value else "off"
+    return value
+
+
+def escape_arg(arg: str) -> str:
+    r"""Escape an argument so tmux doesn't read it as a command separator.
+
+    When tmux parses its command line, an argument ending with ``;`` ends the
+    command. A trailing ``\;`` is read as a literal ``;``.
+
+    >>> escape_arg("echo hi")
+    'echo hi'
+
+    >>> escape_arg("echo hi;")
+    'echo hi\\;'
+    """
+    if arg.endswith(";"):
+        return arg[:-1] + "\\;"
+    return arg
+
+
+class CommandBatch:
+    r"""Queue tmux commands and run them as one ``tmux cmd1 \; cmd2`` invocation.
+
+    Output of all commands (e.g. ``split-window -P``) is returned in order by
+    :meth:`flush`. If the queued commands grow beyond ``max_size``, the pending
+    commands are sent early so no single invocation is rejected by tmux.
+
+    Examples
+    --------
+    >>> batch = CommandBatch(server=server)
+    >>> batch.add("display-message", "-p", "hello")
+    >>> batch.add("display-message", "-p", "world;")
+    >>> len(batch)
+    2
+
+    >>> batch.flush()
+    ['hello', 'world;']
+
+    >>> batch.invocations
+    1
+
+    Callbacks of :meth:`on_flush` run once the commands queued before them ran:
+
+    >>> batch.add("display-message", "-p", "hello")
+    >>> batch.on_flush(lambda: print("sent"))
+    >>> batch.flush()
+    sent
+    ['hello']
+
+    Errors stop the batch and raise:
+
+    >>> batch.add("select-window", "-t", "@999999")
+    >>> batch.flush()
+    Traceback (most recent call last):
+    ...
+    tmuxp.exc.TmuxCommandBatchError: ...
+    """
+
+    def __init__(self, server: "Server", max_size: int = MAX_BATCH_SIZE) -> None:
+        self.server = server
+        self.max_size = max_size
+        self.commands: t.List[t.List[str]] = []
+        self.invocations = 0
+        self._size = 0
+        self._output: t.List[str] = []
+        self._callbacks: t.List[t.Callable[[], None]] = []
+
+    def __len__(self) -> int:
+        """Return number of pending commands."""
+        return len(self.commands)
+
+    def add(self, cmd: str, *args: t.Any) -> None:
+        """Queue a tmux command, e.g. ``add("select-layout", "-t", "@1", "tiled")``."""
+        argv = [cmd, *(escape_arg(str(arg)) for arg in args)]
+        size = sum(len(arg.encode()) + 1 for arg in argv) + 2
+
+        if self.commands and self._size + size > self.max_size:
+            self._run()
+
+        self.commands.append(argv)
+        self._size += size
+
+    def flush(self) -> t.List[str]:
+        """Run pending commands, return stdout collected since the last flush."""
+        self._run()
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+        output, self._output = self._output, []
+        return output
+
+    def on_flush(self, callback: t.Callable[[], None]) -> None:
+        """Call ``callback`` once the pending commands ran, by the next flush."""
+        self._callbacks.append(callback)
+
+    def _run(self) -> None:
+        if not self.commands:
+            return
+
+        commands, self.commands, self._size = self.commands, [], 0
+
+        args: t.List[str] = []
+        for argv in commands:
+            if args:
+                args.append(";")
+            args.extend(argv)
+
+        logger.debug(f"running {len(commands)} batched tmux commands")
+        proc = self.server.cmd(*args)
+        self.invocations += 1
+
+        if proc.stderr:
+            raise exc.TmuxCommandBatchError(proc.stderr, commands)
+
+        self._output.extend(proc.stdout)
@@ -1,17 +1,47 @@
 """Create a tmux workspace from a workspace :py:obj:`dict`."""
+import functools
+import json
 import logging
+import pathlib
+import shlex
+import sys
+import threading
 import time
 import typing as t
 
+from libtmux import exc as libtmux_exc
 from libtmux._internal.query_list import ObjectDoesNotExist
-from libtmux.common import has_gte_version, has_lt_version
 from libtmux.pane import Pane
 from libtmux.server import Server
 from libtmux.session import Session
 from libtmux.window import Window
 
-from .. import exc
+from .. import exc, trace
+from ..capabilities import get_capabilities
+from ..snapshot import ServerSnapshot
 from ..util import get_current_pane, run_before_script
+from . import layout as layouts, paste, readiness, reconcile
+from .batch import (
+    PANE_FIELDS,
+    WINDOW_FIELDS,
+    CommandBatch,
+    format_fields,
+    parse_fields,
+)
+from .events import EventBus
+from .journal import BuildProgress, Journal, clear_journal, read_journal
+from .planner import (
+    BatchedExecutor,
+    Plan,
+    PlanExecutor,
+    SequentialExecutor,
+    compile_workspace,
+)
+from .pool import workspace_digest
+from .timeline import PaneTimelines
+
+if t.TYPE_CHECKING:
+    from .events import EventKind
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +49,146 @@ DEFAULT_WIDTH = "800"
 DEFAULT_HEIGHT = "600"
 DEFAULT_SIZE = f"{DEFAULT_WIDTH}x{DEFAULT_HEIGHT}"
 
+#: Window option holding the config of a lazy window until its panes are built
+LAZY_WINDOW_OPTION = "@tmuxp_lazy"
+
+#: Hook building lazy windows when they're selected
+LAZY_WINDOW_HOOK = "session-window-changed"
+
+#: Session option holding the plugins (import paths) lazy windows are built with
+LAZY_PLUGINS_OPTION = "@tmuxp_plugins"
+
+#: Held while creating sessions: libtmux's ``Server.new_session`` unsets and
+#: restores ``os.environ["TMUX"]``, which builds in other threads (``tmuxp load
+#: --jobs``) would otherwise see, or restore to the wrong value
+_new_session_lock = threading.Lock()
+
+
+def _new_window(
+    session: Session,
+    window_name: t.Optional[str],
+    start_directory: t.Optional[str],
+    window_index: str,
+    window_shell: t.Optional[str],
+    environment: t.Optional[t.Dict[str, str]],
+) -> Window:
+    """Create detached window like :meth:`libtmux.Session.new_window`.
+
+    The window is read from ``new-window -P`` output, libtmux looks it up among
+    all windows of the server instead, which grows with the session being built.
+    """
+    args = ["-d", "-P", "-F", format_fields(WINDOW_FIELDS)]
+    if start_directory:
+        args.append(f"-c{pathlib.Path(start_directory).expanduser()}")
+    if window_name is not None:
+        args += ["-n", window_name]
+    args.append(f"-t{session.session_id}:{window_index}")
+    if environment:
+        args += [f"-e{k}={v}" for k, v in environment.items()]
+    if window_shell:
+        args.append(window_shell)
+
+    proc = session.server.cmd("new-window", *args)
+    if proc.stderr:
+        raise libtmux_exc.LibTmuxException(proc.stderr)
+    return Window(server=session.server, **parse_fields(WINDOW_FIELDS, proc.stdout[0]))
+
+
+def _reuse_window(
+    window: Window,
+    window_name: t.Optional[str],
+    start_directory: t.Optional[str],
+    window_index: str,
+    window_shell: t.Optional[str],
+    environment: t.Optional[t.Dict[str, str]],
+    respawn: bool,
+) -> Window:
+    """Turn ``window``, the initial window of a session, into a workspace window.
+
+    It's renamed, its pane is respawned with ``start_directory``, ``window_shell``
+    and ``environment`` if ``respawn``, and it's moved to ``window_index``, in one
+    tmux invocation. Like :func:`_new_window`, without creating a window to replace
+    the initial one.
+    """
+    batch = CommandBatch(window.server)
+    if window_name is not None:
+        batch.add("rename-window", "-t", window.window_id, window_name)
+    if respawn:
+        args = ["-k", "-t", window.window_id]
+        if start_directory:
+            args.append(f"-c{pathlib.Path(start_directory).expanduser()}")
+        if environment:
+            args += [f"-e{k}={v}" for k, v in environment.items()]
+        if window_shell:
+            args.append(window_shell)
+        batch.add("respawn-pane", *args)
+    if window_index != "" and str(window_index) != window.window_index:
+        batch.add(
+            "move-window",
+            "-s",
+            window.window_id,
+            "-t",
+            f"{window.session_id}:{window_index}",
+        )
+    batch.add(
+        "display-message", "-p", "-t", window.window_id, format_fields(WINDOW_FIELDS)
+    )
+    output = batch.flush()
+    return Window(server=window.server, **parse_fields(WINDOW_FIELDS, output[-1]))
+
+
+def _split_window(
+    window: Window,
+    target: str,
+    start_directory: t.Optional[str],
+    shell: t.Optional[str],
+    vertical: bool,
+    percent: t.Optional[int],
+    environment: t.Optional[t.Dict[str, str]],
+) -> Pane:
+    """Split ``target`` pane like :meth:`libtmux.Window.split_window`.
+
+    The pane is read from ``split-window -P`` output, see :func:`_new_window`.
+    """
+    args = [f"-t{target}", "-v" if vertical else "-h"]
+    if percent is not None:
+        args += ["-p", str(percent)]
+    args += ["-P", "-F", format_fields(PANE_FIELDS)]
+    if start_directory is not None:
+        args.append(f"-c{pathlib.Path(start_directory).expanduser()}")
+    if environment:
+        args += [f"-e{k}={v}" for k, v in environment.items()]
+    if shell:
+        args.append(shell)
+
+    proc = window.server.cmd("split-window", *args)
+    if proc.stderr:
+        raise libtmux_exc.LibTmuxException(proc.stderr)
+    return Pane(server=window.server, **parse_fields(PANE_FIELDS, proc.stdout[0]))
+
+
+def _window_shell(window_config: t.Dict[str, t.Any]) -> t.Optional[str]:
+    window_shell = window_config.get("window_shell", None)
+
+    # If the first pane specifies a shell, use that instead.
+    try:
+        if window_config["panes"][0]["shell"] != "":
+            window_shell = window_config["panes"][0]["shell"]
+    except (KeyError, IndexError):
+        pass
+    return window_shell
+
+
+def _lazy_hook_command() -> str:
+    """Return tmux command of the hook building lazy windows when selected."""
+    materialize = " ".join(
+        shlex.quote(arg) for arg in [sys.executable, "-m", "tmuxp", "materialize"]
+    )
+    target = "-S '#{socket_path}' '#{window_id}'"
+    run_shell = f'run-shell -b \\"{materialize} {target}\\"'
+    # only start tmuxp for windows that are still lazy
+    return f'if-shell -F "#{{{LAZY_WINDOW_OPTION}}}" "{run_shell}"'
+
 
 class WorkspaceBuilder:
     """Load workspace from workspace :py:obj:`dict` object.
@@ -125,6 +295,36 @@ class WorkspaceBuilder:
 
     It handles the magic of cases where the user may want to start
     a session inside tmux (when `$TMUX` is in the env variables).
+
+    **Build plans:**
+
+    :meth:`plan` compiles the workspace into a
+    :class:`~tmuxp.workspace.planner.Plan`. With ``executor``, :meth:`build` runs
+    that plan instead of creating windows and panes one call at a time.
+    ``batch=True`` is short for the
+    :class:`~tmuxp.workspace.planner.BatchedExecutor`, which sends the commands
+    for each window (splits, layouts, options, keys) to tmux in one invocation.
+    Workspaces with features plans don't cover (lazy windows, ``two_phase``) are
+    built without the executor, with a warning:
+
+    >>> builder = WorkspaceBuilder(
+    ...     session_config=session_config, server=server, batch=True
+    ... )
+    >>> batched_session = server.new_session(session_name='batched')
+    >>> builder.build(session=batched_session)
+
+    >>> sorted([window.name for window in batched_session.windows])
+    ['editor', 'logging', 'test']
+
+    >>> len(batched_session.windows.get(window_name='editor').panes)
+    2
+
+    **Delays:**
+
+    ``sleep_before``, ``sleep_after`` and ``wait_for`` pause the build. With
+    ``nonblocking_delays=True``, each pane waits on its own timeline instead (see
+    :mod:`~tmuxp.workspace.timeline`), and :meth:`build` returns once the slowest
+    pane is done.
     """
 
     server: "Server"
@@ -136,6 +336,12 @@ class WorkspaceBuilder:
         session_config: t.Dict[str, t.Any],
         server: Server,
         plugins: t.Optional[t.List[t.Any]] = None,
+        batch: bool = False,
+        executor: t.Optional[t.Type[PlanExecutor]] = None,
+        nonblocking_delays: bool = False,
+        snapshot: t.Optional[ServerSnapshot] = None,
+        two_phase: bool = False,
+        events: t.Optional[EventBus] = None,
     ) -> None:
         """Initialize workspace loading.
 
@@ -150,6 +356,26 @@ class WorkspaceBuilder:
         server : :class:`libtmux.Server`
             tmux server to build session in
 
+        batch : bool
+            build with :class:`~tmuxp.workspace.planner.BatchedExecutor`
+
+        executor : :class:`~tmuxp.workspace.planner.PlanExecutor` subclass, optional
+            build by running :meth:`plan` with this executor
+
+        nonblocking_delays : bool
+            run pane delays and waits without holding up other windows and panes
+
+        snapshot : :class:`~tmuxp.snapshot.ServerSnapshot`, optional
+            look up existing sessions and panes in snapshot, invalidated when
+            the workspace is built
+
+        two_phase : bool
+            create all windows and panes first, then send the panes' commands,
+            each pane from its own thread
+
+        events : :class:`~tmuxp.workspace.events.EventBus`, optional
+            bus to emit build events to, :attr:`events` subscribers get them
+
         Notes
         -----
         TODO: Initialize :class:`libtmux.Session` from here, in
@@ -167,14 +393,36 @@ class WorkspaceBuilder:
 
         self.session_config = session_config
         self.plugins = plugins
+        self.batch = batch
+        if executor is None and batch:
+            executor = BatchedExecutor
+        self.executor = executor
+        self.timelines = PaneTimelines() if nonblocking_delays else None
+        self._pane_base_index: t.Optional[int] = None
+        self.snapshot = snapshot
+        self.two_phase = two_phase
+        #: Bus of :class:`~tmuxp.workspace.events.BuildEvent` of the build
+        self.events = events if events is not None else EventBus()
+        self._journal: t.Optional[Journal] = None
+        self._progress: t.Optional[BuildProgress] = None
+        #: True if the initial window of the session created by :meth:`build` can
+        #: become its first window, options like default-size didn't change since
+        self._reuse_initial_window = False
+        #: True if the shell of the initial window predates the session environment
+        self._respawn_initial_window = False
+        #: Commands of panes, sent once the workspace's panes exist (``two_phase``)
+        self._pane_steps: t.List[t.Tuple[str, t.List[t.Callable[[], None]]]] = []
 
         if self.server is not None and self.session_exists(
             session_name=self.session_config["session_name"]
         ):
+            sessions = (
+                self.snapshot.sessions
+                if self.snapshot is not None
+                else self.server.sessions
+            )
             try:
-                session = self.server.sessions.get(
-                    session_name=self.session_config["session_name"]
-                )
+                session = sessions.get(session_name=self.session_config["session_name"])
                 assert session is not None
                 self._session = session
             except ObjectDoesNotExist:
@@ -192,6 +440,8 @@ class WorkspaceBuilder:
         assert session_name is not None
         assert isinstance(session_name, str)
         assert self.server is not None
+        if self.snapshot is not None:
+            return self.snapshot.has_session(session_name)
         exists = self.server.has_session(session_name)
         if not exists:
             return exists
@@ -217,6 +467,68 @@ class WorkspaceBuilder:
         append : bool
             append windows in current active session
         """
+        with trace.span("build", session_name=self.session_config["session_name"]):
+            self._journaled_build(session, append)
+        self.events.emit("build_finished", session_name=self.session.session_name)
+
+    def resume(self, session: t.Optional[Session] = None) -> bool:
+        """Continue the failed build of ``session``, see :mod:`~.journal`.
+
+        The window the build failed in is rebuilt, windows completed before are
+        kept. Without any completed window, the session is killed and built again.
+        Returns False if ``session`` has no journal of this workspace.
+
+        Parameters
+        ----------
+        session : :class:`libtmux.Session`, optional
+            session to resume, the workspace's session by default
+        """
+        if session is None:
+            session = self.session
+        journal = read_journal(session)
+        if journal is None or journal.digest != workspace_digest(self.session_config):
+            return False
+
+        if not journal.completed:
+            session.kill_session()
+            self._session = None
+            self.build()
+            return True
+
+        for window_id in journal.partial:
+            session.cmd("kill-window", "-t", window_id)
+        journal.partial = []
+
+        with trace.span("resume", session_name=session.session_name):
+            self._journaled_build(session, append=True, journal=journal)
+        clear_journal(session)
+        self.events.emit("build_finished", session_name=session.session_name)
+        return True
+
+    def _journaled_build(
+        self,
+        session: t.Optional[Session],
+        append: bool,
+        journal: t.Optional[Journal] = None,
+    ) -> None:
+        self._journal = journal
+        try:
+            self._build(session, append)
+        except BaseException:
+            # record the windows built so far, for resume()
+            session = getattr(self, "_session", None)
+            if self._progress is not None and session is not None:
+                self._progress.write(session)
+            raise
+        finally:
+            self._progress = None
+
+    def _build(self, session: t.Optional[Session], append: bool) -> None:
+        if self.snapshot is not None:
+            # the server changes from here on
+            self.snapshot.invalidate()
+
+        self._reuse_initial_window = False
         if not session:
             if not self.server:
                 raise exc.TmuxpException(
@@ -229,13 +541,16 @@ class WorkspaceBuilder:
                     new_session_kwargs["start_directory"] = self.session_config[
                         "start_directory"
                     ]
-                if has_gte_version("2.6"):
+                if get_capabilities().supports("new-session-size"):
                     new_session_kwargs["x"] = 800
                     new_session_kwargs["y"] = 600
-                session = self.server.new_session(
-                    session_name=self.session_config["session_name"],
-                    **new_session_kwargs,
-                )
+                with _new_session_lock:
+                    session = self.server.new_session(
+                        session_name=self.session_config["session_name"],
+                        **new_session_kwargs,
+                    )
+                self._reuse_initial_window = True
+                self.events.emit("session_created", session_name=session.session_name)
             assert session is not None
 
             assert self.session_config["session_name"] == session.name
@@ -245,6 +560,12 @@ class WorkspaceBuilder:
         assert session.name is not None
 
         self._session = session
+        self._pane_base_index = None
+        resuming = self._journal is not None
+        if self._journal is None:
+            self._journal = Journal(digest=workspace_digest(self.session_config))
+        journal = self._journal
+        self._progress = progress = BuildProgress(journal)
 
         assert session.server is not None
 
@@ -255,12 +576,12 @@ class WorkspaceBuilder:
 
         assert isinstance(session, Session)
 
-        for plugin in self.plugins:
-            plugin.before_workspace_builder(self.session)
-
         focus = None
 
-        if "before_script" in self.session_config:
+        if not resuming:
+            self._run_plugin_hook("before_workspace_builder", self.session)
+
+        if "before_script" in self.session_config and not resuming:
             try:
                 cwd = None
 
@@ -268,56 +589,305 @@ class WorkspaceBuilder:
                 # session start directory, if it exists.
                 if "start_directory" in self.session_config:
                     cwd = self.session_config["start_directory"]
-                run_before_script(self.session_config["before_script"], cwd=cwd)
+                with trace.span(
+                    "before_script", script=self.session_config["before_script"]
+                ):
+                    run_before_script(self.session_config["before_script"], cwd=cwd)
             except Exception:
                 self.session.kill_session()
                 raise
 
-        if "options" in self.session_config:
-            for option, value in self.session_config["options"].items():
-                self.session.set_option(option, value)
-
-        if "global_options" in self.session_config:
-            for option, value in self.session_config["global_options"].items():
-                self.session.set_option(option, value, _global=True)
-
-        if "environment" in self.session_config:
-            for option, value in self.session_config["environment"].items():
-                self.session.set_environment(option, value)
+        executor = self.executor if not resuming else None
+        if executor is not None:
+            unsupported = self._plan_unsupported()
+            if unsupported:
+                logger.warning(
+                    f"{executor.__name__} can't build {', '.join(unsupported)}, "
+                    "building the workspace without it"
+                )
+                executor = None
+
+        session_id = self.session.session_id
+        assert session_id is not None
+        changed_options = reconcile.apply_options(
+            self.server,
+            self.session_config.get("options", {}),
+            ["show-options", "-t", session_id],
+            ["set-option", "-t", session_id],
+        )
+        changed_options += reconcile.apply_options(
+            self.server,
+            self.session_config.get("global_options", {}),
+            ["show-options", "-g"],
+            ["set-option", "-g"],
+        )
+        if changed_options:
+            self._reuse_initial_window = False
+        self._respawn_initial_window = bool(
+            reconcile.apply_environment(
+                self.server, session_id, self.session_config.get("environment", {})
+            )
+        )
 
-        for window, window_config in self.iter_create_windows(session, append):
+        if executor is not None:
+            executor(
+                session=session,
+                hook=self._run_plugin_hook if self.plugins else None,
+                timelines=self.timelines,
+                events=self.events,
+                progress=progress,
+            ).run(self._compile_plan(session, append))
+            return
+
+        positions = {
+            id(window_config): position
+            for position, window_config in enumerate(self.session_config["windows"], 1)
+        }
+
+        lazy_windows = []
+        for window, window_config in self.iter_create_windows(
+            session, append, skip=journal.completed
+        ):
             assert isinstance(window, Window)
+            assert window.window_id is not None
+            progress.window_created(window.window_id)
 
-            for plugin in self.plugins:
-                plugin.on_window_create(window)
-
-            focus_pane = None
-            for pane, pane_config in self.iter_create_panes(window, window_config):
-                assert isinstance(pane, Pane)
-                pane = pane
-
-                if "layout" in window_config:
-                    window.select_layout(window_config["layout"])
+            self._run_plugin_hook("on_window_create", window)
 
-                if "focus" in pane_config and pane_config["focus"]:
-                    focus_pane = pane
+            if window_config.get("lazy"):
+                window.cmd(
+                    "set-option",
+                    "-w",
+                    LAZY_WINDOW_OPTION,
+                    json.dumps(window_config, default=str),
+                )
+                lazy_windows.append(window.window_id)
+            else:
+                with trace.span("create panes", window_name=window.window_name):
+                    self._create_window_panes(window, window_config)
 
             if "focus" in window_config and window_config["focus"]:
                 focus = window
 
-            self.config_after_window(window, window_config)
+            # lazy windows are finished once they're materialized
+            if not window_config.get("lazy"):
+                self._run_plugin_hook("after_window_finished", window)
 
-            for plugin in self.plugins:
-                plugin.after_window_finished(window)
-
-            if focus_pane:
-                focus_pane.select_pane()
+            # completed once the pane timelines started for it finished too
+            progress.window_built(window.window_id, positions[id(window_config)])
 
         if focus:
             focus.select_window()
 
+        self._send_pane_steps()
+
+        if lazy_windows:
+            if self.plugins:
+                self.session.cmd(
+                    "set-option",
+                    LAZY_PLUGINS_OPTION,
+                    json.dumps(
+                        [
+                            f"{type(plugin).__module__}.{type(plugin).__qualname__}"
+                            for plugin in self.plugins
+                        ]
+                    ),
+                )
+            # build the selected window now, then set the hook for the others, so
+            # the hook doesn't race with building it
+            attached_window = self.session.attached_window
+            if attached_window.window_id in lazy_windows:
+                self.materialize_window(attached_window)
+                lazy_windows.remove(attached_window.window_id)
+            if lazy_windows:
+                self.session.cmd("set-hook", LAZY_WINDOW_HOOK, _lazy_hook_command())
+
+        if self.timelines is not None:
+            self.timelines.join()
+
+    def plan(self, session: t.Optional[Session] = None, append: bool = False) -> Plan:
+        """Return :class:`~tmuxp.workspace.planner.Plan` building the workspace.
+
+        Parameters
+        ----------
+        session : :class:`libtmux.Session`, optional
+            session the plan will run in, a new session if not passed
+        append : bool
+            append windows in current active session
+        """
+        return compile_workspace(
+            self.session_config,
+            replace_first_window=(
+                self.first_window_pass(1, session, append)
+                if session is not None
+                else not append
+            ),
+            environment=get_capabilities().supports("new-window-environment"),
+        )
+
+    def _compile_plan(self, session: Session, append: bool) -> Plan:
+        """Return plan building the workspace in ``session``, as :meth:`build` does.
+
+        Session options and environment are already applied, and the session's
+        initial window is reused as in :meth:`iter_create_windows`.
+        """
+        return compile_workspace(
+            self.session_config,
+            replace_first_window=self.first_window_pass(1, session, append),
+            environment=get_capabilities().supports("new-window-environment"),
+            session_options=False,
+            reuse_first_window=(
+                session.attached_window.window_index
+                if self._reuse_initial_window
+                else None
+            ),
+            respawn_first_window=self._respawn_initial_window,
+        )
+
+    def _plan_unsupported(self) -> t.List[str]:
+        """Return features of the build a :class:`~.planner.Plan` can't express."""
+        unsupported = []
+        windows = self.session_config["windows"]
+        if any(window_config.get("lazy") for window_config in windows):
+            unsupported.append("lazy windows")
+        if self.two_phase:
+            unsupported.append("two-phase builds")
+        return unsupported
+
+    def sync(self, session: t.Optional[Session] = None) -> Plan:
+        """Create what's missing from a running session, return the plan that ran.
+
+        Missing windows and panes are created and changed options set, see
+        :func:`~tmuxp.workspace.reconcile.compile_sync`. Runs with ``executor``,
+        :class:`~tmuxp.workspace.planner.SequentialExecutor` by default.
+
+        Parameters
+        ----------
+        session : :class:`libtmux.Session`, optional
+            session to sync, the workspace's session by default
+        """
+        if session is None:
+            session = self.session
+        self._session = session
+        if self.snapshot is not None:
+            self.snapshot.invalidate()
+
+        plan, windows = reconcile.compile_sync(
+            session,
+            self.session_config,
+            environment=get_capabilities().supports("new-window-environment"),
+        )
+        executor = (self.executor or SequentialExecutor)(
+            session=session,
+            hook=self._run_plugin_hook if self.plugins else None,
+            timelines=self.timelines,
+        )
+        executor.windows.update(windows)
+        executor.run(plan)
+        return plan
+
+    def materialize_window(self, window: Window) -> bool:
+        """Create the panes of lazy ``window``, return False if it's not lazy.
+
+        Lazy windows (``lazy: true``) are created with only their first pane,
+        their workspace config kept in the window's ``@tmuxp_lazy`` option. The
+        rest is built when the window is first selected, by a
+        ``session-window-changed`` hook running ``tmuxp materialize``. The hook is
+        unset once no lazy windows are left.
+
+        Plugins' ``after_window_finished`` runs once the window is built.
+        ``tmuxp materialize`` loads the plugins recorded in the session's
+        ``@tmuxp_plugins`` option.
+
+        Parameters
+        ----------
+        window : :class:`libtmux.Window`
+            window to build
+        """
+        assert window.window_id is not None
+        # read and unset in one tmux command, so when hooks of windows selected
+        # one after the other run several ``tmuxp materialize``, one builds it
+        proc = window.server.cmd(
+            "show-options",
+            "-wqv",
+            "-t",
+            window.window_id,
+            LAZY_WINDOW_OPTION,
+            ";",
+            "set-option",
+            "-wqu",
+            "-t",
+            window.window_id,
+            LAZY_WINDOW_OPTION,
+        )
+        if not proc.stdout:
+            return False
+        window_config = json.loads("\n".join(proc.stdout))
+
+        shell = _window_shell(window_config)
+        if shell:
+            # placeholders are created with the default shell
+            respawn_args = ["-k"]
+            environment = window_config["panes"][0].get(
+                "environment", window_config.get("environment")
+            )
+            if environment and get_capabilities().supports("new-window-environment"):
+                for key, value in environment.items():
+                    respawn_args.extend(["-e", f"{key}={value}"])
+            window.cmd("respawn-pane", *respawn_args, shell)
+
+        self._create_window_panes(window, window_config)
+        self._send_pane_steps()
+        self._run_plugin_hook("after_window_finished", window)
+
+        remaining = window.session.cmd(
+            "list-windows", "-F", f"#{{?{LAZY_WINDOW_OPTION},1,}}"
+        ).stdout
+        if not any(remaining):
+            window.session.cmd("set-hook", "-u", LAZY_WINDOW_HOOK)
+            window.session.cmd("set-option", "-qu", LAZY_PLUGINS_OPTION)
+        return True
+
+    def _create_window_panes(
+        self, window: Window, window_config: t.Dict[str, t.Any]
+    ) -> None:
+        focus_pane = None
+        for pane, pane_config in self.iter_create_panes(window, window_config):
+            assert isinstance(pane, Pane)
+
+            if "focus" in pane_config and pane_config["focus"]:
+                focus_pane = pane
+
+        self.config_after_window(window, window_config)
+
+        if focus_pane:
+            focus_pane.select_pane()
+
+    def _send_pane_steps(self) -> None:
+        """Send the commands of panes deferred by ``two_phase``, concurrently.
+
+        Each pane's commands are sent in order as one task of a
+        :class:`~tmuxp.workspace.timeline.PaneTimelines` pool, so shells start
+        in parallel.
+        """
+        if not self._pane_steps:
+            return
+        timelines = self.timelines if self.timelines is not None else PaneTimelines()
+        for pane_id, steps in self._pane_steps:
+            timelines.start(pane_id, steps)
+        self._pane_steps = []
+        timelines.join()
+
+    def _run_plugin_hook(self, hook: str, target: t.Union[Session, Window]) -> None:
+        for plugin in self.plugins:
+            with trace.span(f"{plugin.__class__.__name__}.{hook}", cat="plugin"):
+                getattr(plugin, hook)(target)
+
     def iter_create_windows(
-        self, session: Session, append: bool = False
+        self,
+        session: Session,
+        append: bool = False,
+        skip: t.Container[int] = (),
     ) -> t.Iterator[t.Any]:
         """Return :class:`libtmux.Window` iterating through session config dict.
 
@@ -332,6 +902,8 @@ class WorkspaceBuilder:
             session to create windows in
         append : bool
             append windows in current active session
+        skip : container of int
+            positions (from 1) of windows not to create
 
         Returns
         -------
@@ -342,16 +914,27 @@ class WorkspaceBuilder:
         for window_iterator, window_config in enumerate(
             self.session_config["windows"], start=1
         ):
+            if window_iterator in skip:
+                continue
+
             window_name = window_config.get("window_name", None)
 
             is_first_window_pass = self.first_window_pass(
                 window_iterator, session, append
             )
 
-            w1 = None
-            if is_first_window_pass:  # if first window, use window 1
-                w1 = session.attached_window
-                w1.move_window("99")
+            # tmux holds off automatic renames of a window just named, like the
+            # initial window, so windows renaming themselves replace it instead
+            reuse_first_window = (
+                is_first_window_pass
+                and self._reuse_initial_window
+                and not (
+                    isinstance(window_config.get("options"), dict)
+                    and window_config["options"].get("automatic-rename")
+                )
+            )
+            if is_first_window_pass and not reuse_first_window:
+                session.attached_window.move_window("99")
 
             start_directory = window_config.get("start_directory", None)
 
@@ -360,17 +943,15 @@ class WorkspaceBuilder:
             if panes and "start_directory" in panes[0]:
                 start_directory = panes[0]["start_directory"]
 
-            window_shell = window_config.get("window_shell", None)
-
-            # If the first pane specifies a shell, use that instead.
-            try:
-                if window_config["panes"][0]["shell"] != "":
-                    window_shell = window_config["panes"][0]["shell"]
-            except (KeyError, IndexError):
-                pass
+            # lazy windows start their shell when they're built
+            window_shell = (
+                None if window_config.get("lazy") else _window_shell(window_config)
+            )
 
             environment = panes[0].get("environment", window_config.get("environment"))
-            if environment and has_lt_version("3.0"):
+            if environment and not get_capabilities().supports(
+                "new-window-environment"
+            ):
                 # Falling back to use the environment of the first pane for the window
                 # creation is nice but yields misleading error messages.
                 pane_env = panes[0].get("environment")
@@ -387,24 +968,48 @@ class WorkspaceBuilder:
                 )
                 environment = None
 
-            window = session.new_window(
-                window_name=window_name,
-                start_directory=start_directory,
-                attach=False,  # do not move to the new window
-                window_index=window_config.get("window_index", ""),
-                window_shell=window_shell,
-                environment=environment,
-            )
+            with trace.span("create window", window_name=window_name):
+                if reuse_first_window:
+                    # the session's initial window becomes the first window, its
+                    # shell is only replaced if it isn't started as configured
+                    window = _reuse_window(
+                        session.attached_window,
+                        window_name=window_name,
+                        start_directory=start_directory,
+                        window_index=window_config.get("window_index", ""),
+                        window_shell=window_shell,
+                        environment=environment,
+                        respawn=bool(
+                            window_shell
+                            or environment
+                            or self._respawn_initial_window
+                            or (
+                                start_directory
+                                and start_directory
+                                != self.session_config.get("start_directory")
+                            )
+                        ),
+                    )
+                else:
+                    window = _new_window(
+                        session,
+                        window_name=window_name,
+                        start_directory=start_directory,
+                        window_index=window_config.get("window_index", ""),
+                        window_shell=window_shell,
+                        environment=environment,
+                    )
             assert isinstance(window, Window)
 
-            if is_first_window_pass:  # if first window, use window 1
+            if is_first_window_pass and not reuse_first_window:
                 session.attached_window.kill_window()
 
+            self._emit_window("window_created", window)
+
             if "options" in window_config and isinstance(
                 window_config["options"], dict
             ):
-                for key, val in window_config["options"].items():
-                    window.set_window_option(key, val)
+                self._apply_window_options(window, window_config["options"])
 
             if "focus" in window_config and window_config["focus"]:
                 window.select_window()
@@ -433,12 +1038,21 @@ class WorkspaceBuilder:
         """
         assert isinstance(window, Window)
 
-        pane_base_index_str = window.show_window_option("pane-base-index", g=True)
-        assert pane_base_index_str is not None
-        pane_base_index = int(pane_base_index_str)
+        # global option, the same for all windows of the build
+        if self._pane_base_index is None:
+            pane_base_index_str = window.show_window_option("pane-base-index", g=True)
+            assert pane_base_index_str is not None
+            self._pane_base_index = int(pane_base_index_str)
+        pane_base_index = self._pane_base_index
 
         pane = None
 
+        spec = window_config.get("layout")
+        if not layouts.is_layout_spec(spec):
+            spec = None
+        else:
+            layouts.validate_layout(spec, len(window_config["panes"]))
+
         for pane_index, pane_config in enumerate(
             window_config["panes"], start=pane_base_index
         ):
@@ -469,7 +1083,9 @@ class WorkspaceBuilder:
                 environment = pane_config.get(
                     "environment", window_config.get("environment")
                 )
-                if environment and has_lt_version("3.0"):
+                if environment and not get_capabilities().supports(
+                    "new-window-environment"
+                ):
                     # Just issue a warning when the environment comes from the pane
                     # configuration as a warning for the window was already issued when
                     # the window was created.
@@ -481,25 +1097,48 @@ class WorkspaceBuilder:
                     environment = None
 
                 assert pane is not None
+                assert pane.pane_id is not None
 
-                pane = window.split_window(
-                    attach=True,
-                    start_directory=get_pane_start_directory(
-                        pane_config=pane_config,
-                        window_config=window_config,
-                    ),
-                    shell=get_pane_shell(
-                        pane_config=pane_config,
-                        window_config=window_config,
-                    ),
-                    target=pane.id,
-                    environment=environment,
-                )
+                vertical, percent = True, None
+                if spec is not None:
+                    flag, _, size = layouts.split_args(
+                        spec, pane_index - pane_base_index, len(window_config["panes"])
+                    )
+                    vertical, percent = flag == "-v", int(size)
+
+                with trace.span(
+                    "create pane", window_name=window.window_name, pane_index=pane_index
+                ):
+                    pane = _split_window(
+                        window,
+                        start_directory=get_pane_start_directory(
+                            pane_config=pane_config,
+                            window_config=window_config,
+                        ),
+                        shell=get_pane_shell(
+                            pane_config=pane_config,
+                            window_config=window_config,
+                        ),
+                        target=pane.pane_id,
+                        vertical=vertical,
+                        percent=percent,
+                        environment=environment,
+                    )
 
             assert isinstance(pane, Pane)
+            self.events.emit(
+                "pane_created",
+                session_name=pane.session_name,
+                window_id=pane.window_id,
+                window_name=window.window_name,
+                pane_id=pane.pane_id,
+            )
 
-            if "layout" in window_config:
+            if "layout" in window_config and spec is None:
                 window.select_layout(window_config["layout"])
+                self._emit_window(
+                    "layout_applied", window, layout=window_config["layout"]
+                )
 
             if "suppress_history" in pane_config:
                 suppress = pane_config["suppress_history"]
@@ -511,18 +1150,83 @@ class WorkspaceBuilder:
             enter = pane_config.get("enter", True)
             sleep_before = pane_config.get("sleep_before", None)
             sleep_after = pane_config.get("sleep_after", None)
+            wait_for = pane_config.get("wait_for", None)
+            commands: t.List[t.Dict[str, t.Any]] = []
             for cmd in pane_config["shell_command"]:
                 enter = cmd.get("enter", enter)
                 sleep_before = cmd.get("sleep_before", sleep_before)
                 sleep_after = cmd.get("sleep_after", sleep_after)
+                # the pane's condition only applies to its first command
+                wait_for, condition = None, cmd.get("wait_for", wait_for)
+                commands.append(
+                    {
+                        "cmd": cmd["cmd"],
+                        "enter": enter,
+                        "sleep_before": sleep_before,
+                        "sleep_after": sleep_after,
+                        "wait_for": condition,
+                    }
+                )
+
+            send: t.Callable[..., None] = self._send_keys
+            if pane_config.get("paste", window_config.get("paste", False)):
+                send = self._paste_commands
+                commands = paste.join_commands(commands)
+
+            timeline: t.List[t.Callable[[], None]] = []
+            for command in commands:
+                steps: t.List[t.Callable[[], None]] = []
+                if command["sleep_before"] is not None:
+                    steps.append(functools.partial(time.sleep, command["sleep_before"]))
+
+                if command["wait_for"] is not None:
+                    assert pane.pane_id is not None
+                    steps.append(
+                        functools.partial(
+                            readiness.wait_for,
+                            self.server,
+                            pane.pane_id,
+                            command["wait_for"],
+                        )
+                    )
+
+                steps.append(
+                    functools.partial(
+                        send,
+                        pane,
+                        command["cmd"],
+                        suppress_history=suppress,
+                        enter=command["enter"],
+                    )
+                )
 
-                if sleep_before is not None:
-                    time.sleep(sleep_before)
+                if command["sleep_after"] is not None:
+                    steps.append(functools.partial(time.sleep, command["sleep_after"]))
 
-                pane.send_keys(cmd["cmd"], suppress_history=suppress, enter=enter)
+                # from the first delay on, the pane's steps run on its timeline
+                if self.two_phase or (
+                    self.timelines is not None and (timeline or len(steps) > 1)
+                ):
+                    timeline.extend(steps)
+                else:
+                    for step in steps:
+                        step()
 
-                if sleep_after is not None:
-                    time.sleep(sleep_after)
+            if timeline:
+                assert pane.pane_id is not None
+                if self._progress is not None:
+                    assert window.window_id is not None
+                    self._progress.timeline_started(window.window_id)
+                    timeline.append(
+                        functools.partial(
+                            self._progress.timeline_finished, window.window_id
+                        )
+                    )
+                if self.two_phase:
+                    self._pane_steps.append((pane.pane_id, timeline))
+                else:
+                    assert self.timelines is not None
+                    self.timelines.start(pane.pane_id, timeline)
 
             if "focus" in pane_config and pane_config["focus"]:
                 assert pane.pane_id is not None
@@ -530,6 +1234,55 @@ class WorkspaceBuilder:
 
             yield pane, pane_config
 
+        if spec is not None:
+            window_size = window.cmd(
+                "display-message", "-p", layouts.WINDOW_SIZE_FORMAT
+            ).stdout
+            width, height, panes = (int(value) for value in window_size[0].split())
+            layout = layouts.layout_string(spec, panes, width, height)
+            window.select_layout(layout)
+            self._emit_window("layout_applied", window, layout=layout)
+
+    def _send_keys(
+        self, pane: Pane, cmd: str, suppress_history: bool, enter: bool
+    ) -> None:
+        pane.send_keys(cmd, suppress_history=suppress_history, enter=enter)
+        self.events.emit(
+            "command_sent",
+            session_name=pane.session_name,
+            window_id=pane.window_id,
+            pane_id=pane.pane_id,
+            command=cmd,
+        )
+
+    def _paste_commands(
+        self, pane: Pane, cmds: t.List[str], suppress_history: bool, enter: bool
+    ) -> None:
+        assert pane.pane_id is not None
+        prefix = " " if suppress_history else ""
+        paste.paste_commands(
+            self.server, pane.pane_id, [prefix + cmd for cmd in cmds], enter=enter
+        )
+        for cmd in cmds:
+            self.events.emit(
+                "command_sent",
+                session_name=pane.session_name,
+                window_id=pane.window_id,
+                pane_id=pane.pane_id,
+                command=cmd,
+            )
+
+    def _emit_window(
+        self, kind: "EventKind", window: Window, **fields: t.Optional[str]
+    ) -> None:
+        self.events.emit(
+            kind,
+            session_name=window.session_name,
+            window_id=window.window_id,
+            window_name=window.window_name,
+            **fields,
+        )
+
     def config_after_window(
         self, window: Window, window_config: t.Dict[str, t.Any]
     ) -> None:
@@ -549,26 +1302,38 @@ class WorkspaceBuilder:
         if "options_after" in window_config and isinstance(
             window_config["options_after"], dict
         ):
-            for key, val in window_config["options_after"].items():
-                window.set_window_option(key, val)
+            self._apply_window_options(window, window_config["options_after"])
+
+    def _apply_window_options(
+        self, window: Window, options: t.Dict[str, t.Any]
+    ) -> None:
+        assert window.window_id is not None
+        reconcile.apply_options(
+            self.server,
+            options,
+            ["show-window-options", "-t", window.window_id],
+            ["set-window-option", "-t", window.window_id],
+        )
 
     def find_current_attached_session(self) -> Session:
         """Return current attached session."""
         assert self.server is not None
 
-        current_active_pane = get_current_pane(self.server)
+        current_active_pane = get_current_pane(self.server, snapshot=self.snapshot)
 
         if current_active_pane is None:
             raise exc.ActiveSessionMissingWorkspaceException()
 
+        sessions = (
+            self.snapshot.sessions
+            if self.snapshot is not None
+            else self.server.sessions
+        )
         return next(
-            (
-                s
-                for s in self.server.sessions
-                if s.session_id == current_active_pane.session_id
-            ),
+            (s for s in sessions if s.session_id == current_active_pane.session_id),
         )
 
     def first_window_pass(self, i: int, session: Session, append: bool) -> bool:
         """Return True first window, used when iterating session windows."""
-        return len(session.windows) == 1 and i == 1 and not append
+        # only list the session's windows for the first window
+        return i == 1 and not append and len(session.windows) == 1
@@ -0,0 +1,190 @@
+r"""Cache of expanded and trickled workspaces, for ``tmuxp load --cache``.
+
+Loading a workspace parses its file, then :func:`~tmuxp.workspace.loader.normalize`
+resolves shell variables and start directories and propagates settings to windows
+and panes.
+The result only depends on the file, where it's loaded from and the environment
+variables it references, :func:`cache_key` hashes those. Results are pickled to
+the ``workspaces`` directory in :func:`~tmuxp.capabilities.get_cache_dir`, the
+least recently used are removed once the directory grows beyond
+:data:`MAX_CACHE_SIZE`.
+
+>>> workspace_file = tmp_path / "cached.yaml"
+>>> _ = workspace_file.write_text("session_name: cached\nwindows:\n- panes: [top]\n")
+>>> key = cache_key(workspace_file)
+>>> load(key, cache_dir=tmp_path) is None
+True
+
+>>> store(key, {"session_name": "cached", "windows": []}, cache_dir=tmp_path)
+>>> load(key, cache_dir=tmp_path)
+{'session_name': 'cached', 'windows': []}
+
+Changing the file changes the key:
+
+>>> _ = workspace_file.write_text("session_name: changed\nwindows: []\n")
+>>> cache_key(workspace_file) == key
+False
+"""
+
+import hashlib
+import logging
+import os
+import pathlib
+import pickle
+import re
+import tempfile
+import typing as t
+
+from libtmux import exc as libtmux_exc
+
+from .. import __about__
+from ..capabilities import get_cache_dir, get_capabilities
+
+if t.TYPE_CHECKING:
+    from ..types import StrPath
+
+logger = logging.getLogger(__name__)
+
+#: Directory in :func:`~tmuxp.capabilities.get_cache_dir` holding the entries
+CACHE_SUBDIR = "workspaces"
+
+#: Bytes of cached workspaces kept, the least recently used are removed beyond
+MAX_CACHE_SIZE = 8 * 1024 * 1024
+
+_ENV_VARIABLE = re.compile(r"\$(?:\{(\w+)\}|(\w+))")
+
+
+def referenced_variables(text: str) -> t.List[str]:
+    r"""Return names of environment variables ``text`` references, sorted.
+
+    ``HOME`` is always included, ``~`` expands to it.
+
+    >>> referenced_variables("start_directory: ${PROJECTS}/app\ncmd: echo $USER")
+    ['HOME', 'PROJECTS', 'USER']
+    """
+    names = {"HOME"}
+    for braced, plain in _ENV_VARIABLE.findall(text):
+        names.add(braced or plain)
+    return sorted(names)
+
+
+def cache_key(workspace_file: "StrPath") -> str:
+    """Return cache key of ``workspace_file``, loaded from the current directory.
+
+    Hashes the file's content and path, the current directory, the environment
+    variables it references, the tmuxp version and the tmux version, which
+    decides the shell of ``exec`` panes.
+    """
+    path = pathlib.Path(workspace_file)
+    content = path.read_bytes()
+
+    try:
+        tmux_version = str(get_capabilities().version)
+    except libtmux_exc.TmuxCommandNotFound:
+        tmux_version = ""
+
+    digest = hashlib.sha256()
+    for part in [
+        __about__.__version__,
+        tmux_version,
+        str(path.resolve()),
+        str(pathlib.Path.cwd()),
+    ]:
+        digest.update(part.encode() + b"\0")
+    for name in referenced_variables(content.decode(errors="replace")):
+        digest.update(f"{name}={os.environ.get(name)!r}".encode() + b"\0")
+    digest.update(content)
+    return digest.hexdigest()
+
+
+def _cache_dir(cache_dir: t.Optional[pathlib.Path]) -> pathlib.Path:
+    return (cache_dir or get_cache_dir()) / CACHE_SUBDIR
+
+
+def load(
+    key: str, cache_dir: t.Optional[pathlib.Path] = None
+) -> t.Optional[t.Dict[str, t.Any]]:
+    r"""Return workspace cached under ``key``, None if there is none.
+
+    Entries that can't be unpickled, whatever the error, are a miss and removed:
+
+    >>> entry = tmp_path / CACHE_SUBDIR / "broken.pickle"
+    >>> entry.parent.mkdir()
+    >>> _ = entry.write_bytes(b"cnonexistent_module\nWorkspace\n.")
+    >>> load("broken", cache_dir=tmp_path) is None
+    True
+    >>> entry.exists()
+    False
+    """
+    path = _cache_dir(cache_dir) / f"{key}.pickle"
+    try:
+        with path.open("rb") as f:
+            workspace = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.debug(f"removing unreadable cached workspace {path}: {e}")
+        _remove(path)
+        return None
+    if not isinstance(workspace, dict):
+        logger.debug(f"removing cached workspace {path}, not a workspace")
+        _remove(path)
+        return None
+
+    # used, so it's evicted last, e.g. read-only caches are still used as is
+    try:
+        os.utime(path)
+    except OSError as e:
+        logger.debug(f"couldn't mark cached workspace {path} used: {e}")
+    return workspace
+
+
+def _remove(path: pathlib.Path) -> None:
+    try:
+        path.unlink(missing_ok=True)
+    except OSError as e:
+        logger.debug(f"couldn't remove cached workspace {path}: {e}")
+
+
+def store(
+    key: str,
+    workspace: t.Dict[str, t.Any],
+    cache_dir: t.Optional[pathlib.Path] = None,
+    max_size: t.Optional[int] = None,
+) -> None:
+    """Cache ``workspace`` under ``key``, evict entries beyond ``max_size`` bytes.
+
+    ``max_size`` defaults to :data:`MAX_CACHE_SIZE`. Failing to write the cache
+    is logged, loading goes on without it.
+    """
+    directory = _cache_dir(cache_dir)
+    path = directory / f"{key}.pickle"
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        # written aside and renamed, loads running at the same time see all of it
+        fd, tmp_name = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(workspace, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pathlib.Path(tmp_name).replace(path)
+    except OSError as e:
+        logger.debug(f"could not cache workspace to {path}: {e}")
+        return
+    evict(directory, max_size or MAX_CACHE_SIZE)
+
+
+def evict(directory: pathlib.Path, max_size: int) -> None:
+    """Remove the least recently used entries of ``directory`` beyond ``max_size``."""
+    entries = []
+    for path in directory.glob("*.pickle"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    size = sum(entry_size for _, entry_size, _ in entries)
+    for _, entry_size, path in sorted(entries):
+        if size <= max_size:
+            break
+        path.unlink(missing_ok=True)
+        size -= entry_size
@@ -0,0 +1,127 @@
+"""Events of a workspace build, for progress displays and metrics.
+
+:class:`~tmuxp.workspace.builder.WorkspaceBuilder` emits a :class:`BuildEvent` to
+its :class:`EventBus` as it creates the session, each window and pane, sends
+commands and applies layouts. Subscribers are plain callables, no
+:class:`~tmuxp.plugin.TmuxpPlugin` is needed. They're called from a thread of the
+bus, so a slow subscriber doesn't hold up the build.
+
+>>> bus = EventBus()
+>>> received = []
+>>> unsubscribe = bus.subscribe(received.append)
+>>> bus.emit("window_created", session_name="dev", window_name="editor")
+>>> bus.flush()
+>>> [(event.kind, event.window_name) for event in received]
+[('window_created', 'editor')]
+
+>>> unsubscribe()
+>>> bus.emit("build_finished", session_name="dev")
+>>> bus.flush()
+>>> len(received)
+1
+"""
+
+import dataclasses
+import logging
+import queue
+import threading
+import time
+import typing as t
+
+if t.TYPE_CHECKING:
+    from typing_extensions import TypeAlias
+
+    EventKind: TypeAlias = t.Literal[
+        "session_created",
+        "window_created",
+        "pane_created",
+        "command_sent",
+        "layout_applied",
+        "build_finished",
+    ]
+
+logger = logging.getLogger(__name__)
+
+#: Callable receiving build events
+Subscriber = t.Callable[["BuildEvent"], None]
+
+
+@dataclasses.dataclass(frozen=True)
+class BuildEvent:
+    """Something that happened building a workspace, at ``timestamp``.
+
+    ``kind`` is one of ``session_created``, ``window_created``, ``pane_created``,
+    ``command_sent`` (``command`` sent to pane ``pane_id``), ``layout_applied``
+    (``layout`` of window ``window_id``) or ``build_finished``.
+    """
+
+    kind: "EventKind"
+    #: :func:`time.time` of the event
+    timestamp: float
+    session_name: t.Optional[str] = None
+    window_id: t.Optional[str] = None
+    window_name: t.Optional[str] = None
+    pane_id: t.Optional[str] = None
+    command: t.Optional[str] = None
+    layout: t.Optional[str] = None
+
+
+class EventBus:
+    """Delivers :class:`BuildEvent` to subscribers from a thread of its own.
+
+    Emitting without subscribers does nothing. Errors of subscribers are logged,
+    they don't stop the build.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: t.List[Subscriber] = []
+        self._queue: "queue.Queue[BuildEvent]" = queue.Queue()
+        self._thread: t.Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, subscriber: Subscriber) -> t.Callable[[], None]:
+        """Call ``subscriber`` with each event emitted from now on.
+
+        Returns function unsubscribing it.
+        """
+        with self._lock:
+            self._subscribers.append(subscriber)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._deliver, name="tmuxp-events", daemon=True
+                )
+                self._thread.start()
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if subscriber in self._subscribers:
+                    self._subscribers.remove(subscriber)
+
+        return unsubscribe
+
+    def emit(self, kind: "EventKind", **fields: t.Optional[str]) -> None:
+        """Queue event ``kind`` with ``fields`` for the subscribers."""
+        if not self._subscribers:
+            return
+        self._queue.put(BuildEvent(kind=kind, timestamp=time.time(), **fields))
+
+    def flush(self) -> None:
+        """Wait until subscribers received every event emitted so far."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _deliver(self) -> None:
+        while True:
+            event = self._queue.get()
+            with self._lock:
+                subscribers = list(self._subscribers)
+            for subscriber in subscribers:
+                _notify(subscriber, event)
+            self._queue.task_done()
+
+
+def _notify(subscriber: Subscriber, event: BuildEvent) -> None:
+    try:
+        subscriber(event)
+    except Exception:
+        logger.exception(f"event subscriber {subscriber!r} failed")
@@ -1,11 +1,9 @@
 """Tmux session freezing functionality for tmuxp."""
 import typing as t
 
-from libtmux.pane import Pane
 from libtmux.session import Session
 
-if t.TYPE_CHECKING:
-    from libtmux.window import Window
+from ..snapshot import ServerSnapshot
 
 
 def inline(workspace_dict: t.Dict[str, t.Any]) -> t.Any:
@@ -49,13 +47,18 @@ def inline(workspace_dict: t.Dict[str, t.Any]) -> t.Any:
     return workspace_dict
 
 
-def freeze(session: Session) -> t.Dict[str, t.Any]:
+def freeze(
+    session: Session, snapshot: t.Optional[ServerSnapshot] = None
+) -> t.Dict[str, t.Any]:
     """Freeze live tmux session into a tmuxp workspacee.
 
     Parameters
     ----------
     session : :class:`libtmux.Session`
         session object
+    snapshot : :class:`~tmuxp.snapshot.ServerSnapshot`, optional
+        read windows and panes from snapshot, instead of listing them for each
+        window
 
     Returns
     -------
@@ -67,7 +70,11 @@ def freeze(session: Session) -> t.Dict[str, t.Any]:
         "windows": [],
     }
 
-    for window in session.windows:
+    if snapshot is None:
+        snapshot = ServerSnapshot(session.server)
+
+    for window in snapshot.windows_of(session):
+        panes = snapshot.panes_of(window)
         window_config: t.Dict[str, t.Any] = {
             "options": window.show_window_options(),
             "window_name": window.name,
@@ -80,13 +87,10 @@ def freeze(session: Session) -> t.Dict[str, t.Any]:
 
         # If all panes have same path, set 'start_directory' instead
         # of using 'cd' shell commands.
-        def pane_has_same_path(window: "Window", pane: Pane) -> bool:
-            return window.panes[0].pane_current_path == pane.pane_current_path
-
-        if all(pane_has_same_path(window=window, pane=pane) for pane in window.panes):
-            window_config["start_directory"] = window.panes[0].pane_current_path
+        if all(pane.pane_current_path == panes[0].pane_current_path for pane in panes):
+            window_config["start_directory"] = panes[0].pane_current_path
 
-        for pane in window.panes:
+        for pane in panes:
             pane_config: t.Union[str, t.Dict[str, t.Any]] = {"shell_command": []}
             assert isinstance(pane_config, dict)
 
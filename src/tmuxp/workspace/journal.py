@@ -0,0 +1,140 @@
+"""Journal of a failed build, to resume it with ``tmuxp load --resume``.
+
+When :meth:`~tmuxp.workspace.builder.WorkspaceBuilder.build` fails or is
+interrupted part way, the windows it completed are recorded in the session's
+``@tmuxp_journal`` option. :meth:`~tmuxp.workspace.builder.WorkspaceBuilder.resume`
+then rebuilds the window that failed and builds the rest, keeping the completed
+windows and what runs in them.
+
+The journal records the :func:`~tmuxp.workspace.pool.workspace_digest` of the
+workspace, a journal of a different version of the workspace isn't resumed.
+
+:class:`BuildProgress` keeps the journal as windows are built. With two-phase
+builds, non-blocking delays or a plan executor, a window completes once its panes'
+commands have all been sent, which can be after later windows were created.
+"""
+
+import dataclasses
+import json
+import logging
+import threading
+import typing as t
+
+if t.TYPE_CHECKING:
+    from libtmux.session import Session
+
+logger = logging.getLogger(__name__)
+
+#: Session user option holding the journal of a failed build
+JOURNAL_OPTION = "@tmuxp_journal"
+
+
+@dataclasses.dataclass
+class Journal:
+    """Progress of a build.
+
+    >>> journal = Journal(digest="0123456789ab", completed=[1, 2], partial=["@3"])
+    >>> Journal.from_json(journal.to_json()) == journal
+    True
+    """
+
+    #: :func:`~tmuxp.workspace.pool.workspace_digest` of the workspace built
+    digest: str
+    #: Positions (from 1) in ``windows`` of the windows built completely
+    completed: t.List[int] = dataclasses.field(default_factory=list)
+    #: Ids of the windows created, but not completed, when the build stopped
+    partial: t.List[str] = dataclasses.field(default_factory=list)
+
+    def to_json(self) -> str:
+        """Return journal as JSON."""
+        return json.dumps(dataclasses.asdict(self))
+
+    @classmethod
+    def from_json(cls, data: str) -> "Journal":
+        """Return journal from :meth:`to_json`."""
+        return cls(**json.loads(data))
+
+
+class BuildProgress:
+    """Record windows in ``journal`` as they're created and completed.
+
+    A window is completed once it's built and the pane timelines started for it
+    have finished. Timelines run in threads of their own, so do the calls.
+
+    >>> progress = BuildProgress(Journal(digest="0123456789ab"))
+    >>> progress.window_created("@1")
+    >>> progress.timeline_started("@1")
+    >>> progress.window_built("@1", position=1)
+    >>> progress.journal
+    Journal(digest='0123456789ab', completed=[], partial=['@1'])
+    >>> progress.timeline_finished("@1")
+    >>> progress.journal
+    Journal(digest='0123456789ab', completed=[1], partial=[])
+    """
+
+    def __init__(self, journal: Journal) -> None:
+        self.journal = journal
+        self._timelines: t.Dict[str, int] = {}
+        self._built: t.Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def window_created(self, window_id: str) -> None:
+        """Record window ``window_id`` as created."""
+        with self._lock:
+            self.journal.partial.append(window_id)
+
+    def timeline_started(self, window_id: str) -> None:
+        """Record a pane timeline started for window ``window_id``."""
+        with self._lock:
+            self._timelines[window_id] = self._timelines.get(window_id, 0) + 1
+
+    def timeline_finished(self, window_id: str) -> None:
+        """Record a pane timeline of window ``window_id`` as finished."""
+        with self._lock:
+            self._timelines[window_id] -= 1
+            self._complete(window_id)
+
+    def window_built(self, window_id: str, position: int) -> None:
+        """Record window ``window_id`` at ``position`` (from 1) as built."""
+        with self._lock:
+            self._built[window_id] = position
+            self._complete(window_id)
+
+    def _complete(self, window_id: str) -> None:
+        if self._timelines.get(window_id, 0) or window_id not in self._built:
+            return
+        self.journal.completed.append(self._built.pop(window_id))
+        if window_id in self.journal.partial:
+            self.journal.partial.remove(window_id)
+
+    def write(self, session: "Session") -> None:
+        """Record the journal in ``session``, as it is now."""
+        with self._lock:
+            journal = dataclasses.replace(
+                self.journal,
+                completed=list(self.journal.completed),
+                partial=list(self.journal.partial),
+            )
+        write_journal(session, journal)
+
+
+def read_journal(session: "Session") -> t.Optional[Journal]:
+    """Return journal of the failed build of ``session``, if there is one."""
+    proc = session.cmd("show-options", "-qv", JOURNAL_OPTION)
+    if not proc.stdout:
+        return None
+    try:
+        return Journal.from_json("\n".join(proc.stdout))
+    except (TypeError, ValueError) as e:
+        logger.debug(f"invalid journal of {session.session_name}: {e}")
+        return None
+
+
+def write_journal(session: "Session", journal: Journal) -> None:
+    """Record ``journal`` in ``session``."""
+    session.cmd("set-option", JOURNAL_OPTION, journal.to_json())
+
+
+def clear_journal(session: "Session") -> None:
+    """Remove the journal of ``session``."""
+    session.cmd("set-option", "-u", JOURNAL_OPTION)
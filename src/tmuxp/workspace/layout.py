@@ -0,0 +1,252 @@
+"""Compute tmux window layouts from declarative specs.
+
+Besides tmux's layout names (``main-vertical``, ``tiled``, …) and layout strings
+(as saved by ``tmuxp freeze``), a window's ``layout`` can be a mapping:
+
+.. code-block:: yaml
+
+    layout:
+      columns: [2, 1]   # side by side, widths 2:1
+    layout:
+      rows: [1, 1, 2]   # stacked, heights 1:1:2
+    layout:
+      grid: [2, 3]      # 2 rows of 3 panes
+    layout:
+      main: left        # first pane on the left (or top), the rest stacked
+      size: 60          # percent of the window taken by the first pane
+
+Panes are then created with sizes (``split-window -p``) that leave room for the
+rest, and the final layout is applied once, with :func:`layout_string`, when all
+panes of the window exist. Ratios and grids must match the number of panes.
+"""
+
+import typing as t
+
+from .. import exc
+from .validation import InvalidLayoutValidationError
+
+if t.TYPE_CHECKING:
+    from typing_extensions import Literal, TypeAlias
+
+    Direction: TypeAlias = Literal["leftright", "topbottom"]
+
+#: Keys of layout specs, one of them is required
+LAYOUT_TYPES = ("rows", "columns", "grid", "main")
+
+#: Default share of the window, in percent, of the ``main`` pane
+DEFAULT_MAIN_SIZE = 50
+
+#: ``display-message`` format for the window size and pane count to lay out
+WINDOW_SIZE_FORMAT = "#{window_width} #{window_height} #{window_panes}"
+
+
+class Cell(t.NamedTuple):
+    """Node of a layout: a pane if ``children`` is empty, else a split."""
+
+    weight: float = 1
+    direction: t.Optional["Direction"] = None
+    children: t.Tuple["Cell", ...] = ()
+
+
+def is_layout_spec(layout: t.Any) -> bool:
+    """Return True if ``layout`` is a declarative spec, not a tmux layout.
+
+    >>> is_layout_spec({"columns": [1, 1]})
+    True
+
+    >>> is_layout_spec("main-vertical")
+    False
+    """
+    return isinstance(layout, dict)
+
+
+def validate_layout(spec: t.Any, panes: int) -> None:
+    """Raise if ``spec`` can't lay out ``panes`` panes.
+
+    Raises :exc:`~tmuxp.workspace.validation.InvalidLayoutValidationError`.
+
+    >>> validate_layout({"grid": [2, 2]}, panes=4)
+
+    >>> validate_layout({"rows": [1, 2]}, panes=3)
+    Traceback (most recent call last):
+    ...
+    tmuxp.workspace.validation.InvalidLayoutValidationError: ...
+    """
+    if not isinstance(spec, dict):
+        raise InvalidLayoutValidationError(spec)
+
+    kinds = [key for key in LAYOUT_TYPES if key in spec]
+    allowed = {*kinds, "size"} if kinds == ["main"] else set(kinds)
+    if len(kinds) != 1 or set(spec) - allowed:
+        raise InvalidLayoutValidationError(spec)
+
+    kind = kinds[0]
+    value = spec[kind]
+    if kind in ["rows", "columns"]:
+        valid = (
+            isinstance(value, list)
+            and len(value) == panes
+            and all(isinstance(w, (int, float)) and w > 0 for w in value)
+        )
+    elif kind == "grid":
+        valid = (
+            isinstance(value, list)
+            and len(value) == 2
+            and all(isinstance(n, int) and n > 0 for n in value)
+            and value[0] * value[1] == panes
+        )
+    else:
+        size = spec.get("size", DEFAULT_MAIN_SIZE)
+        valid = (
+            value in ["left", "top"]
+            and isinstance(size, (int, float))
+            and 0 < size < 100
+        )
+
+    if not valid:
+        raise InvalidLayoutValidationError(spec, panes)
+
+
+def describe_layout(spec: t.Dict[str, t.Any]) -> str:
+    """Return layout ``spec`` as text for plans.
+
+    >>> describe_layout({"main": "left", "size": 60})
+    'main=left size=60'
+
+    >>> describe_layout({"columns": [2, 1]})
+    'columns=2,1'
+    """
+    return " ".join(
+        "{}={}".format(
+            key,
+            ",".join(str(v) for v in value) if isinstance(value, list) else value,
+        )
+        for key, value in spec.items()
+    )
+
+
+def layout_tree(spec: t.Dict[str, t.Any], panes: int) -> Cell:
+    """Return the :class:`Cell` tree of ``spec``, panes in tmux's pane order."""
+    validate_layout(spec, panes)
+
+    if "rows" in spec:
+        return Cell(
+            direction="topbottom", children=tuple(Cell(w) for w in spec["rows"])
+        )
+    if "columns" in spec:
+        return Cell(
+            direction="leftright", children=tuple(Cell(w) for w in spec["columns"])
+        )
+    if "grid" in spec:
+        rows, columns = spec["grid"]
+        row = Cell(
+            direction="leftright", children=tuple(Cell() for _ in range(columns))
+        )
+        return Cell(direction="topbottom", children=tuple(row for _ in range(rows)))
+
+    size = spec.get("size", DEFAULT_MAIN_SIZE)
+    main: "Direction" = "leftright" if spec["main"] == "left" else "topbottom"
+    stack: "Direction" = "topbottom" if spec["main"] == "left" else "leftright"
+    if panes == 1:
+        return Cell()
+    if panes == 2:
+        rest = Cell(100 - size)
+    else:
+        rest = Cell(
+            100 - size,
+            direction=stack,
+            children=tuple(Cell() for _ in range(panes - 1)),
+        )
+    return Cell(direction=main, children=(Cell(size), rest))
+
+
+def _sizes(total: int, weights: t.Sequence[float]) -> t.List[int]:
+    """Return sizes of cells sharing ``total`` by ``weights``, minus borders.
+
+    >>> _sizes(80, [1, 1])
+    [39, 40]
+
+    >>> _sizes(24, [1, 1, 2])
+    [5, 5, 12]
+    """
+    available = total - (len(weights) - 1)
+    if available < len(weights):
+        raise exc.WindowTooSmall(len(weights), total)
+
+    sizes = [max(1, int(available * w / sum(weights))) for w in weights]
+    # hand out what rounding left over, last cell first
+    sizes[-1] += available - sum(sizes)
+    while sizes[-1] < 1:
+        i = sizes.index(max(sizes))
+        sizes[i] -= 1
+        sizes[-1] += 1
+    return sizes
+
+
+def _dump(
+    cell: Cell, width: int, height: int, x: int, y: int, ids: t.Iterator[int]
+) -> str:
+    geometry = f"{width}x{height},{x},{y}"
+    if not cell.children:
+        return f"{geometry},{next(ids)}"
+
+    parts = []
+    if cell.direction == "leftright":
+        for child, size in zip(
+            cell.children, _sizes(width, [c.weight for c in cell.children])
+        ):
+            parts.append(_dump(child, size, height, x, y, ids))
+            x += size + 1
+        return f"{geometry}{{{','.join(parts)}}}"
+
+    for child, size in zip(
+        cell.children, _sizes(height, [c.weight for c in cell.children])
+    ):
+        parts.append(_dump(child, width, size, x, y, ids))
+        y += size + 1
+    return f"{geometry}[{','.join(parts)}]"
+
+
+def layout_checksum(layout: str) -> str:
+    """Return tmux's checksum of ``layout``, which prefixes layout strings.
+
+    >>> layout_checksum("80x24,0,0,1")
+    'b25e'
+    """
+    csum = 0
+    for char in layout:
+        csum = (csum >> 1) + ((csum & 1) << 15)
+        csum = (csum + ord(char)) & 0xFFFF
+    return f"{csum:04x}"
+
+
+def layout_string(spec: t.Dict[str, t.Any], panes: int, width: int, height: int) -> str:
+    """Return tmux layout string of ``spec`` for a ``width`` x ``height`` window.
+
+    The result can be passed to ``select-layout``.
+
+    >>> layout_string({"columns": [1, 1]}, panes=2, width=80, height=24)
+    '89f5,80x24,0,0{39x24,0,0,0,40x24,40,0,1}'
+
+    >>> layout_string({"main": "top", "size": 50}, panes=3, width=80, height=24)
+    'a26f,80x24,0,0[80x11,0,0,0,80x12,0,12{39x12,0,12,1,40x12,40,12,2}]'
+    """
+    body = _dump(layout_tree(spec, panes), width, height, 0, 0, iter(range(panes)))
+    return f"{layout_checksum(body)},{body}"
+
+
+def split_args(spec: t.Dict[str, t.Any], position: int, panes: int) -> t.List[str]:
+    """Return ``split-window`` arguments creating pane ``position`` of ``panes``.
+
+    Each split gives the new pane the share of all panes still to be created, so
+    they fit until :func:`layout_string` arranges them.
+
+    >>> [split_args({"rows": [1, 1, 1, 1]}, i, 4) for i in range(1, 4)]
+    [['-v', '-p', '75'], ['-v', '-p', '67'], ['-v', '-p', '50']]
+
+    >>> split_args({"columns": [1, 1]}, 1, 2)
+    ['-h', '-p', '50']
+    """
+    flag = "-h" if "columns" in spec else "-v"
+    remaining = panes - position
+    return [flag, "-p", str(round(100 * remaining / (remaining + 1)))]
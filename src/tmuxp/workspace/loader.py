@@ -4,6 +4,10 @@ import os
 import pathlib
 import typing as t
 
+from libtmux import exc as libtmux_exc
+
+from ..capabilities import get_capabilities
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,6 +31,12 @@ def expandshell(value: str) -> str:
 
 def expand_cmd(p: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
     """Resolve shell variables and expand shorthands in a tmuxp config mapping."""
+    return _expand_cmd(p, expandshell)
+
+
+def _expand_cmd(
+    p: t.Dict[str, t.Any], expand_value: t.Callable[[str], str]
+) -> t.Dict[str, t.Any]:
     if isinstance(p, str):
         p = {"shell_command": [p]}
     elif isinstance(p, list):
@@ -54,7 +64,7 @@ def expand_cmd(p: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
         for cmd_idx, cmd in enumerate(cmds):
             if isinstance(cmd, str):
                 cmds[cmd_idx] = {"cmd": cmd}
-            cmds[cmd_idx]["cmd"] = expandshell(cmds[cmd_idx]["cmd"])
+            cmds[cmd_idx]["cmd"] = expand_value(cmds[cmd_idx]["cmd"])
 
         p["shell_command"] = cmds
     else:
@@ -62,54 +72,53 @@ def expand_cmd(p: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
     return p
 
 
-def expand(
-    workspace_dict: t.Dict[str, t.Any],
-    cwd: t.Optional[t.Union[pathlib.Path, str]] = None,
-    parent: t.Optional[t.Any] = None,
-) -> t.Dict[str, t.Any]:
-    """Resolve workspace variables and expand shorthand style / inline properties.
-
-    This is necessary to keep the code in the :class:`WorkspaceBuilder` clean
-    and also allow for neat, short-hand "sugarified" syntax.
-
-    As a simple example, internally, tmuxp expects that workspace options
-    like ``shell_command`` are a list (array)::
+class _Expansions:
+    """Memoised :func:`expandshell` and path resolution, for one workspace.
 
-        'shell_command': ['htop']
+    Workspaces repeat the same start directories and variables in every window
+    and pane, each unique string is expanded and resolved once.
+    """
 
-    tmuxp workspace allow for it to be simply a string::
+    def __init__(self) -> None:
+        self._values: t.Dict[str, str] = {}
+        self._paths: t.Dict[pathlib.Path, str] = {}
 
-        'shell_command': 'htop'
+    def expandshell(self, value: str) -> str:
+        """Return :func:`expandshell` of ``value``."""
+        try:
+            return self._values[value]
+        except KeyError:
+            expanded = self._values[value] = expandshell(value)
+            return expanded
 
-    ConfigReader will load JSON/YAML files into python dicts for you.
+    def resolve(self, path: pathlib.Path) -> str:
+        """Return ``path`` resolved, as a string."""
+        try:
+            return self._paths[path]
+        except KeyError:
+            resolved = self._paths[path] = str(path.resolve(strict=False))
+            return resolved
 
-    Parameters
-    ----------
-    workspace_dict : dict
-        the tmuxp workspace for the session
-    cwd : str
-        directory to expand relative paths against. should be the dir of the
-        workspace directory.
-    parent : str
-        (used on recursive entries) start_directory of parent window or session
-        object.
-
-    Returns
-    -------
-    dict
-    """
-    # Note: cli.py will expand workspaces relative to project's workspace directory
-    # for the first cwd argument.
-    cwd = pathlib.Path().cwd() if not cwd else pathlib.Path(cwd)
 
+def _expand_section(
+    workspace_dict: t.Dict[str, t.Any],
+    cwd: pathlib.Path,
+    parent: t.Optional[t.Any],
+    expansions: _Expansions,
+) -> None:
+    """Expand the session, window or pane ``workspace_dict``, not its children."""
     if "session_name" in workspace_dict:
-        workspace_dict["session_name"] = expandshell(workspace_dict["session_name"])
+        workspace_dict["session_name"] = expansions.expandshell(
+            workspace_dict["session_name"]
+        )
     if "window_name" in workspace_dict:
-        workspace_dict["window_name"] = expandshell(workspace_dict["window_name"])
+        workspace_dict["window_name"] = expansions.expandshell(
+            workspace_dict["window_name"]
+        )
     if "environment" in workspace_dict:
         for key in workspace_dict["environment"]:
             val = workspace_dict["environment"][key]
-            val = expandshell(val)
+            val = expansions.expandshell(val)
             if any(val.startswith(a) for a in [".", "./"]):
                 val = str(cwd / val)
             workspace_dict["environment"][key] = val
@@ -117,7 +126,7 @@ def expand(
         for key in workspace_dict["global_options"]:
             val = workspace_dict["global_options"][key]
             if isinstance(val, str):
-                val = expandshell(val)
+                val = expansions.expandshell(val)
                 if any(val.startswith(a) for a in [".", "./"]):
                     val = str(cwd / val)
             workspace_dict["global_options"][key] = val
@@ -125,7 +134,7 @@ def expand(
         for key in workspace_dict["options"]:
             val = workspace_dict["options"][key]
             if isinstance(val, str):
-                val = expandshell(val)
+                val = expansions.expandshell(val)
                 if any(val.startswith(a) for a in [".", "./"]):
                     val = str(cwd / val)
             workspace_dict["options"][key] = val
@@ -133,7 +142,7 @@ def expand(
     # Any workspace section, session, window, pane that can contain the
     # 'shell_command' value
     if "start_directory" in workspace_dict:
-        workspace_dict["start_directory"] = expandshell(
+        workspace_dict["start_directory"] = expansions.expandshell(
             workspace_dict["start_directory"]
         )
         start_path = workspace_dict["start_directory"]
@@ -147,12 +156,14 @@ def expand(
             if parent:
                 cwd = pathlib.Path(parent["start_directory"])
 
-            start_path = str((cwd / start_path).resolve(strict=False))
+            start_path = expansions.resolve(cwd / start_path)
 
             workspace_dict["start_directory"] = start_path
 
     if "before_script" in workspace_dict:
-        workspace_dict["before_script"] = expandshell(workspace_dict["before_script"])
+        workspace_dict["before_script"] = expansions.expandshell(
+            workspace_dict["before_script"]
+        )
         if any(workspace_dict["before_script"].startswith(a) for a in [".", "./"]):
             workspace_dict["before_script"] = str(cwd / workspace_dict["before_script"])
 
@@ -164,7 +175,52 @@ def expand(
     if "shell_command_before" in workspace_dict:
         shell_command_before = workspace_dict["shell_command_before"]
 
-        workspace_dict["shell_command_before"] = expand_cmd(shell_command_before)
+        workspace_dict["shell_command_before"] = _expand_cmd(
+            shell_command_before, expansions.expandshell
+        )
+
+
+def expand(
+    workspace_dict: t.Dict[str, t.Any],
+    cwd: t.Optional[t.Union[pathlib.Path, str]] = None,
+    parent: t.Optional[t.Any] = None,
+) -> t.Dict[str, t.Any]:
+    """Resolve workspace variables and expand shorthand style / inline properties.
+
+    This is necessary to keep the code in the :class:`WorkspaceBuilder` clean
+    and also allow for neat, short-hand "sugarified" syntax.
+
+    As a simple example, internally, tmuxp expects that workspace options
+    like ``shell_command`` are a list (array)::
+
+        'shell_command': ['htop']
+
+    tmuxp workspace allow for it to be simply a string::
+
+        'shell_command': 'htop'
+
+    ConfigReader will load JSON/YAML files into python dicts for you.
+
+    Parameters
+    ----------
+    workspace_dict : dict
+        the tmuxp workspace for the session
+    cwd : str
+        directory to expand relative paths against. should be the dir of the
+        workspace directory.
+    parent : str
+        (used on recursive entries) start_directory of parent window or session
+        object.
+
+    Returns
+    -------
+    dict
+    """
+    # Note: cli.py will expand workspaces relative to project's workspace directory
+    # for the first cwd argument.
+    cwd = pathlib.Path().cwd() if not cwd else pathlib.Path(cwd)
+
+    _expand_section(workspace_dict, cwd, parent, _Expansions())
 
     # recurse into window and pane workspace items
     if "windows" in workspace_dict:
@@ -184,6 +240,54 @@ def expand(
     return workspace_dict
 
 
+def exec_shell(
+    pane_dict: t.Dict[str, t.Any], pane_options: t.Optional[bool] = None
+) -> str:
+    """Return shell-command running a pane's ``exec`` command as the pane process.
+
+    With ``exit_to_shell``, an interactive shell starts when the command exits.
+    With ``remain_on_exit``, the pane stays open once it exits, the option is set
+    by the pane itself so a command exiting right away doesn't close it first.
+
+    Panes have options of their own since tmux 3.0 (``pane_options``, checked
+    with :mod:`~tmuxp.capabilities` by default). On older tmux, ``remain-on-exit``
+    is set for the pane's window.
+
+    Examples
+    --------
+    >>> exec_shell({"exec": "tail -f app.log"})
+    'tail -f app.log'
+
+    >>> exec_shell({"exec": "npm run dev", "exit_to_shell": True})
+    'npm run dev; exec "$SHELL"'
+
+    >>> exec_shell({"exec": "make", "remain_on_exit": True}, pane_options=True)
+    'tmux set-option -p -t "$TMUX_PANE" remain-on-exit on; make'
+
+    >>> exec_shell({"exec": "make", "remain_on_exit": True}, pane_options=False)
+    'tmux set-option -w -t "$TMUX_PANE" remain-on-exit on; make'
+    """
+    command = str(pane_dict["exec"])
+    if pane_dict.get("exit_to_shell"):
+        command += '; exec "$SHELL"'
+    if pane_dict.get("remain_on_exit"):
+        if pane_options is None:
+            pane_options = _supports_pane_options()
+        scope = "-p" if pane_options else "-w"
+        command = (
+            f'tmux set-option {scope} -t "$TMUX_PANE" remain-on-exit on; {command}'
+        )
+    return command
+
+
+def _supports_pane_options() -> bool:
+    try:
+        return get_capabilities().supports("pane-options")
+    except libtmux_exc.TmuxCommandNotFound:
+        # nothing to build the workspace with, assume a current tmux
+        return True
+
+
 def trickle(workspace_dict: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
     """Return a dict with "trickled down" / inherited workspace values.
 
@@ -194,6 +298,8 @@ def trickle(workspace_dict: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
     level. shell_command_before trickles down and prepends the
     ``shell_command`` for the pane.
 
+    The ``exec`` command of a pane becomes its ``shell``, see :func:`exec_shell`.
+
     Parameters
     ----------
     workspace_dict : dict
@@ -205,57 +311,146 @@ def trickle(workspace_dict: t.Dict[str, t.Any]) -> t.Dict[str, t.Any]:
     """
     # prepends a pane's ``shell_command`` list with the window and sessions'
     # ``shell_command_before``.
+    for window_idx, window_dict in enumerate(workspace_dict["windows"], start=1):
+        _trickle_window(workspace_dict, window_idx, window_dict)
+
+    return workspace_dict
+
 
+def _trickle_window(
+    workspace_dict: t.Dict[str, t.Any],
+    window_idx: int,
+    window_dict: t.Dict[str, t.Any],
+) -> None:
+    """Trickle session values down to ``window_dict`` and its panes."""
     session_start_directory = workspace_dict.get("start_directory", None)
 
     suppress_history = workspace_dict.get("suppress_history", None)
 
-    for window_dict in workspace_dict["windows"]:
-        # Prepend start_directory to relative window commands
-        if session_start_directory:
-            session_start_directory = session_start_directory
-            if "start_directory" not in window_dict:
-                window_dict["start_directory"] = session_start_directory
-            else:
-                if not any(
-                    window_dict["start_directory"].startswith(a) for a in ["~", "/"]
-                ):
-                    window_start_path = (
-                        pathlib.Path(session_start_directory)
-                        / window_dict["start_directory"]
-                    )
-                    window_dict["start_directory"] = str(window_start_path)
-
-        # We only need to trickle to the window, workspace builder checks wconf
-        if suppress_history is not None and "suppress_history" not in window_dict:
-            window_dict["suppress_history"] = suppress_history
-
-        # If panes were NOT specified for a window, assume that a single pane
-        # with no shell commands is desired
-        if "panes" not in window_dict:
-            window_dict["panes"] = [{"shell_command": []}]
-
-        for pane_idx, pane_dict in enumerate(window_dict["panes"]):
+    paste = workspace_dict.get("paste", None)
+
+    lazy = workspace_dict.get("lazy", None)
+
+    # Prepend start_directory to relative window commands
+    if session_start_directory:
+        if "start_directory" not in window_dict:
+            window_dict["start_directory"] = session_start_directory
+        else:
+            if not any(
+                window_dict["start_directory"].startswith(a) for a in ["~", "/"]
+            ):
+                window_start_path = (
+                    pathlib.Path(session_start_directory)
+                    / window_dict["start_directory"]
+                )
+                window_dict["start_directory"] = str(window_start_path)
+
+    # We only need to trickle to the window, workspace builder checks wconf
+    if suppress_history is not None and "suppress_history" not in window_dict:
+        window_dict["suppress_history"] = suppress_history
+    if paste is not None and "paste" not in window_dict:
+        window_dict["paste"] = paste
+
+    # Windows after the first ``lazy`` ones (the first one for ``lazy: true``)
+    # are built when they're first selected
+    if lazy is not None and lazy is not False and "lazy" not in window_dict:
+        window_dict["lazy"] = window_idx > (1 if lazy is True else int(lazy))
+
+    # If panes were NOT specified for a window, assume that a single pane
+    # with no shell commands is desired
+    if "panes" not in window_dict:
+        window_dict["panes"] = [{"shell_command": []}]
+
+    # shell_command_before of the session and window, the same for every pane
+    window_commands_before = []
+    if "shell_command_before" in workspace_dict:
+        window_commands_before.extend(
+            workspace_dict["shell_command_before"]["shell_command"]
+        )
+    if "shell_command_before" in window_dict:
+        window_commands_before.extend(
+            window_dict["shell_command_before"]["shell_command"]
+        )
+
+    for pane_dict in window_dict["panes"]:
+        # Prepend shell_command_before to commands
+        commands_before = window_commands_before
+        if "shell_command_before" in pane_dict:
+            commands_before = [
+                *commands_before,
+                *pane_dict["shell_command_before"]["shell_command"],
+            ]
+
+        # ``exec`` panes run their command instead of a shell, so there's no
+        # shell to type shell_command_before into
+        if "exec" in pane_dict:
+            pane_dict["shell"] = exec_shell(pane_dict)
             commands_before = []
 
-            # Prepend shell_command_before to commands
-            if "shell_command_before" in workspace_dict:
-                commands_before.extend(
-                    workspace_dict["shell_command_before"]["shell_command"]
-                )
-            if "shell_command_before" in window_dict:
-                commands_before.extend(
-                    window_dict["shell_command_before"]["shell_command"]
-                )
-            if "shell_command_before" in pane_dict:
-                commands_before.extend(
-                    pane_dict["shell_command_before"]["shell_command"]
-                )
+        pane_dict["shell_command"] = [
+            *commands_before,
+            *pane_dict.get("shell_command", []),
+        ]
 
-            if "shell_command" in pane_dict:
-                commands_before.extend(pane_dict["shell_command"])
 
-            window_dict["panes"][pane_idx]["shell_command"] = commands_before
-            # pane_dict['shell_command'] = commands_before
+def normalize(
+    workspace_dict: t.Dict[str, t.Any],
+    cwd: t.Optional[t.Union[pathlib.Path, str]] = None,
+) -> t.Dict[str, t.Any]:
+    """Return workspace expanded and trickled, in one pass.
+
+    Same result as ``trickle(expand(workspace_dict, cwd=cwd))``, see
+    :func:`expand` and :func:`trickle`. Each unique variable and start directory
+    is expanded and resolved once, the session and window ``shell_command_before``
+    are joined once per window instead of once per pane.
+
+    Parameters
+    ----------
+    workspace_dict : dict
+        the tmuxp workspace for the session
+    cwd : str
+        directory to expand relative paths of the session against. should be the
+        dir of the workspace file.
+
+    Returns
+    -------
+    dict
+
+    Examples
+    --------
+    >>> workspace = normalize({
+    ...     "session_name": "normalized",
+    ...     "start_directory": "/srv",
+    ...     "shell_command_before": "source .env",
+    ...     "windows": [{"window_name": "app", "panes": ["make run", None]}],
+    ... })
+    >>> window = workspace["windows"][0]
+    >>> window["start_directory"]
+    '/srv'
+    >>> [pane["shell_command"] for pane in window["panes"]]
+    [[{'cmd': 'source .env'}, {'cmd': 'make run'}], [{'cmd': 'source .env'}]]
+    """
+    expansions = _Expansions()
+    _expand_section(
+        workspace_dict,
+        pathlib.Path.cwd() if not cwd else pathlib.Path(cwd),
+        None,
+        expansions,
+    )
+
+    # windows and panes expand relative paths against the current directory,
+    # like the recursive entries of :func:`expand`
+    current_directory = pathlib.Path.cwd()
+    for window_idx, window_dict in enumerate(workspace_dict["windows"], start=1):
+        _expand_section(window_dict, current_directory, workspace_dict, expansions)
+        if "panes" in window_dict:
+            pane_dicts = []
+            for pane_dict in window_dict["panes"]:
+                pane_dict = {**_expand_cmd(pane_dict, expansions.expandshell)}
+                _expand_section(pane_dict, current_directory, window_dict, expansions)
+                pane_dicts.append(pane_dict)
+            window_dict["panes"] = pane_dicts
+
+        _trickle_window(workspace_dict, window_idx, window_dict)
 
     return workspace_dict
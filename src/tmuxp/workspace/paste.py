@@ -0,0 +1,131 @@
+r"""Send the commands of a pane through a tmux paste buffer.
+
+``send-keys`` types each command into the pane, which is slow for panes with
+dozens of commands and long multi-line snippets. With ``paste: true``, a pane's
+commands are loaded into a buffer named after the pane (``load-buffer -``, read
+from stdin) and pasted with ``paste-buffer -d -p``. Blocks larger than
+:data:`CHUNK_SIZE` are loaded and pasted a chunk of lines at a time.
+
+Commands are pasted together until one is delayed (``sleep_before``,
+``sleep_after``), waits for a condition (``wait_for``) or isn't followed by
+``enter``, see :func:`join_commands`.
+
+>>> from libtmux.test import retry_until
+>>> sh_pane = window.split_window(shell="sh")
+>>> paste_commands(server, sh_pane.pane_id, ["echo ___$((1 + 2))___", "echo done"])
+>>> retry_until(lambda: "___3___" in "\n".join(sh_pane.capture_pane()))
+True
+"""
+
+import logging
+import shutil
+import subprocess
+import typing as t
+
+from libtmux import exc as libtmux_exc
+
+from .. import trace
+from ..util import server_args
+
+if t.TYPE_CHECKING:
+    from libtmux.server import Server
+
+logger = logging.getLogger(__name__)
+
+#: Bytes loaded into a paste buffer at a time
+CHUNK_SIZE = 16 * 1024
+
+
+def join_commands(commands: t.List[t.Dict[str, t.Any]]) -> t.List[t.Dict[str, t.Any]]:
+    """Return ``commands`` joined into blocks pasted at once.
+
+    ``commands`` have ``cmd``, ``enter``, ``sleep_before``, ``wait_for`` and
+    ``sleep_after`` resolved. A block's ``cmd`` is the list of its commands.
+
+    >>> blocks = join_commands([
+    ...     {"cmd": "cd src", "enter": True},
+    ...     {"cmd": "make", "enter": True, "sleep_after": 1},
+    ...     {"cmd": "make test", "enter": True, "wait_for": {"pattern": "ok"}},
+    ...     {"cmd": "git status", "enter": True},
+    ... ])
+    >>> [block["cmd"] for block in blocks]
+    [['cd src', 'make'], ['make test', 'git status']]
+    >>> blocks[0]["sleep_after"]
+    1
+    """
+    blocks: t.List[t.Dict[str, t.Any]] = []
+    for command in commands:
+        previous = blocks[-1] if blocks else None
+        if (
+            previous is not None
+            and previous.get("enter", True)
+            and previous.get("sleep_after") is None
+            and command.get("sleep_before") is None
+            and command.get("wait_for") is None
+        ):
+            previous["cmd"].append(command["cmd"])
+            previous["enter"] = command.get("enter", True)
+            previous["sleep_after"] = command.get("sleep_after")
+        else:
+            blocks.append({**command, "cmd": [command["cmd"]]})
+    return blocks
+
+
+def chunk_lines(text: str, size: int = CHUNK_SIZE) -> t.List[str]:
+    r"""Return ``text`` split after lines, in chunks up to ``size`` bytes.
+
+    Lines longer than ``size`` are a chunk of their own.
+
+    >>> chunk_lines("cd src\nmake\nmake test", size=12)
+    ['cd src\nmake\n', 'make test']
+    """
+    chunks: t.List[str] = []
+    chunk = ""
+    for line in text.splitlines(keepends=True):
+        if chunk and len((chunk + line).encode()) > size:
+            chunks.append(chunk)
+            chunk = ""
+        chunk += line
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def load_buffer(server: "Server", name: str, data: str) -> None:
+    """Load ``data`` into paste buffer ``name`` of ``server``, from stdin."""
+    tmux_bin = shutil.which("tmux")
+    if not tmux_bin:
+        raise libtmux_exc.TmuxCommandNotFound()
+
+    cmd = [tmux_bin, *server_args(server), "load-buffer", "-b", name, "-"]
+    with trace.span("load-buffer", cat="tmux", argv=cmd[1:]) as span_args:
+        proc = subprocess.run(cmd, input=data.encode(), capture_output=True)
+        span_args["returncode"] = proc.returncode
+    if proc.returncode != 0:
+        raise libtmux_exc.LibTmuxException(
+            proc.stderr.decode(errors="backslashreplace").splitlines()
+        )
+
+
+def paste_commands(
+    server: "Server",
+    pane_id: str,
+    commands: t.List[str],
+    enter: bool = True,
+    chunk_size: t.Optional[int] = None,
+) -> None:
+    """Paste ``commands`` into pane ``pane_id``, then press enter if ``enter``.
+
+    Shells with bracketed paste take the pasted lines as one input, which runs
+    with the final enter. ``chunk_size`` defaults to :data:`CHUNK_SIZE`.
+    """
+    name = f"tmuxp-{pane_id}"
+    chunks = chunk_lines("\n".join(commands), size=chunk_size or CHUNK_SIZE)
+    for position, chunk in enumerate(chunks, start=1):
+        load_buffer(server, name, chunk)
+        args = ["paste-buffer", "-d", "-p", "-b", name, "-t", pane_id]
+        if enter and position == len(chunks):
+            args += [";", "send-keys", "-t", pane_id, "Enter"]
+        proc = server.cmd(*args)
+        if proc.stderr:
+            raise libtmux_exc.LibTmuxException(proc.stderr)
@@ -0,0 +1,929 @@
+"""Compile tmuxp workspaces into a build plan, and run plans against tmux.
+
+:func:`compile_workspace` turns an expanded and trickled workspace :py:obj:`dict`
+(see :func:`~tmuxp.workspace.loader.expand`, :func:`~tmuxp.workspace.loader.trickle`)
+into a :class:`Plan`: a flat list of :class:`Operation`. Compiling doesn't talk to
+tmux, objects the plan creates are referred to by :class:`Ref` placeholders.
+
+An executor then runs the plan in a session:
+
+- :class:`SequentialExecutor`: one ``tmux(1)`` invocation per operation
+- :class:`BatchedExecutor`: operations queued in a
+  :class:`~tmuxp.workspace.batch.CommandBatch`, sent when an operation needs the
+  output (``new-window``), a delay or a plugin hook comes up
+- :class:`ConcurrentExecutor`: like :class:`BatchedExecutor`, the operations of
+  different windows run in parallel threads
+
+With ``timelines``, executors run each pane's operations from its first delay
+on in a thread of its own, see :mod:`tmuxp.workspace.timeline`.
+"""
+
+import dataclasses
+import functools
+import json
+import logging
+import pathlib
+import shlex
+import threading
+import time
+import typing as t
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from libtmux.window import Window
+
+from . import layout as layouts, paste, readiness
+from .batch import (
+    WINDOW_FIELDS,
+    CommandBatch,
+    format_fields,
+    option_value,
+    parse_fields,
+)
+from .timeline import PaneTimelines
+
+if t.TYPE_CHECKING:
+    from libtmux.session import Session
+    from typing_extensions import Literal, TypeAlias
+
+    from .events import EventBus, EventKind
+    from .journal import BuildProgress
+
+    RefKind: TypeAlias = Literal["session", "window", "pane"]
+    OperationKind: TypeAlias = Literal[
+        "tmux", "sleep", "wait", "layout", "paste", "hook"
+    ]
+
+    #: Called with the plugin hook name and window for ``hook`` operations
+    HookCallback: TypeAlias = t.Callable[[str, Window], None]
+
+logger = logging.getLogger(__name__)
+
+#: Index the session's initial window is moved to, before it's replaced
+FIRST_WINDOW_INDEX = "99"
+
+
+@dataclasses.dataclass(frozen=True)
+class Ref:
+    """Placeholder for a tmux object, resolved when the plan runs.
+
+    ``window`` is the position of the window in the workspace (starting at 1, 0
+    is the session's initial window), ``pane`` the position of the pane in it
+    (starting at 0, regardless of ``pane-base-index``).
+
+    >>> print(Ref("session", suffix=":99"))
+    {session}:99
+
+    >>> print(Ref("pane", window=2, pane=1))
+    {window 2 pane 1}
+    """
+
+    kind: "RefKind"
+    window: int = 0
+    pane: int = 0
+    suffix: str = ""
+
+    def __str__(self) -> str:
+        """Return placeholder as shown in plans."""
+        if self.kind == "session":
+            name = "session"
+        elif self.kind == "window":
+            name = f"window {self.window}"
+        else:
+            name = f"window {self.window} pane {self.pane}"
+        return f"{{{name}}}{self.suffix}"
+
+
+@dataclasses.dataclass(frozen=True)
+class Operation:
+    """Step of a :class:`Plan`.
+
+    ``kind`` is ``tmux`` for a tmux command (``cmd`` with ``args``), ``sleep`` for
+    a delay of ``args[0]`` seconds, ``wait`` for waiting until pane ``args[0]``
+    satisfies the ``wait_for`` condition in ``args[1]`` (JSON), ``layout`` for
+    applying the layout spec in ``args[1]`` (JSON, see
+    :mod:`~tmuxp.workspace.layout`) to window ``args[0]``, ``paste`` for pasting
+    the block of commands in ``args[1]`` (JSON, see :mod:`~tmuxp.workspace.paste`)
+    into pane ``args[0]``, or ``hook`` for the plugin hook ``cmd`` on window
+    ``args[0]``. ``window`` is the position of
+    the window the operation belongs to, ``None`` for session-wide operations.
+    ``creates`` is set on the operation creating a window. ``pane`` is the position
+    of the pane whose timeline (delays, waits and keys) the operation is part of.
+
+    >>> print(Operation("tmux", "send-keys", ("-t", Ref("pane", 1), " echo hi")))
+    send-keys -t {window 1 pane 0} ' echo hi'
+
+    >>> block = json.dumps({"cmds": [" cd src", " make"], "enter": True})
+    >>> print(Operation("paste", "", (Ref("pane", 1), block)))
+    paste {window 1 pane 0} ' cd src' ' make' Enter
+    """
+
+    kind: "OperationKind"
+    cmd: str = ""
+    args: t.Tuple[t.Union[str, Ref], ...] = ()
+    window: t.Optional[int] = None
+    creates: t.Optional[Ref] = None
+    pane: t.Optional[int] = None
+
+    def __str__(self) -> str:
+        """Return operation as shown in plans."""
+        if self.kind == "sleep":
+            return f"sleep {self.args[0]}"
+        if self.kind == "wait":
+            condition = json.loads(str(self.args[1]))
+            return f"wait {self.args[0]} {readiness.describe_condition(condition)}"
+        if self.kind == "layout":
+            spec = json.loads(str(self.args[1]))
+            return f"layout {self.args[0]} {layouts.describe_layout(spec)}"
+        if self.kind == "paste":
+            block = json.loads(str(self.args[1]))
+            keys = [shlex.quote(cmd) for cmd in block["cmds"]]
+            if block["enter"]:
+                keys.append("Enter")
+            return " ".join(["paste", str(self.args[0]), *keys])
+
+        args = [
+            str(arg) if isinstance(arg, Ref) else shlex.quote(arg) for arg in self.args
+        ]
+        line = " ".join([self.cmd, *args])
+        if self.kind == "hook":
+            line = f"hook {line}"
+        if self.creates is not None:
+            line = f"{line} -> {self.creates}"
+        return line
+
+
+class Plan(t.List[Operation]):
+    """List of :class:`Operation` building a workspace, printed one per line."""
+
+    def __str__(self) -> str:
+        """Return plan as text, one operation per line."""
+        return "\n".join(str(op) for op in self)
+
+
+def _pane_start_directory(
+    pane_config: t.Dict[str, t.Any], window_config: t.Dict[str, t.Any]
+) -> t.Optional[str]:
+    if "start_directory" in pane_config:
+        return t.cast(str, pane_config["start_directory"])
+    return window_config.get("start_directory")
+
+
+def _pane_shell(
+    pane_config: t.Dict[str, t.Any], window_config: t.Dict[str, t.Any]
+) -> t.Optional[str]:
+    if "shell" in pane_config:
+        return t.cast(str, pane_config["shell"])
+    return window_config.get("window_shell")
+
+
+def _option_value(value: t.Any) -> str:
+    return str(option_value(value))
+
+
+def _expanduser(path: str) -> str:
+    return str(pathlib.Path(path).expanduser())
+
+
+def compile_workspace(
+    session_config: t.Dict[str, t.Any],
+    replace_first_window: bool = True,
+    environment: bool = True,
+    session_options: bool = True,
+    reuse_first_window: t.Optional[str] = None,
+    respawn_first_window: bool = False,
+) -> Plan:
+    """Return :class:`Plan` building ``session_config`` in a session.
+
+    Produces the same tmux commands as
+    :class:`~tmuxp.workspace.builder.WorkspaceBuilder`, without repeated
+    ``select-layout`` and ``select-window`` calls whose effect is overridden later
+    in the plan.
+
+    Parameters
+    ----------
+    session_config : dict
+        expanded and trickled workspace
+    replace_first_window : bool
+        replace the session's initial window with the first workspace window, as
+        done for new sessions
+    environment : bool
+        whether tmux supports ``-e`` for new windows and panes (tmux 3.0+)
+    session_options : bool
+        set the session's ``options``, ``global_options`` and ``environment``,
+        False if they're applied before the plan runs
+    reuse_first_window : str, optional
+        index of the session's initial window, with ``replace_first_window`` it's
+        renamed into the first workspace window instead of replaced, unless that
+        window sets ``automatic-rename``
+    respawn_first_window : bool
+        respawn the pane of the reused initial window even if it's started as
+        configured, e.g. when its shell predates the session environment
+
+    Examples
+    --------
+    >>> plan = compile_workspace({
+    ...     "session_name": "sample",
+    ...     "options": {"base-index": 1},
+    ...     "windows": [
+    ...         {
+    ...             "window_name": "editor",
+    ...             "layout": "main-vertical",
+    ...             "panes": [
+    ...                 {"shell_command": [{"cmd": "vim"}]},
+    ...                 {"shell_command": [{"cmd": "make", "sleep_before": 1}]},
+    ...             ],
+    ...         },
+    ...     ],
+    ... })
+    >>> print(plan)
+    set-option -t {session} base-index 1
+    move-window -s {window 0} -t {session}:99
+    new-window -d -n editor -t {session}: -> {window 1}
+    kill-window -t {window 0}
+    hook on_window_create {window 1}
+    send-keys -t {window 1 pane 0} ' vim' Enter
+    split-window -t {window 1 pane 0} -v
+    select-layout -t {window 1} main-vertical
+    sleep 1
+    send-keys -t {window 1 pane 1} ' make' Enter
+    hook after_window_finished {window 1}
+    """
+    plan = Plan()
+    session = Ref("session")
+
+    if session_options:
+        for option, value in session_config.get("options", {}).items():
+            plan.append(
+                Operation(
+                    "tmux", "set-option", ("-t", session, option, _option_value(value))
+                )
+            )
+        for option, value in session_config.get("global_options", {}).items():
+            plan.append(
+                Operation("tmux", "set-option", ("-g", option, _option_value(value)))
+            )
+        for name, value in session_config.get("environment", {}).items():
+            plan.append(
+                Operation("tmux", "set-environment", ("-t", session, name, str(value)))
+            )
+
+    focus: t.Optional[Ref] = None
+    for window_position, window_config in enumerate(session_config["windows"], 1):
+        window = Ref("window", window_position)
+        first_window = replace_first_window and window_position == 1
+        # tmux holds off automatic renames of a window just named, like the
+        # initial window, so windows renaming themselves replace it instead
+        reuse = (
+            reuse_first_window
+            if first_window
+            and not (
+                isinstance(window_config.get("options"), dict)
+                and window_config["options"].get("automatic-rename")
+            )
+            else None
+        )
+        start_directory = _window_start_directory(window_config)
+        window_plan = compile_window(
+            window,
+            window_config,
+            replace_first_window=first_window,
+            environment=environment,
+            reuse=reuse,
+            respawn=respawn_first_window
+            or bool(
+                start_directory
+                and start_directory != session_config.get("start_directory")
+            ),
+        )
+        if first_window and reuse is None:
+            plan.append(
+                Operation(
+                    "tmux",
+                    "move-window",
+                    (
+                        "-s",
+                        Ref("window", 0),
+                        "-t",
+                        Ref("session", suffix=f":{FIRST_WINDOW_INDEX}"),
+                    ),
+                )
+            )
+        plan.extend(window_plan)
+
+        if window_config.get("focus"):
+            focus = window
+
+    if focus is not None:
+        plan.append(Operation("tmux", "select-window", ("-t", focus)))
+
+    return plan
+
+
+def _window_start_directory(window_config: t.Dict[str, t.Any]) -> t.Optional[str]:
+    panes = window_config["panes"]
+    if panes and "start_directory" in panes[0]:
+        return t.cast(str, panes[0]["start_directory"])
+    return window_config.get("start_directory", None)
+
+
+def compile_window(
+    window: Ref,
+    window_config: t.Dict[str, t.Any],
+    replace_first_window: bool,
+    environment: bool,
+    reuse: t.Optional[str] = None,
+    respawn: bool = False,
+) -> t.List[Operation]:
+    """Return operations creating ``window``, its panes and sending their commands.
+
+    With ``replace_first_window``, the session's initial window (moved out of the
+    way before) is killed once ``window`` exists. With ``reuse``, the index of the
+    session's initial window, that window becomes ``window`` instead: it's renamed,
+    its pane respawned if ``respawn`` or it needs another shell or environment,
+    and it's moved to the window's ``window_index``.
+
+    >>> print(Plan(compile_window(
+    ...     Ref("window", 1),
+    ...     {"window_name": "editor", "window_index": 2, "panes": [
+    ...         {"shell_command": [{"cmd": "vim"}]},
+    ...     ]},
+    ...     replace_first_window=True,
+    ...     environment=True,
+    ...     reuse="1",
+    ... )))
+    rename-window -t {window 0} editor
+    move-window -s {window 0} -t {session}:2
+    display-message -p -t {window 0} -> {window 1}
+    hook on_window_create {window 1}
+    send-keys -t {window 1 pane 0} ' vim' Enter
+    hook after_window_finished {window 1}
+    """
+    ops: t.List[Operation] = []
+
+    def add(
+        cmd: str,
+        *args: t.Union[str, Ref],
+        kind: "OperationKind" = "tmux",
+        creates: t.Optional[Ref] = None,
+    ) -> None:
+        ops.append(Operation(kind, cmd, args, window=window.window, creates=creates))
+
+    panes = window_config["panes"]
+
+    start_directory = _window_start_directory(window_config)
+
+    window_shell = window_config.get("window_shell", None)
+    if panes and panes[0].get("shell", "") != "":
+        window_shell = panes[0]["shell"]
+
+    window_environment = (
+        panes[0].get("environment", window_config.get("environment"))
+        if panes
+        else window_config.get("environment")
+    )
+    if window_environment and not environment:
+        logger.warning(
+            "Cannot set environment for new windows. "
+            "You need tmux 3.0 or newer for this."
+        )
+        window_environment = None
+
+    window_index = str(window_config.get("window_index", ""))
+    if reuse is not None:
+        # the initial window is renamed, respawned and moved before the rest of
+        # the session is built, like creating a window
+        initial_window = Ref("window", 0)
+        if window_config.get("window_name") is not None:
+            ops.append(
+                Operation(
+                    "tmux",
+                    "rename-window",
+                    ("-t", initial_window, window_config["window_name"]),
+                )
+            )
+        if respawn or window_shell or window_environment:
+            args: t.List[t.Union[str, Ref]] = ["-k", "-t", initial_window]
+            if start_directory:
+                args += ["-c", _expanduser(start_directory)]
+            if window_environment:
+                args += [f"-e{k}={v}" for k, v in window_environment.items()]
+            if window_shell:
+                args.append(window_shell)
+            ops.append(Operation("tmux", "respawn-pane", tuple(args)))
+        if window_index not in ["", reuse]:
+            ops.append(
+                Operation(
+                    "tmux",
+                    "move-window",
+                    (
+                        "-s",
+                        initial_window,
+                        "-t",
+                        Ref("session", suffix=f":{window_index}"),
+                    ),
+                )
+            )
+        ops.append(
+            Operation(
+                "tmux",
+                "display-message",
+                ("-p", "-t", initial_window),
+                creates=window,
+            )
+        )
+    else:
+        args = ["-d"]
+        if start_directory:
+            args += ["-c", _expanduser(start_directory)]
+        if window_config.get("window_name") is not None:
+            args += ["-n", window_config["window_name"]]
+        args += ["-t", Ref("session", suffix=f":{window_index}")]
+        if window_environment:
+            args += [f"-e{k}={v}" for k, v in window_environment.items()]
+        if window_shell:
+            args.append(window_shell)
+        add("new-window", *args, creates=window)
+
+        if replace_first_window:
+            add("kill-window", "-t", Ref("window", 0))
+
+    if isinstance(window_config.get("options"), dict):
+        for key, val in window_config["options"].items():
+            add("set-window-option", "-t", window, key, _option_value(val))
+
+    add("on_window_create", window, kind="hook")
+
+    ops.extend(compile_panes(window, window_config, environment=environment))
+
+    focus_pane: t.Optional[Ref] = None
+    for pane_position, pane_config in enumerate(panes):
+        if pane_config.get("focus"):
+            focus_pane = Ref("pane", window.window, pane_position)
+
+    if isinstance(window_config.get("options_after"), dict):
+        for key, val in window_config["options_after"].items():
+            add("set-window-option", "-t", window, key, _option_value(val))
+
+    add("after_window_finished", window, kind="hook")
+
+    if focus_pane is not None:
+        add("select-pane", "-t", focus_pane)
+
+    return ops
+
+
+def compile_panes(
+    window: Ref,
+    window_config: t.Dict[str, t.Any],
+    first_pane: int = 0,
+    environment: bool = True,
+) -> t.List[Operation]:
+    """Return operations creating the panes of ``window`` and sending their commands.
+
+    Panes before position ``first_pane`` are expected to exist already, the first
+    pane is created with the window.
+
+    >>> print(Plan(compile_panes(
+    ...     Ref("window", 2),
+    ...     {"layout": "tiled", "panes": [
+    ...         {"shell_command": []}, {"shell_command": [{"cmd": "top"}]},
+    ...     ]},
+    ...     first_pane=1,
+    ... )))
+    split-window -t {window 2 pane 0} -v
+    select-layout -t {window 2} tiled
+    send-keys -t {window 2 pane 1} ' top' Enter
+    """
+    ops: t.List[Operation] = []
+
+    def add(
+        cmd: str,
+        *args: t.Union[str, Ref],
+        kind: "OperationKind" = "tmux",
+        pane: t.Optional[int] = None,
+    ) -> None:
+        ops.append(Operation(kind, cmd, args, window=window.window, pane=pane))
+
+    panes = window_config["panes"]
+
+    layout = window_config.get("layout")
+    spec = layout if layouts.is_layout_spec(layout) else None
+    if spec is not None:
+        layouts.validate_layout(spec, len(panes))
+
+    for pane_position, pane_config in enumerate(panes):
+        if pane_position < first_pane:
+            continue
+        pane = Ref("pane", window.window, pane_position)
+
+        if pane_position > 0:
+            args: t.List[t.Union[str, Ref]] = [
+                "-t",
+                Ref("pane", window.window, pane_position - 1),
+            ]
+            if spec is not None:
+                args += layouts.split_args(spec, pane_position, len(panes))
+            else:
+                args.append("-v")
+            pane_start_directory = _pane_start_directory(pane_config, window_config)
+            if pane_start_directory is not None:
+                args += ["-c", _expanduser(pane_start_directory)]
+            pane_environment = pane_config.get(
+                "environment", window_config.get("environment")
+            )
+            if pane_environment and not environment:
+                if pane_config.get("environment"):
+                    logger.warning(
+                        "Cannot set environment for new panes. "
+                        "You need tmux 3.0 or newer for this."
+                    )
+                pane_environment = None
+            if pane_environment:
+                args += [f"-e{k}={v}" for k, v in pane_environment.items()]
+            shell = _pane_shell(pane_config, window_config)
+            if shell:
+                args.append(shell)
+            add("split-window", *args)
+
+        # Laying out a single pane is a no-op when more panes follow, layout
+        # specs are applied once all panes exist
+        if layout and spec is None and (pane_position > 0 or len(panes) == 1):
+            add("select-layout", "-t", window, layout)
+
+        if "suppress_history" in pane_config:
+            suppress = pane_config["suppress_history"]
+        else:
+            suppress = window_config.get("suppress_history", True)
+
+        enter = pane_config.get("enter", True)
+        sleep_before = pane_config.get("sleep_before", None)
+        sleep_after = pane_config.get("sleep_after", None)
+        wait_for = pane_config.get("wait_for", None)
+        commands: t.List[t.Dict[str, t.Any]] = []
+        for cmd in pane_config["shell_command"]:
+            enter = cmd.get("enter", enter)
+            sleep_before = cmd.get("sleep_before", sleep_before)
+            sleep_after = cmd.get("sleep_after", sleep_after)
+            # the pane's condition only applies to its first command
+            wait_for, condition = None, cmd.get("wait_for", wait_for)
+            commands.append(
+                {
+                    "cmd": cmd["cmd"],
+                    "enter": enter,
+                    "sleep_before": sleep_before,
+                    "sleep_after": sleep_after,
+                    "wait_for": condition,
+                }
+            )
+
+        pasted = pane_config.get("paste", window_config.get("paste", False))
+        if pasted:
+            commands = paste.join_commands(commands)
+
+        prefix = " " if suppress else ""
+        for command in commands:
+            if command["sleep_before"] is not None:
+                add("", str(command["sleep_before"]), kind="sleep", pane=pane_position)
+
+            if command["wait_for"] is not None:
+                condition = readiness.normalize_condition(command["wait_for"])
+                add("", pane, json.dumps(condition), kind="wait", pane=pane_position)
+
+            if pasted:
+                block = {
+                    "cmds": [prefix + cmd for cmd in command["cmd"]],
+                    "enter": command["enter"],
+                }
+                add("", pane, json.dumps(block), kind="paste", pane=pane_position)
+            else:
+                keys = [prefix + command["cmd"]]
+                if command["enter"]:
+                    keys.append("Enter")
+                add("send-keys", "-t", pane, *keys, pane=pane_position)
+
+            if command["sleep_after"] is not None:
+                add("", str(command["sleep_after"]), kind="sleep", pane=pane_position)
+
+    if spec is not None and first_pane < len(panes):
+        add("", window, json.dumps(spec), kind="layout")
+
+    return ops
+
+
+class PlanExecutor:
+    """Run a :class:`Plan` in a tmux session.
+
+    Subclasses decide how tmux commands are grouped into ``tmux(1)`` invocations.
+    Failing commands raise :exc:`~tmuxp.exc.TmuxCommandBatchError`.
+
+    Parameters
+    ----------
+    session : :class:`libtmux.Session`
+        session the plan's ``{session}`` refers to
+    hook : callable, optional
+        called with plugin hook name and :class:`libtmux.Window` for ``hook``
+        operations
+    timelines : :class:`~tmuxp.workspace.timeline.PaneTimelines`, optional
+        run the operations of a pane from its first delay or wait on in a thread,
+        instead of holding up the rest of the plan. Joined at the end of
+        :meth:`run`.
+    events : :class:`~tmuxp.workspace.events.EventBus`, optional
+        bus :class:`~tmuxp.workspace.events.BuildEvent` of windows, panes,
+        commands and layouts are emitted to. Panes created by splits and
+        commands are emitted without ``pane_id``.
+    progress : :class:`~tmuxp.workspace.journal.BuildProgress`, optional
+        records windows created and completed, for resuming a failed build
+    """
+
+    #: Send each tmux command as soon as it's queued
+    flush_each = True
+
+    def __init__(
+        self,
+        session: "Session",
+        hook: t.Optional["HookCallback"] = None,
+        timelines: t.Optional[PaneTimelines] = None,
+        events: t.Optional["EventBus"] = None,
+        progress: t.Optional["BuildProgress"] = None,
+    ) -> None:
+        self.session = session
+        self.server = session.server
+        self.hook = hook
+        self.timelines = timelines
+        self.events = events
+        self.progress = progress
+        self.windows: t.Dict[int, Window] = {}
+        self._pane_base_index: t.Optional[int] = None
+        self._lock = threading.RLock()
+
+    def run(self, plan: t.Iterable[Operation]) -> None:
+        """Run operations of ``plan`` in order."""
+        batch = CommandBatch(self.server)
+        self.run_operations(plan, batch)
+        batch.flush()
+        if self.timelines is not None:
+            self.timelines.join()
+
+    def run_operations(self, ops: t.Iterable[Operation], batch: CommandBatch) -> None:
+        """Run ``ops`` in order, pane timelines are started in :attr:`timelines`."""
+        timeline: t.List[Operation] = []
+        for op in ops:
+            if timeline:
+                if (op.window, op.pane) == (timeline[0].window, timeline[0].pane):
+                    timeline.append(op)
+                    continue
+                self._start_timeline(timeline, batch)
+                timeline = []
+
+            if (
+                self.timelines is not None
+                and op.pane is not None
+                and op.kind in ["sleep", "wait"]
+            ):
+                timeline.append(op)
+            else:
+                self.run_operation(op, batch)
+
+        if timeline:
+            self._start_timeline(timeline, batch)
+
+    def _start_timeline(self, ops: t.List[Operation], batch: CommandBatch) -> None:
+        assert self.timelines is not None
+        # the pane has to exist before its timeline targets it
+        batch.flush()
+        assert ops[0].window is not None
+        window_id = self.window(Ref("window", ops[0].window)).window_id
+        assert window_id is not None
+        if self.progress is not None:
+            self.progress.timeline_started(window_id)
+
+        def run() -> None:
+            timeline_batch = CommandBatch(self.server)
+            for op in ops:
+                self.run_operation(op, timeline_batch)
+            timeline_batch.flush()
+            if self.progress is not None:
+                self.progress.timeline_finished(window_id)
+
+        self.timelines.start(f"{ops[0].window}.{ops[0].pane}", [run])
+
+    def run_operation(self, op: Operation, batch: CommandBatch) -> None:
+        """Run ``op``, tmux commands are queued in ``batch``."""
+        if op.kind == "sleep":
+            batch.flush()
+            time.sleep(float(str(op.args[0])))
+        elif op.kind == "wait":
+            target = self.resolve(op.args[0], batch)
+            batch.flush()
+            readiness.wait_for(self.server, target, json.loads(str(op.args[1])))
+        elif op.kind == "layout":
+            target = self.resolve(op.args[0], batch)
+            batch.flush()
+            size = self.server.cmd(
+                "display-message", "-p", "-t", target, layouts.WINDOW_SIZE_FORMAT
+            ).stdout
+            width, height, panes = (int(value) for value in size[0].split())
+            spec = json.loads(str(op.args[1]))
+            layout = layouts.layout_string(spec, panes, width, height)
+            batch.add("select-layout", "-t", target, layout)
+            self._emit("layout_applied", op.window, layout=layout)
+            if self.flush_each:
+                batch.flush()
+        elif op.kind == "paste":
+            target = self.resolve(op.args[0], batch)
+            # the pane exists and has the keys sent before
+            batch.flush()
+            block = json.loads(str(op.args[1]))
+            paste.paste_commands(
+                self.server, target, block["cmds"], enter=block["enter"]
+            )
+            for cmd in block["cmds"]:
+                self._emit("command_sent", op.window, command=cmd.lstrip(" "))
+        elif op.kind == "hook":
+            assert isinstance(op.args[0], Ref)
+            if self.hook is not None:
+                batch.flush()
+                window = self.window(op.args[0])
+                with self._lock:
+                    self.hook(op.cmd, window)
+            if self.progress is not None and op.cmd == "after_window_finished":
+                window_id = self.window(op.args[0]).window_id
+                assert window_id is not None
+                batch.on_flush(
+                    functools.partial(
+                        self.progress.window_built, window_id, op.args[0].window
+                    )
+                )
+        else:
+            args = [self.resolve(arg, batch) for arg in op.args]
+            if op.creates is not None:
+                if op.cmd == "display-message":
+                    # an existing window becomes the window created
+                    args = [*args, format_fields(WINDOW_FIELDS)]
+                else:
+                    args = ["-P", "-F", format_fields(WINDOW_FIELDS), *args]
+            batch.add(op.cmd, *args)
+
+            if op.creates is not None:
+                output = batch.flush()
+                self.windows[op.creates.window] = Window(
+                    server=self.server, **parse_fields(WINDOW_FIELDS, output[-1])
+                )
+                self._emit("window_created", op.creates.window)
+                if self.progress is not None:
+                    window_id = self.windows[op.creates.window].window_id
+                    assert window_id is not None
+                    self.progress.window_created(window_id)
+                self._emit("pane_created", op.creates.window)
+            elif self.flush_each:
+                batch.flush()
+
+            if op.cmd == "split-window":
+                self._emit("pane_created", op.window)
+            elif op.cmd == "select-layout":
+                self._emit("layout_applied", op.window, layout=args[-1])
+            elif op.cmd == "send-keys" and op.pane is not None:
+                self._emit("command_sent", op.window, command=args[2].lstrip(" "))
+
+    def _emit(
+        self, kind: "EventKind", window: t.Optional[int], **fields: t.Optional[str]
+    ) -> None:
+        """Emit ``kind`` event of plan window ``window`` to :attr:`events`."""
+        if self.events is None:
+            return
+        created = self.windows.get(window) if window is not None else None
+        self.events.emit(
+            kind,
+            session_name=self.session.session_name,
+            window_id=created.window_id if created is not None else None,
+            window_name=created.window_name if created is not None else None,
+            **fields,
+        )
+
+    def window(self, ref: Ref) -> Window:
+        """Return window created for ``ref``."""
+        if ref.window not in self.windows:
+            assert ref.window == 0, f"{ref} used before it was created"
+            self.windows[0] = self.session.attached_window
+        return self.windows[ref.window]
+
+    def pane_base_index(self, batch: CommandBatch) -> int:
+        """Return ``pane-base-index``, once options set earlier in the plan apply."""
+        with self._lock:
+            if self._pane_base_index is None:
+                batch.flush()
+                proc = self.server.cmd("show-window-options", "-gv", "pane-base-index")
+                self._pane_base_index = int(proc.stdout[0]) if proc.stdout else 0
+            return self._pane_base_index
+
+    def resolve(self, arg: t.Union[str, Ref], batch: CommandBatch) -> str:
+        """Return tmux target for ``arg``, strings are returned as is.
+
+        Panes are targeted by index: each new pane splits the previous one, so it
+        is placed at the next index.
+        """
+        if not isinstance(arg, Ref):
+            return arg
+        if arg.kind == "session":
+            assert self.session.session_id is not None
+            return self.session.session_id + arg.suffix
+
+        window_id = self.window(arg).window_id
+        assert window_id is not None
+        if arg.kind == "window":
+            return window_id + arg.suffix
+        return f"{window_id}.{self.pane_base_index(batch) + arg.pane}{arg.suffix}"
+
+
+class SequentialExecutor(PlanExecutor):
+    """Run each tmux command of a plan in its own ``tmux(1)`` invocation."""
+
+    flush_each = True
+
+
+class BatchedExecutor(PlanExecutor):
+    """Send the tmux commands of a plan in as few ``tmux(1)`` invocations as possible.
+
+    Commands are queued until one needs its output (``new-window``), or a delay or
+    plugin hook needs the preceding commands to have run.
+    """
+
+    flush_each = False
+
+
+class ConcurrentExecutor(BatchedExecutor):
+    """Run the operations of different windows in parallel.
+
+    Windows are created in order, so they get the same indexes as when built
+    sequentially. The rest of each window's operations (splits, keys, delays,
+    hooks) run in a worker thread; session-wide operations wait for all windows
+    started before them. Plugin hooks are called one at a time.
+
+    Parameters
+    ----------
+    jobs : int
+        maximum number of windows built at the same time
+    """
+
+    def __init__(
+        self,
+        session: "Session",
+        hook: t.Optional["HookCallback"] = None,
+        timelines: t.Optional[PaneTimelines] = None,
+        events: t.Optional["EventBus"] = None,
+        progress: t.Optional["BuildProgress"] = None,
+        jobs: int = 4,
+    ) -> None:
+        super().__init__(
+            session=session,
+            hook=hook,
+            timelines=timelines,
+            events=events,
+            progress=progress,
+        )
+        self.jobs = jobs
+
+    def run(self, plan: t.Iterable[Operation]) -> None:
+        """Run operations of ``plan``, windows in parallel."""
+        batch = CommandBatch(self.server)
+        futures: t.List["Future[None]"] = []
+        group: t.List[Operation] = []
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+
+            def submit() -> None:
+                if group:
+                    batch.flush()
+                    futures.append(pool.submit(self._run_group, list(group)))
+                    group.clear()
+
+            def wait() -> None:
+                for future in futures:
+                    future.result()
+                futures.clear()
+
+            try:
+                for op in plan:
+                    if op.creates is not None or op.window is None:
+                        submit()
+                        if op.window is None:
+                            wait()
+                        self.run_operation(op, batch)
+                    else:
+                        if group and group[0].window != op.window:
+                            submit()
+                        group.append(op)
+                submit()
+                wait()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        batch.flush()
+        if self.timelines is not None:
+            self.timelines.join()
+
+    def _run_group(self, ops: t.List[Operation]) -> None:
+        batch = CommandBatch(self.server)
+        self.run_operations(ops, batch)
+        batch.flush()
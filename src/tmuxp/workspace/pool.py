@@ -0,0 +1,112 @@
+"""Pools of pre-built sessions, claimed by ``tmuxp load`` instead of building.
+
+``tmuxp pool`` keeps copies of workspaces built in detached sessions with hidden
+names, ``__tmuxp_pool_<digest>_<id>``. ``<digest>`` identifies the expanded
+workspace (see :func:`workspace_digest`), so editing a workspace file makes its
+pooled copies stale instead of loading outdated sessions.
+
+:func:`claim` takes a pooled copy by renaming it to the workspace's
+``session_name``. Copies are renamed by their exact hidden name, which only one
+rename can match: when two loads race for the same copy, even loads naming their
+session differently, one of them gets it and the other moves on to the next copy.
+"""
+
+import hashlib
+import json
+import logging
+import typing as t
+import uuid
+
+from libtmux.common import session_check_name
+from libtmux.session import Session
+
+if t.TYPE_CHECKING:
+    from libtmux.server import Server
+
+logger = logging.getLogger(__name__)
+
+#: Prefix of the names of pooled sessions
+POOL_PREFIX = "__tmuxp_pool_"
+
+#: Session user option holding the workspace file a pooled session was built from
+SOURCE_OPTION = "@tmuxp_pool_source"
+
+
+def workspace_digest(session_config: t.Dict[str, t.Any]) -> str:
+    """Return digest of an expanded workspace, regardless of its ``session_name``.
+
+    >>> workspace_digest({"session_name": "a", "windows": []})
+    '...'
+
+    >>> (
+    ...     workspace_digest({"session_name": "a", "windows": []})
+    ...     == workspace_digest({"session_name": "b", "windows": []})
+    ... )
+    True
+    """
+    content = {k: v for k, v in session_config.items() if k != "session_name"}
+    data = json.dumps(content, sort_keys=True, default=str).encode()
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def pool_session_name(digest: str) -> str:
+    """Return a new hidden session name for a copy of workspace ``digest``.
+
+    >>> pool_session_name("0123456789ab")
+    '__tmuxp_pool_0123456789ab_...'
+    """
+    return f"{POOL_PREFIX}{digest}_{uuid.uuid4().hex[:8]}"
+
+
+def pooled_sessions(
+    server: "Server", digest: t.Optional[str] = None
+) -> t.List["Session"]:
+    """Return pooled sessions on ``server``, only copies of ``digest`` if given."""
+    prefix = POOL_PREFIX if digest is None else f"{POOL_PREFIX}{digest}_"
+    if not server.is_alive():
+        return []
+    return [
+        session
+        for session in server.sessions
+        if session.session_name is not None and session.session_name.startswith(prefix)
+    ]
+
+
+def session_source(session: "Session") -> t.Optional[str]:
+    """Return workspace file pooled ``session`` was built from."""
+    proc = session.cmd("show-options", "-v", SOURCE_OPTION)
+    return proc.stdout[0] if proc.stdout and not proc.stderr else None
+
+
+def claim(
+    server: "Server", session_config: t.Dict[str, t.Any]
+) -> t.Optional["Session"]:
+    """Rename a pooled copy of ``session_config`` to its ``session_name``.
+
+    Costs a single ``list-sessions`` when there's no copy to claim.
+
+    Returns the claimed session, or None if there's no copy left.
+    """
+    session_name = session_config["session_name"]
+    session_check_name(session_name)
+
+    proc = server.cmd("list-sessions", "-F", "#{session_id} #{session_name}")
+    sessions = [line.split(" ", 1) for line in proc.stdout if " " in line]
+    if any(name == session_name for _, name in sessions):
+        return None
+
+    prefix = f"{POOL_PREFIX}{workspace_digest(session_config)}_"
+    for session_id, name in sessions:
+        if not name.startswith(prefix):
+            continue
+        # "=" matches the exact name: once someone renamed this copy, it's gone
+        proc = server.cmd("rename-session", "-t", f"={name}", session_name)
+        if proc.stderr:
+            # claimed by someone else in the meantime
+            logger.debug(f"{name} not claimed: {proc.stderr}")
+            continue
+
+        server.cmd("set-option", "-t", session_id, "-u", SOURCE_OPTION)
+        logger.debug(f"claimed {session_id} as {session_name}")
+        return Session.from_session_id(server=server, session_id=session_id)
+    return None
@@ -0,0 +1,165 @@
+r"""Wait for panes to be ready before sending them commands.
+
+A ``wait_for`` condition on a pane or command holds back ``send-keys`` until the
+pane is ready, instead of guessing a delay with ``sleep_before``:
+
+.. code-block:: yaml
+
+    panes:
+      - wait_for:
+          prompt: true
+        shell_command:
+          - cmd: ./manage.py runserver
+          - cmd: curl localhost:8000
+            wait_for:
+              port: 8000
+              timeout: 60
+
+A pane's ``wait_for`` is checked before its first command, a command's
+``wait_for`` before that command. A string is short for ``{pattern: <string>}``.
+Conditions:
+
+``pattern``
+  regular expression searched in the visible pane content (``capture-pane``)
+``prompt``
+  the last non-empty line of the pane ends like a shell prompt, see
+  :data:`PROMPT_PATTERN`
+``file``
+  path exists
+``port``
+  TCP ``port`` on ``host`` (default ``localhost``) accepts connections
+
+All given conditions have to hold. ``timeout`` (seconds, default
+:data:`DEFAULT_TIMEOUT`) bounds the wait, ``interval`` the time between checks
+(:data:`DEFAULT_INTERVAL`). Checks start fast and back off up to ``interval``.
+"""
+
+import logging
+import os
+import re
+import socket
+import time
+import typing as t
+
+from .. import exc
+from .validation import InvalidWaitForValidationError
+
+if t.TYPE_CHECKING:
+    from libtmux.server import Server
+
+logger = logging.getLogger(__name__)
+
+#: Seconds to wait for a condition before raising :exc:`~tmuxp.exc.WaitForTimeout`
+DEFAULT_TIMEOUT = 30.0
+
+#: Longest pause between two checks of a condition, in seconds
+DEFAULT_INTERVAL = 0.5
+
+#: Pause before the second check, doubled after each failed check
+FIRST_INTERVAL = 0.02
+
+#: Matches the last line of a pane showing a shell prompt
+PROMPT_PATTERN = "[$#%>\u276f\u00bb]\\s*$"
+
+CONDITION_KEYS = frozenset(
+    ["pattern", "prompt", "file", "port", "host", "timeout", "interval"]
+)
+
+
+def normalize_condition(value: t.Any) -> t.Dict[str, t.Any]:
+    """Return ``wait_for`` value as a :py:obj:`dict`.
+
+    >>> normalize_condition("ready>")
+    {'pattern': 'ready>'}
+
+    >>> normalize_condition({"port": 8000, "timeout": 5})
+    {'port': 8000, 'timeout': 5}
+
+    >>> normalize_condition({"pid": 1})
+    Traceback (most recent call last):
+    ...
+    tmuxp.workspace.validation.InvalidWaitForValidationError: ...
+    """
+    if isinstance(value, str):
+        return {"pattern": value}
+    if not isinstance(value, dict) or set(value) - CONDITION_KEYS:
+        raise InvalidWaitForValidationError(value)
+    return dict(value)
+
+
+def describe_condition(condition: t.Dict[str, t.Any]) -> str:
+    """Return ``condition`` as text for plans and messages.
+
+    >>> describe_condition({"pattern": "ready", "timeout": 5})
+    'pattern=ready timeout=5'
+    """
+    return " ".join(f"{key}={value}" for key, value in condition.items())
+
+
+def _port_open(host: str, port: int) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=0.2):
+            return True
+    except OSError:
+        return False
+
+
+def check_condition(
+    server: "Server", target: str, condition: t.Dict[str, t.Any]
+) -> bool:
+    """Return True if pane ``target`` satisfies ``condition``."""
+    if "file" in condition and not os.path.exists(  # noqa: PTH110
+        os.path.expanduser(condition["file"])  # noqa: PTH111
+    ):
+        return False
+
+    if "port" in condition and not _port_open(
+        condition.get("host", "localhost"), int(condition["port"])
+    ):
+        return False
+
+    if "pattern" in condition or condition.get("prompt"):
+        content = server.cmd("capture-pane", "-p", "-J", "-t", target).stdout
+
+        if "pattern" in condition and not re.search(
+            condition["pattern"], "\n".join(content), re.MULTILINE
+        ):
+            return False
+
+        if condition.get("prompt"):
+            lines = [line for line in content if line.strip()]
+            if not lines or not re.search(PROMPT_PATTERN, lines[-1]):
+                return False
+
+    return True
+
+
+def wait_for(server: "Server", target: str, condition: t.Any) -> None:
+    """Block until pane ``target`` satisfies ``wait_for`` ``condition``.
+
+    Raises :exc:`~tmuxp.exc.WaitForTimeout` if it doesn't within its ``timeout``.
+
+    Examples
+    --------
+    >>> pane.send_keys("echo ready-$((20 + 22))")
+    >>> wait_for(server, pane.pane_id, "ready-42")
+
+    >>> wait_for(server, pane.pane_id, {"pattern": "never", "timeout": 0.1})
+    Traceback (most recent call last):
+    ...
+    tmuxp.exc.WaitForTimeout: ...
+    """
+    condition = normalize_condition(condition)
+    timeout = float(condition.get("timeout", DEFAULT_TIMEOUT))
+    max_interval = float(condition.get("interval", DEFAULT_INTERVAL))
+
+    deadline = time.monotonic() + timeout
+    interval = min(FIRST_INTERVAL, max_interval)
+    while not check_condition(server, target, condition):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise exc.WaitForTimeout(target, describe_condition(condition))
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, max_interval)
+
+    logger.debug(f"{target} ready: {describe_condition(condition)}")
@@ -0,0 +1,287 @@
+"""Bring a running session in line with its workspace, for ``tmuxp load --sync``.
+
+:func:`compile_sync` compares a session with an expanded and trickled workspace
+and returns a :class:`~tmuxp.workspace.planner.Plan` of only what's missing or
+changed:
+
+- session and global options, and session environment variables that differ
+- windows whose ``window_name`` isn't in the session, built from scratch
+- panes missing from the end of existing windows, split and sent their commands
+- window options (``options`` and ``options_after``) that differ
+
+Nothing is removed: windows and panes not in the workspace, and the commands
+running in existing panes, are left alone. The working directory of existing
+panes isn't reconciled either, changing it would mean typing ``cd`` into whatever
+runs in the pane or respawning it; panes whose ``pane_current_path`` isn't their
+``start_directory`` are logged as a warning instead.
+"""
+
+import logging
+import pathlib
+import shlex
+import typing as t
+
+from libtmux.common import handle_option_error
+
+from .. import exc
+from .batch import CommandBatch, option_value
+from .planner import (
+    Operation,
+    Plan,
+    Ref,
+    _pane_start_directory,
+    compile_panes,
+    compile_window,
+)
+
+if t.TYPE_CHECKING:
+    from libtmux.server import Server
+    from libtmux.session import Session
+    from libtmux.window import Window
+
+logger = logging.getLogger(__name__)
+
+
+def parse_options(lines: t.Iterable[str]) -> t.Dict[str, str]:
+    """Return ``show-options`` output as :py:obj:`dict` of unquoted values.
+
+    >>> parse_options(['base-index 1', 'status-left "[#S] "', 'mouse on'])
+    {'base-index': '1', 'status-left': '[#S] ', 'mouse': 'on'}
+    """
+    options = {}
+    for line in lines:
+        name, _, value = line.partition(" ")
+        try:
+            words = shlex.split(value)
+        except ValueError:
+            words = [value]
+        options[name] = words[0] if len(words) == 1 else value
+    return options
+
+
+def _show_options(server: "Server", *args: str) -> t.Dict[str, str]:
+    return parse_options(server.cmd(*args).stdout)
+
+
+def _show_environment(server: "Server", session_id: str) -> t.Dict[str, str]:
+    return dict(
+        line.split("=", 1)
+        for line in server.cmd("show-environment", "-t", session_id).stdout
+        if "=" in line
+    )
+
+
+def changed_options(
+    current: t.Dict[str, str], options: t.Dict[str, t.Any]
+) -> t.Dict[str, str]:
+    """Return ``options`` whose values differ from ``current``, as tmux values.
+
+    >>> changed_options(
+    ...     {"mouse": "on", "base-index": "0"}, {"mouse": True, "base-index": 1}
+    ... )
+    {'base-index': '1'}
+    """
+    return {
+        key: str(option_value(value))
+        for key, value in options.items()
+        if current.get(key) != str(option_value(value))
+    }
+
+
+def _option_ops(
+    current: t.Dict[str, str],
+    options: t.Dict[str, t.Any],
+    cmd: str,
+    *target: t.Union[str, Ref],
+    window: t.Optional[int] = None,
+) -> t.List[Operation]:
+    return [
+        Operation("tmux", cmd, (*target, key, value), window=window)
+        for key, value in changed_options(current, options).items()
+    ]
+
+
+def apply_options(
+    server: "Server",
+    options: t.Dict[str, t.Any],
+    show_args: t.Sequence[str],
+    set_args: t.Sequence[str],
+) -> int:
+    """Set ``options`` that differ from their current values.
+
+    Current values are read with one ``show_args`` command (e.g. ``show-options
+    -t $1``), the changed options are set in one batched invocation of
+    ``set_args`` commands (e.g. ``set-option -t $1``). Returns the number of
+    options set.
+
+    Raises the same :exc:`libtmux.exc.OptionError` as
+    :meth:`libtmux.Session.set_option`.
+
+    >>> apply_options(
+    ...     server,
+    ...     {"display-time": 1500, "mouse": True},
+    ...     ["show-options", "-t", session.session_id],
+    ...     ["set-option", "-t", session.session_id],
+    ... )
+    2
+
+    >>> apply_options(
+    ...     server,
+    ...     {"display-time": 1500, "mouse": True},
+    ...     ["show-options", "-t", session.session_id],
+    ...     ["set-option", "-t", session.session_id],
+    ... )
+    0
+    """
+    if not options:
+        return 0
+
+    changed = changed_options(_show_options(server, *show_args), options)
+    batch = CommandBatch(server)
+    for key, value in changed.items():
+        batch.add(*set_args, key, value)
+    try:
+        batch.flush()
+    except exc.TmuxCommandBatchError as e:
+        handle_option_error(e.stderr[0])
+    return len(changed)
+
+
+def apply_environment(
+    server: "Server", session_id: str, environment: t.Dict[str, t.Any]
+) -> int:
+    """Set session ``environment`` variables that differ, like :func:`apply_options`.
+
+    Returns the number of variables set.
+    """
+    if not environment:
+        return 0
+
+    current = _show_environment(server, session_id)
+    batch = CommandBatch(server)
+    for name, value in environment.items():
+        if current.get(name) != str(value):
+            batch.add("set-environment", "-t", session_id, name, str(value))
+    changed = len(batch)
+    batch.flush()
+    return changed
+
+
+def _same_directory(path: str, current_path: t.Optional[str]) -> bool:
+    if current_path is None:
+        return False
+    return (
+        pathlib.Path(path).expanduser().resolve()
+        == pathlib.Path(current_path).resolve()
+    )
+
+
+def compile_sync(
+    session: "Session",
+    session_config: t.Dict[str, t.Any],
+    environment: bool = True,
+) -> t.Tuple[Plan, t.Dict[int, "Window"]]:
+    """Return plan syncing ``session`` with ``session_config``.
+
+    Also returns the existing windows, by workspace position, the plan's
+    :class:`~tmuxp.workspace.planner.Ref` placeholders refer to; bind them to the
+    executor's :attr:`~tmuxp.workspace.planner.PlanExecutor.windows` before running
+    the plan.
+
+    Windows are matched by ``window_name``, panes by position.
+    """
+    server = session.server
+    assert session.session_id is not None
+    session_ref = Ref("session")
+    plan = Plan()
+
+    plan.extend(
+        _option_ops(
+            _show_options(server, "show-options", "-t", session.session_id),
+            session_config.get("options", {}),
+            "set-option",
+            "-t",
+            session_ref,
+        )
+    )
+    plan.extend(
+        _option_ops(
+            _show_options(server, "show-options", "-g"),
+            session_config.get("global_options", {}),
+            "set-option",
+            "-g",
+        )
+    )
+
+    current_environment = _show_environment(server, session.session_id)
+    for name, value in session_config.get("environment", {}).items():
+        if current_environment.get(name) != str(value):
+            plan.append(
+                Operation(
+                    "tmux", "set-environment", ("-t", session_ref, name, str(value))
+                )
+            )
+
+    unmatched = list(session.windows)
+    windows: t.Dict[int, "Window"] = {}
+    for position, window_config in enumerate(session_config["windows"], 1):
+        window_ref = Ref("window", position)
+        existing = next(
+            (
+                window
+                for window in unmatched
+                if window.window_name == window_config.get("window_name")
+            ),
+            None,
+        )
+        if existing is None:
+            logger.debug(f"sync: creating window {window_config.get('window_name')}")
+            plan.extend(
+                compile_window(
+                    window_ref,
+                    window_config,
+                    replace_first_window=False,
+                    environment=environment,
+                )
+            )
+            continue
+
+        unmatched.remove(existing)
+        windows[position] = existing
+        assert existing.window_id is not None
+
+        window_options = {
+            **(window_config.get("options") or {}),
+            **(window_config.get("options_after") or {}),
+        }
+        plan.extend(
+            _option_ops(
+                _show_options(server, "show-window-options", "-t", existing.window_id),
+                window_options,
+                "set-window-option",
+                "-t",
+                window_ref,
+                window=position,
+            )
+        )
+        existing_panes = existing.panes
+        for pane, pane_config in zip(existing_panes, window_config["panes"]):
+            start_directory = _pane_start_directory(pane_config, window_config)
+            if start_directory and not _same_directory(
+                start_directory, pane.pane_current_path
+            ):
+                logger.warning(
+                    f"sync: pane {pane.pane_id} of {existing.window_name} is in "
+                    f"{pane.pane_current_path}, not {start_directory}; "
+                    "leaving it there"
+                )
+        plan.extend(
+            compile_panes(
+                window_ref,
+                window_config,
+                first_pane=len(existing_panes),
+                environment=environment,
+            )
+        )
+
+    return plan, windows
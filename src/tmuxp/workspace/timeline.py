@@ -0,0 +1,102 @@
+"""Run the delays of each pane on its own timeline.
+
+By default ``sleep_before``, ``sleep_after`` and ``wait_for`` hold up the whole
+build: a delay in one pane postpones every window and pane created after it. With
+:class:`PaneTimelines`, the commands of a pane are sent in order from the first
+delay on, as one task of a bounded thread pool, while the rest of the session
+keeps building. Loading then takes about as long as the longest pane, not the sum
+of all delays.
+
+Commands of different panes are no longer ordered by their delays: a
+``sleep_after`` in one pane doesn't hold back the commands of the next one.
+"""
+
+import logging
+import threading
+import typing as t
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+#: Step of a pane timeline: a delay, a readiness check or sending keys
+Step = t.Callable[[], None]
+
+#: Default maximum number of pane timelines running at the same time
+MAX_WORKERS = 32
+
+
+class PaneTimelines:
+    """Pool running the remaining steps of panes, joined by :meth:`join`.
+
+    Each pane's steps are one task, at most ``max_workers`` panes run at the same
+    time, the others wait for a free worker.
+
+    >>> import time
+    >>> timelines = PaneTimelines()
+    >>> sent = []
+    >>> start = time.monotonic()
+    >>> timelines.start("%1", [lambda: time.sleep(0.2), lambda: sent.append(1)])
+    >>> timelines.start("%2", [lambda: time.sleep(0.2), lambda: sent.append(2)])
+    >>> timelines.join()
+    >>> sorted(sent), time.monotonic() - start < 0.4
+    ([1, 2], True)
+
+    With one worker, panes run one after the other:
+
+    >>> timelines = PaneTimelines(max_workers=1)
+    >>> sent = []
+    >>> timelines.start("%1", [lambda: time.sleep(0.1), lambda: sent.append(1)])
+    >>> timelines.start("%2", [lambda: sent.append(2)])
+    >>> timelines.join()
+    >>> sent
+    [1, 2]
+
+    Errors are raised again by :meth:`join`:
+
+    >>> timelines.start("%3", [lambda: 1 / 0])
+    >>> timelines.join()
+    Traceback (most recent call last):
+    ...
+    ZeroDivisionError: division by zero
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS) -> None:
+        self.max_workers = max_workers
+        self._pool: t.Optional[ThreadPoolExecutor] = None
+        self._futures: t.List["Future[None]"] = []
+        self._lock = threading.Lock()
+
+    def start(self, name: str, steps: t.Iterable[Step]) -> None:
+        """Run ``steps`` in order, as one task for pane ``name``."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="tmuxp-pane"
+                )
+            self._futures.append(self._pool.submit(self._run, name, list(steps)))
+
+    def _run(self, name: str, steps: t.List[Step]) -> None:
+        try:
+            for step in steps:
+                step()
+        except BaseException as e:
+            logger.debug(f"timeline of {name} failed: {e}")
+            raise
+
+    def join(self) -> None:
+        """Wait for all started timelines, raise the first error of any of them."""
+        errors: t.List[BaseException] = []
+        while True:
+            with self._lock:
+                if not self._futures:
+                    pool, self._pool = self._pool, None
+                    break
+                future = self._futures.pop(0)
+            error = future.exception()
+            if error is not None:
+                errors.append(error)
+
+        if pool is not None:
+            pool.shutdown()
+        if errors:
+            raise errors[0]
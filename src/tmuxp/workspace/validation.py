@@ -56,6 +56,37 @@ class InvalidPluginsValidationError(SchemaValidationError):
         )
 
 
+class InvalidWaitForValidationError(SchemaValidationError):
+    """Tmuxp configuration error for invalid wait_for conditions."""
+
+    def __init__(self, wait_for: t.Any, *args: object, **kwargs: object) -> None:
+        return super().__init__(
+            '"wait_for" only supports a pattern or a mapping of conditions. '
+            + f"Received: {wait_for!r}",
+            *args,
+            **kwargs,
+        )
+
+
+class InvalidLayoutValidationError(SchemaValidationError):
+    """Tmuxp configuration error for invalid layout specs."""
+
+    def __init__(
+        self,
+        layout: t.Any,
+        panes: t.Optional[int] = None,
+        *args: object,
+        **kwargs: object,
+    ) -> None:
+        return super().__init__(
+            '"layout" only supports a tmux layout or one of rows, columns, grid or '
+            + f"main matching the panes. Received: {layout!r}"
+            + (f" for {panes} panes" if panes is not None else ""),
+            *args,
+            **kwargs,
+        )
+
+
 def validate_schema(workspace_dict: t.Any) -> bool:
     """
     Return True if workspace schema is correct.
@@ -25,6 +25,8 @@ def test_debug_info_cli(
     assert "tmux path" in cli_output
     assert "tmuxp path" in cli_output
     assert "shell" in cli_output
+    assert "yaml backend" in cli_output
+    assert "json backend" in cli_output
     assert "tmux session" in cli_output
     assert "tmux windows" in cli_output
     assert "tmux panes" in cli_output
@@ -1,6 +1,7 @@
 """CLI tests for tmuxp load."""
 import contextlib
 import io
+import json
 import pathlib
 import typing as t
 
@@ -19,8 +20,11 @@ from tmuxp.cli.load import (
     load_plugins,
     load_workspace,
 )
+from tmuxp.control import ControlModeServer
 from tmuxp.workspace import loader
 from tmuxp.workspace.builder import WorkspaceBuilder
+from tmuxp.workspace.journal import Journal, write_journal
+from tmuxp.workspace.pool import workspace_digest
 
 from ..constants import FIXTURE_PATH
 from ..fixtures import utils as test_utils
@@ -46,6 +50,150 @@ def test_load_workspace(
     assert session.name == "sample workspace"
 
 
+def test_load_workspace_control_mode(
+    server: "Server",
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test tmuxp load over a tmux control mode connection."""
+    monkeypatch.delenv("TMUX", raising=False)
+    session_file = FIXTURE_PATH / "workspace/builder" / "two_pane.yaml"
+
+    session = load_workspace(
+        session_file, socket_name=server.socket_name, detached=True, control_mode=True
+    )
+
+    assert isinstance(session, Session)
+    assert isinstance(session.server, ControlModeServer)
+    assert session.server.control.connected
+    assert session.name == "sample workspace"
+    assert len(session.windows) == 3
+
+    session.server.close()
+
+
+def test_load_workspace_plan(
+    server: "Server",
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test tmuxp load --plan prints the build plan without loading."""
+    session_file = FIXTURE_PATH / "workspace/builder" / "two_pane.yaml"
+
+    session = load_workspace(session_file, socket_name=server.socket_name, plan=True)
+
+    assert session is None
+    assert not server.is_alive()
+
+    output = capsys.readouterr().out
+    assert "new-window -d -c" in output
+    assert "select-layout -t {window 1} main-vertical" in output
+
+
+def test_load_workspace_sync(
+    server: "Server",
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: pathlib.Path,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test tmuxp load --sync adds what's missing to a running session."""
+    monkeypatch.delenv("TMUX", raising=False)
+    session_file = tmp_path / "sync.yaml"
+    session_file.write_text(
+        (FIXTURE_PATH / "workspace/builder" / "two_pane.yaml").read_text()
+    )
+
+    session = load_workspace(
+        session_file, socket_name=server.socket_name, detached=True
+    )
+    assert isinstance(session, Session)
+
+    session_file.write_text(
+        session_file.read_text()
+        + "- window_name: added\n  panes:\n  - shell_command: []\n"
+    )
+    load_workspace(
+        session_file, socket_name=server.socket_name, detached=True, sync=True
+    )
+
+    assert "Synced" in capsys.readouterr().out
+    assert [window.window_name for window in session.windows] == [
+        "editor",
+        "logging",
+        "test",
+        "added",
+    ]
+
+
+def test_load_workspace_resume(
+    server: "Server",
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test tmuxp load --resume continues a build that failed."""
+    monkeypatch.delenv("TMUX", raising=False)
+    session_file = FIXTURE_PATH / "workspace/builder" / "two_pane.yaml"
+
+    session = load_workspace(
+        session_file, socket_name=server.socket_name, detached=True
+    )
+    assert isinstance(session, Session)
+    load_workspace(
+        session_file, socket_name=server.socket_name, detached=True, resume=True
+    )
+    assert "has no failed build to resume" in capsys.readouterr().out
+
+    # a build that stopped after its first window
+    workspace = loader.trickle(
+        loader.expand(ConfigReader._from_file(session_file), cwd=session_file.parent)
+    )
+    journal = Journal(digest=workspace_digest(workspace), completed=[1])
+    for window in session.windows[1:]:
+        window.kill_window()
+    write_journal(session, journal)
+
+    load_workspace(
+        session_file, socket_name=server.socket_name, detached=True, resume=True
+    )
+
+    assert "Resumed" in capsys.readouterr().out
+    assert [window.window_name for window in session.windows] == [
+        "editor",
+        "logging",
+        "test",
+    ]
+
+
+def test_load_workspace_cache(
+    server: "Server",
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: pathlib.Path,
+) -> None:
+    """Test tmuxp load --cache reuses the expanded workspace of the file."""
+    monkeypatch.delenv("TMUX", raising=False)
+    monkeypatch.setenv("TMUXP_CACHEDIR", str(tmp_path / "cache"))
+    session_file = FIXTURE_PATH / "workspace/builder" / "two_pane.yaml"
+
+    session = load_workspace(
+        session_file, socket_name=server.socket_name, detached=True, cache=True
+    )
+    assert isinstance(session, Session)
+    assert len(list((tmp_path / "cache" / "workspaces").glob("*.pickle"))) == 1
+    session.kill_session()
+
+    reads: t.List[pathlib.Path] = []
+    monkeypatch.setattr(ConfigReader, "_from_file", reads.append)
+    session = load_workspace(
+        session_file,
+        socket_name=server.socket_name,
+        detached=True,
+        cache=True,
+        new_session_name="from cache",
+    )
+    assert isinstance(session, Session)
+    assert session.name == "from cache"
+    assert len(session.windows) == 3
+    assert reads == []
+
+
 def test_load_workspace_passes_tmux_config(
     server: "Server",
     monkeypatch: pytest.MonkeyPatch,
@@ -268,6 +416,46 @@ TEST_LOAD_FIXTURES: t.List[CLILoadFixture] = [
         expected_in_out=None,
         expected_not_in_out=None,
     ),
+    CLILoadFixture(
+        test_id="configdir-session-name-jobs",
+        cli_args=["load", "--jobs", "2", "my_config", "second_config", "third_config"],
+        config_paths=[
+            "{TMUXP_CONFIGDIR}/my_config.yaml",
+            "{TMUXP_CONFIGDIR}/second_config.yaml",
+            "{TMUXP_CONFIGDIR}/third_config.yaml",
+        ],
+        session_names=["my_config", "second_config", "third_config"],
+        expected_exit_code=0,
+        expected_in_out=None,
+        expected_not_in_out=None,
+        expected_not_in_err="1/1 windows",
+    ),
+    CLILoadFixture(
+        test_id="configdir-session-name-jobs-progress",
+        cli_args=[
+            "load",
+            "--jobs",
+            "2",
+            "--progress",
+            "my_config",
+            "second_config",
+            "third_config",
+        ],
+        config_paths=[
+            "{TMUXP_CONFIGDIR}/my_config.yaml",
+            "{TMUXP_CONFIGDIR}/second_config.yaml",
+            "{TMUXP_CONFIGDIR}/third_config.yaml",
+        ],
+        session_names=["my_config", "second_config", "third_config"],
+        expected_exit_code=0,
+        expected_in_out=None,
+        expected_not_in_out=None,
+        expected_in_err=[
+            "my_config: 1/1 windows",
+            "second_config: 1/1 windows",
+            "third_config: 1/1 windows",
+        ],
+    ),
 ]
 
 
@@ -331,6 +519,18 @@ def test_load(
         for needle in expected_not_in_out:
             assert needle not in output
 
+    if expected_in_err is not None:
+        if isinstance(expected_in_err, str):
+            expected_in_err = [expected_in_err]
+        for needle in expected_in_err:
+            assert needle in result.err
+
+    if expected_not_in_err is not None:
+        if isinstance(expected_not_in_err, str):
+            expected_not_in_err = [expected_not_in_err]
+        for needle in expected_not_in_err:
+            assert needle not in result.err
+
     for session_name in session_names:
         assert server.has_session(session_name)
 
@@ -442,6 +642,42 @@ session_name: hello
     assert result.out is not None
 
 
+def test_load_trace(
+    server: "Server",
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test tmuxp load --trace writes spans of the load as Chrome trace events."""
+    monkeypatch.delenv("TMUX", raising=False)
+    session_file = FIXTURE_PATH / "workspace/builder" / "two_pane.yaml"
+    trace_file = tmp_path / "trace.json"
+
+    cli.cli(
+        [
+            "load",
+            str(session_file),
+            "-d",
+            "-L",
+            str(server.socket_name),
+            "--trace",
+            str(trace_file),
+        ]
+    )
+
+    events = json.loads(trace_file.read_text())["traceEvents"]
+    spans = [event for event in events if event["ph"] == "X"]
+    names = [event["name"] for event in spans]
+    for name in ["read workspace", "normalize", "load plugins", "build"]:
+        assert name in names
+    assert names.count("create window") == 3
+
+    tmux_commands = [event for event in spans if event["cat"] == "tmux"]
+    new_window = next(e for e in tmux_commands if e["name"] == "new-window")
+    assert new_window["args"]["returncode"] == 0
+    assert "new-window" in new_window["args"]["argv"]
+    assert all(event["dur"] >= 0 for event in spans)
+
+
 def test_load_plugins(
     monkeypatch_plugin_test_packages: None,
 ) -> None:
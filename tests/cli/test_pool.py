@@ -0,0 +1,113 @@
+"""CLI tests for tmuxp pool command."""
+import pathlib
+import typing as t
+
+import pytest
+from libtmux.server import Server
+from libtmux.session import Session
+
+from tmuxp import cli
+from tmuxp._internal.config_reader import ConfigReader
+from tmuxp.cli.load import load_workspace
+from tmuxp.workspace import loader
+from tmuxp.workspace.pool import POOL_PREFIX, claim, pooled_sessions
+
+from ..constants import FIXTURE_PATH
+
+
+@pytest.fixture
+def workspace_file(tmp_path: pathlib.Path) -> pathlib.Path:
+    """Return copy of a workspace fixture that tests can edit."""
+    workspace_file = tmp_path / "pooled.yaml"
+    workspace_file.write_text(
+        (FIXTURE_PATH / "workspace/builder" / "two_pane.yaml").read_text()
+    )
+    return workspace_file
+
+
+def test_pool_claim(
+    server: Server,
+    monkeypatch: pytest.MonkeyPatch,
+    workspace_file: pathlib.Path,
+) -> None:
+    """Tmuxp load claims pooled copies, tmuxp pool replaces them."""
+    monkeypatch.delenv("TMUX", raising=False)
+    pool_args = ["pool", "-L", str(server.socket_name), "--once", "-n", "2"]
+
+    cli.cli([*pool_args, str(workspace_file)])
+    pooled = pooled_sessions(server)
+    assert len(pooled) == 2
+
+    session = load_workspace(
+        workspace_file, socket_name=server.socket_name, detached=True
+    )
+
+    assert isinstance(session, Session)
+    assert session.session_name == "sample workspace"
+    assert session.session_id in [s.session_id for s in pooled]
+    assert len(session.windows) == 3
+    assert len(pooled_sessions(server)) == 1
+
+    cli.cli([*pool_args, str(workspace_file)])
+    assert len(pooled_sessions(server)) == 2
+
+
+def test_pool_stale(
+    server: Server,
+    monkeypatch: pytest.MonkeyPatch,
+    workspace_file: pathlib.Path,
+) -> None:
+    """Copies of an older version of a workspace file are replaced, not claimed."""
+    monkeypatch.delenv("TMUX", raising=False)
+    pool_args = ["pool", "-L", str(server.socket_name), "--once"]
+
+    cli.cli([*pool_args, str(workspace_file)])
+    (stale,) = pooled_sessions(server)
+
+    workspace_file.write_text(
+        workspace_file.read_text()
+        + "- window_name: added\n  panes:\n  - shell_command: []\n"
+    )
+    session = load_workspace(
+        workspace_file, socket_name=server.socket_name, detached=True
+    )
+    assert isinstance(session, Session)
+    assert session.session_id != stale.session_id
+    assert len(session.windows) == 4
+
+    cli.cli([*pool_args, str(workspace_file)])
+    (fresh,) = pooled_sessions(server)
+    assert fresh.session_id != stale.session_id
+
+    cli.cli([*pool_args, "--kill", str(workspace_file)])
+    assert not [
+        s for s in server.sessions if str(s.session_name).startswith(POOL_PREFIX)
+    ]
+
+
+def test_pool_claim_race(
+    server: Server,
+    monkeypatch: pytest.MonkeyPatch,
+    workspace_file: pathlib.Path,
+) -> None:
+    """A copy claimed under another name in the meantime isn't claimed again."""
+    monkeypatch.delenv("TMUX", raising=False)
+    cli.cli(["pool", "-L", str(server.socket_name), "--once", str(workspace_file)])
+    (pooled,) = pooled_sessions(server)
+    workspace = loader.normalize(
+        ConfigReader._from_file(workspace_file), cwd=workspace_file.parent
+    )
+
+    cmd = server.cmd
+
+    def racing_cmd(*args: t.Any, **kwargs: t.Any) -> t.Any:
+        if args[0] == "rename-session":
+            # another load, naming its session differently, wins the race
+            cmd("rename-session", "-t", str(pooled.session_id), "other")
+        return cmd(*args, **kwargs)
+
+    monkeypatch.setattr(server, "cmd", racing_cmd)
+
+    assert claim(server, workspace) is None
+    assert not server.has_session(workspace["session_name"])
+    assert server.has_session("other")
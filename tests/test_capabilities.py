@@ -0,0 +1,87 @@
+"""Tests for tmuxp's tmux capability registry."""
+import os
+import pathlib
+import typing as t
+
+import pytest
+from libtmux.exc import VersionTooLow
+
+from tmuxp import capabilities
+
+
+@pytest.fixture
+def fake_tmux(tmp_path: pathlib.Path) -> t.Callable[[str], str]:
+    """Return function writing a ``tmux`` printing a version and counting probes."""
+    tmux_bin = tmp_path / "tmux"
+
+    def write(version: str) -> str:
+        tmux_bin.write_text(
+            "#!/bin/sh\n"
+            f'echo probed >> "{tmp_path}/probes"\n'
+            f'echo "tmux {version}"\n'
+        )
+        tmux_bin.chmod(0o755)
+        return str(tmux_bin)
+
+    return write
+
+
+def probes(tmp_path: pathlib.Path) -> int:
+    """Return number of times the fake tmux was run."""
+    probes_file = tmp_path / "probes"
+    return len(probes_file.read_text().splitlines()) if probes_file.exists() else 0
+
+
+@pytest.fixture(autouse=True)
+def clear_registry() -> t.Iterator[None]:
+    """Forget probes between tests."""
+    capabilities.clear()
+    yield
+    capabilities.clear()
+
+
+def test_probed_once(fake_tmux: t.Callable[[str], str], tmp_path: pathlib.Path) -> None:
+    """Each binary is probed once, then again when it changes."""
+    tmux_bin = fake_tmux("2.9a")
+
+    caps = capabilities.get_capabilities(tmux_bin)
+    assert capabilities.get_capabilities(tmux_bin) is caps
+    assert probes(tmp_path) == 1
+    assert caps.supports("new-session-size")
+    assert not caps.supports("new-window-environment")
+    assert caps.has_lt_version("3.0")
+
+    fake_tmux("3.2a")
+    stat = pathlib.Path(tmux_bin).stat()
+    os.utime(tmux_bin, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    caps = capabilities.get_capabilities(tmux_bin)
+    assert probes(tmp_path) == 2
+    assert caps.supports("attach-flags")
+
+
+def test_persist(
+    fake_tmux: t.Callable[[str], str],
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Persisted probes are read back by later processes."""
+    monkeypatch.setenv("TMUXP_CACHEDIR", str(tmp_path / "cache"))
+    tmux_bin = fake_tmux("3.3a")
+
+    capabilities.get_capabilities(tmux_bin, persist=True)
+    assert (tmp_path / "cache" / capabilities.CACHE_FILE).exists()
+
+    # a new process starts with an empty registry
+    capabilities.clear()
+    caps = capabilities.get_capabilities(tmux_bin, persist=True)
+    assert probes(tmp_path) == 1
+    assert str(caps.version) == "3.3"
+
+
+def test_version_too_low(fake_tmux: t.Callable[[str], str]) -> None:
+    """Tmux older than libtmux supports is reported."""
+    caps = capabilities.get_capabilities(fake_tmux("1.6"))
+
+    with pytest.raises(VersionTooLow):
+        caps.has_minimum_version()
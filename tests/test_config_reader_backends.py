@@ -0,0 +1,118 @@
+"""Tests of the YAML and JSON backends of ConfigReader.
+
+Each available backend parses and writes a large workspace, their results must be
+the same. ``TMUXP_BENCHMARK_WINDOWS`` sets the size of the workspace, e.g.
+``TMUXP_BENCHMARK_WINDOWS=1000``.
+
+With ``TMUXP_BENCHMARK`` set, :func:`test_backends_benchmark` also times the
+backends, run it with ``-s`` to see the timings::
+
+    TMUXP_BENCHMARK=1 pytest -s tests/test_config_reader_backends.py -k benchmark
+"""
+import os
+import time
+import typing as t
+
+import pytest
+
+from tmuxp._internal.config_reader import (
+    JSON_BACKENDS,
+    YAML_BACKENDS,
+    Backend,
+    ConfigReader,
+)
+
+LARGE_WORKSPACE = int(os.environ.get("TMUXP_BENCHMARK_WINDOWS", 60))
+
+
+def workspace(windows: int) -> t.Dict[str, t.Any]:
+    """Return workspace of ``windows`` windows with a few panes each."""
+    return {
+        "session_name": f"backends {windows}",
+        "start_directory": "~/projects",
+        "windows": [
+            {
+                "window_name": f"service {i}",
+                "layout": "main-vertical",
+                "options": {"automatic-rename": False},
+                "panes": [
+                    {"shell_command": [f"cd service-{i}", "make run"]},
+                    {"shell_command": ["tail -f log/*.log"], "focus": True},
+                    "git status",
+                ],
+            }
+            for i in range(windows)
+        ],
+    }
+
+
+@pytest.mark.parametrize(
+    ["format", "backends"],
+    [("yaml", YAML_BACKENDS), ("json", JSON_BACKENDS)],
+)
+def test_backends_roundtrip(
+    format: "t.Literal['json', 'yaml']", backends: t.List[Backend]
+) -> None:
+    """Backends parse and write large workspaces the same."""
+    content = ConfigReader._dump(format, workspace(LARGE_WORKSPACE))
+    expected = workspace(LARGE_WORKSPACE)
+
+    for backend in backends:
+        loaded = backend.load(content)
+        dumped = backend.dump(loaded, 2)
+
+        assert loaded == expected
+        assert backend.load(dumped) == loaded
+
+    assert ConfigReader._load(format, content) == backends[0].load(content)
+
+
+@pytest.mark.parametrize(
+    ["format", "backends"],
+    [("yaml", YAML_BACKENDS), ("json", JSON_BACKENDS)],
+)
+def test_backends_dump_non_ascii(
+    format: "t.Literal['json', 'yaml']", backends: t.List[Backend]
+) -> None:
+    """Backends write workspaces with non-ASCII names the same, byte for byte."""
+    content = {
+        "session_name": "café",
+        "windows": [
+            {"window_name": "naïve 窗口 ☕", "panes": ["echo ünïcode"]},
+            {"window_name": "editor", "panes": [{"sleep_before": 0.5}]},
+        ],
+    }
+
+    # the pure Python backend comes last
+    expected = backends[-1].dump(content, 2)
+    for backend in backends:
+        assert backend.dump(content, 2) == expected
+        assert backend.load(expected) == content
+    assert ConfigReader._dump(format, content) == expected
+
+
+@pytest.mark.skipif(
+    "TMUXP_BENCHMARK" not in os.environ, reason="set TMUXP_BENCHMARK to time backends"
+)
+@pytest.mark.parametrize(
+    ["format", "backends"],
+    [("yaml", YAML_BACKENDS), ("json", JSON_BACKENDS)],
+)
+def test_backends_benchmark(
+    format: "t.Literal['json', 'yaml']", backends: t.List[Backend]
+) -> None:
+    """Fast backends parse and write large workspaces faster than pure Python."""
+    content = ConfigReader._dump(format, workspace(LARGE_WORKSPACE))
+
+    elapsed: t.Dict[str, float] = {}
+    for backend in backends:
+        start = time.perf_counter()
+        backend.dump(backend.load(content), 2)
+        elapsed[backend.name] = time.perf_counter() - start
+        print(
+            f"{format} {backend.name}: {LARGE_WORKSPACE} windows "
+            f"in {elapsed[backend.name]:.3f}s"
+        )
+
+    fastest, pure = backends[0].name, backends[-1].name
+    assert elapsed[fastest] <= elapsed[pure]
@@ -0,0 +1,160 @@
+"""Tests for tmuxp's tmux control mode connection."""
+import typing as t
+
+import pytest
+from libtmux import neo, session as libtmux_session
+from libtmux.server import Server
+from libtmux.session import Session
+
+from tmuxp import control
+from tmuxp._internal.config_reader import ConfigReader
+from tmuxp.control import ControlModeServer
+from tmuxp.workspace import loader
+from tmuxp.workspace.builder import WorkspaceBuilder
+
+from .constants import EXAMPLE_PATH
+
+
+@pytest.fixture
+def control_server(server: Server, session: Session) -> t.Iterator[ControlModeServer]:
+    """Return :class:`ControlModeServer` for the test server."""
+    control_server = ControlModeServer(socket_name=server.socket_name)
+    yield control_server
+    control_server.close()
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "plain",
+        "",
+        "with space",
+        "single ' quote",
+        'double " quote',
+        "$HOME ~ {braces} back\\\\slash",
+        "~/start",
+        "semi;colon",
+        "two\nlines",
+    ],
+)
+def test_control_mode_quoting(control_server: ControlModeServer, value: str) -> None:
+    """Arguments reach tmux unchanged over control mode."""
+    proc = control_server.cmd("set-option", "-g", "@tmuxp_test", value)
+    assert proc.returncode == 0
+    assert proc.stderr == []
+
+    expected = value.split("\n") if value else []
+    assert control_server.cmd("show-options", "-gv", "@tmuxp_test").stdout == expected
+
+
+def test_control_mode_error(control_server: ControlModeServer) -> None:
+    """Failed commands return stderr and stop the rest of a chained line."""
+    proc = control_server.cmd("select-window", "-t", "@999999")
+    assert proc.returncode == 1
+    assert proc.stderr == ["can't find window: @999999"]
+
+    proc = control_server.cmd(
+        "display-message",
+        "-p",
+        "one",
+        ";",
+        "select-window",
+        "-t",
+        "@999999",
+        ";",
+        "display-message",
+        "-p",
+        "three",
+    )
+    assert proc.stdout == ["one"]
+    assert proc.stderr == ["can't find window: @999999"]
+
+    assert control_server.cmd("display-message", "-p", "after").stdout == ["after"]
+
+
+def test_control_mode_single_process(
+    control_server: ControlModeServer,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Commands and object listings don't start tmux processes once connected."""
+    assert control_server.cmd("display-message", "-p", "connect").stdout == ["connect"]
+
+    def no_subprocess(*args: t.Any, **kwargs: t.Any) -> None:
+        pytest.fail(f"tmux process started: {args}")
+
+    with monkeypatch.context() as m:
+        m.setattr(neo, "tmux_cmd", no_subprocess)
+        m.setattr(Server, "cmd", no_subprocess)
+
+        session = control_server.sessions[0]
+        session.cmd("new-window", "-n", "control")
+        window = session.windows.get(window_name="control")
+        assert window is not None
+        window.cmd("split-window")
+        pane = window.panes[1]
+        pane.refresh()
+        window.refresh()
+        assert window.window_panes == "2"
+        assert pane.window == window
+        assert pane.session == session
+        assert [w.window_name for w in session.windows][-1] == "control"
+        assert len(control_server.panes) == len(session.panes) == 3
+
+
+def test_control_mode_build(server: Server) -> None:
+    """WorkspaceBuilder builds over control mode."""
+    workspace = ConfigReader._from_file(EXAMPLE_PATH / "3-pane.yaml")
+    workspace = loader.trickle(loader.expand(workspace))
+
+    control_server = ControlModeServer(socket_name=server.socket_name)
+    builder = WorkspaceBuilder(session_config=workspace, server=control_server)
+    builder.build()
+
+    assert control_server.control.connected
+    assert builder.session is not None
+    assert len(builder.session.windows[0].panes) == 3
+    control_server.close()
+    assert not control_server.control.connected
+
+
+def test_control_mode_scoped(
+    server: Server, session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Other servers list objects with tmux processes, libtmux isn't patched."""
+    control_server = ControlModeServer(socket_name=server.socket_name)
+    assert control_server.sessions[0] == session
+    assert control_server.control.connected
+
+    calls: t.List[t.Tuple[t.Any, ...]] = []
+    control_cmd = control_server.control.cmd
+
+    def record_cmd(*args: t.Any) -> t.Optional[control.ControlModeCmd]:
+        calls.append(args)
+        return control_cmd(*args)
+
+    monkeypatch.setattr(control_server.control, "cmd", record_cmd)
+
+    plain_server = Server(socket_name=server.socket_name)
+    assert plain_server.sessions[0] == session
+    assert session.window_id in [w.window_id for w in plain_server.windows]
+    assert calls == []
+
+    assert vars(libtmux_session)["fetch_objs"] is neo.fetch_objs
+
+    control_server.close()
+    assert not control_server.control.connected
+    assert control_server.sessions[0] == session
+    assert not control_server.control.connected
+
+
+def test_control_mode_objects(control_server: ControlModeServer) -> None:
+    """Objects created through a control mode server stay in control mode."""
+    session = control_server.new_session(session_name="control objects")
+    window = session.new_window(window_name="control")
+    pane = window.split_window()
+
+    assert isinstance(session, control.ControlModeSession)
+    assert isinstance(window, control.ControlModeWindow)
+    assert isinstance(pane, control.ControlModePane)
+    assert isinstance(pane.window.session, control.ControlModeSession)
+    assert pane in window.panes
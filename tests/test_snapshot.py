@@ -0,0 +1,81 @@
+"""Tests for shared snapshots of tmux server state."""
+import pytest
+from libtmux.server import Server
+from libtmux.session import Session
+
+from tmuxp import util
+from tmuxp.snapshot import ServerSnapshot
+from tmuxp.workspace import freezer, loader
+from tmuxp.workspace.builder import WorkspaceBuilder
+
+
+def test_lookups_share_one_query(
+    server: Server, session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Current pane, session, window and pane lookups list the server once."""
+    window = session.new_window(window_name="second")
+    pane = window.split_window()
+    assert pane.pane_id is not None
+    monkeypatch.setenv("TMUX_PANE", pane.pane_id)
+
+    snapshot = ServerSnapshot(server)
+    current_pane = util.get_current_pane(server, snapshot=snapshot)
+    assert current_pane is not None
+
+    found_session = util.get_session(
+        server, current_pane=current_pane, snapshot=snapshot
+    )
+    found_window = util.get_window(
+        found_session, current_pane=current_pane, snapshot=snapshot
+    )
+    found_pane = util.get_pane(
+        found_window, current_pane=current_pane, snapshot=snapshot
+    )
+
+    assert found_session.session_id == session.session_id
+    assert found_window.window_id == window.window_id
+    assert found_pane.pane_id == pane.pane_id
+    assert snapshot.queries == 1
+
+
+def test_snapshot_no_server() -> None:
+    """Snapshots of servers that aren't running are empty."""
+    snapshot = ServerSnapshot(Server(socket_name="tmuxp_test_not_running"))
+
+    assert snapshot.sessions == []
+    assert not snapshot.has_session("any")
+
+
+def test_builder_snapshot(server: Server) -> None:
+    """The builder looks sessions up in the snapshot, and invalidates it."""
+    session_config = loader.trickle(
+        loader.expand(
+            {
+                "session_name": "snapshot",
+                "windows": [{"window_name": "one", "panes": ["echo one"]}],
+            }
+        )
+    )
+    snapshot = ServerSnapshot(server)
+    builder = WorkspaceBuilder(
+        session_config=session_config, server=server, snapshot=snapshot
+    )
+    assert not builder.session_exists("snapshot")
+
+    builder.build()
+
+    assert builder.session_exists("snapshot")
+    assert snapshot.queries == 2
+
+
+def test_freeze_snapshot(session: Session) -> None:
+    """Freezing reads windows and panes from one snapshot."""
+    session.new_window(window_name="second").split_window()
+    snapshot = ServerSnapshot(session.server)
+
+    frozen = freezer.freeze(session, snapshot=snapshot)
+
+    assert [
+        (window["window_name"], len(window["panes"])) for window in frozen["windows"]
+    ] == [(window.window_name, len(window.panes)) for window in session.windows]
+    assert snapshot.queries == 1
@@ -1,10 +1,12 @@
 """Tests for tmuxp's utility functions."""
+import asyncio
+
 import pytest
 from libtmux.server import Server
 
 from tmuxp import exc
 from tmuxp.exc import BeforeLoadScriptError, BeforeLoadScriptNotExists
-from tmuxp.util import get_session, run_before_script
+from tmuxp.util import get_session, run_before_script, run_before_script_async
 
 from .constants import FIXTURE_PATH
 
@@ -79,3 +81,17 @@ def test_get_session_should_return_first_session_if_no_active_session(
     server.new_session(session_name="mysecondsession")
 
     assert get_session(server) == first_session
+
+
+def test_run_before_script_async(capsys: pytest.CaptureFixture[str]) -> None:
+    """run_before_script_async() streams stdout and raises like run_before_script."""
+    asyncio.run(run_before_script_async(FIXTURE_PATH / "script_complete.sh"))
+    out, err = capsys.readouterr()
+    assert "hello" in out
+
+    with pytest.raises(exc.BeforeLoadScriptError) as excinfo:
+        asyncio.run(run_before_script_async(FIXTURE_PATH / "script_failed.sh"))
+    assert excinfo.match(r"113")
+
+    with pytest.raises(BeforeLoadScriptNotExists):
+        asyncio.run(run_before_script_async(FIXTURE_PATH / "script_noexists.sh"))
@@ -0,0 +1,171 @@
+"""Tests for building workspaces with asyncio."""
+import asyncio
+import time
+import typing as t
+
+import pytest
+from libtmux.server import Server
+from libtmux.test import retry_until
+
+from tmuxp import exc
+from tmuxp._internal.config_reader import ConfigReader
+from tmuxp.workspace import loader
+from tmuxp.workspace.async_builder import AsyncWorkspaceBuilder
+from tmuxp.workspace.builder import WorkspaceBuilder
+
+from ..constants import FIXTURE_PATH
+from ..fixtures import utils as test_utils
+
+
+def load_workspace(name: str) -> t.Dict[str, t.Any]:
+    """Return expanded and trickled workspace fixture."""
+    workspace = ConfigReader._from_file(
+        test_utils.get_workspace_file(f"workspace/builder/{name}")
+    )
+    return loader.trickle(loader.expand(workspace))
+
+
+@pytest.mark.parametrize(
+    "workspace_file",
+    [
+        "three_windows.yaml",
+        "window_options.yaml",
+        "layout_spec.yaml",
+        "focus_and_pane.yaml",
+        "window_automatic_rename.yaml",
+    ],
+)
+def test_build_matches_sync_builder(server: Server, workspace_file: str) -> None:
+    """AsyncWorkspaceBuilder creates the same windows and panes, with the same focus."""
+    workspace = load_workspace(workspace_file)
+    builder = WorkspaceBuilder(
+        session_config={**workspace, "session_name": "sync"}, server=server
+    )
+    builder.build()
+
+    async_builder = AsyncWorkspaceBuilder(
+        session_config={**workspace, "session_name": "async"}, server=server
+    )
+    asyncio.run(async_builder.build())
+
+    def windows(session_name: str) -> t.List[str]:
+        return server.cmd(
+            "list-panes",
+            "-s",
+            "-t",
+            session_name,
+            "-F",
+            "#{window_index} #{window_name} #{window_active} #{pane_index} "
+            "#{pane_active} #{pane_width}x#{pane_height},#{pane_left},#{pane_top}",
+        ).stdout
+
+    assert windows("async") == windows("sync")
+    assert async_builder.session.session_name == "async"
+
+
+@pytest.mark.parametrize(
+    ("workspace_file", "feature"),
+    [("lazy_windows.yaml", "lazy windows"), ("paste.yaml", "pasted commands")],
+)
+def test_build_unsupported(server: Server, workspace_file: str, feature: str) -> None:
+    """Features AsyncWorkspaceBuilder can't build raise before creating a session."""
+    builder = AsyncWorkspaceBuilder(
+        session_config=load_workspace(workspace_file), server=server
+    )
+
+    with pytest.raises(exc.UnsupportedWorkspaceFeature, match=feature):
+        asyncio.run(builder.build())
+    assert server.sessions == []
+
+
+def test_build_sends_commands(server: Server) -> None:
+    """Pane commands are sent before build() returns."""
+    workspace = loader.trickle(
+        loader.expand(
+            {
+                "session_name": "async commands",
+                "windows": [
+                    {
+                        "window_name": "w",
+                        "panes": [
+                            {
+                                "shell_command": [
+                                    {"cmd": "echo ___$((40 + 2))___"},
+                                ],
+                                "sleep_before": 0.5,
+                            },
+                            {
+                                "shell_command": [
+                                    {"cmd": "echo ___$((50 + 2))___"},
+                                ],
+                                "sleep_before": 0.5,
+                            },
+                        ],
+                    }
+                ],
+            }
+        )
+    )
+    builder = AsyncWorkspaceBuilder(session_config=workspace, server=server)
+
+    start = time.monotonic()
+    asyncio.run(builder.build())
+    # both panes wait at the same time
+    assert time.monotonic() - start < 0.95
+
+    window = builder.session.windows[0]
+    for pane, expected in zip(window.panes, ["___42___", "___52___"]):
+
+        def output_found(pane: t.Any = pane, expected: str = expected) -> bool:
+            return expected in "\n".join(pane.capture_pane())
+
+        assert retry_until(output_found)
+
+
+def test_build_options(server: Server) -> None:
+    """Session, global and window options are set."""
+    workspace = load_workspace("session_options.yaml")
+    workspace["windows"][0]["options"] = {"main-pane-height": 7}
+    builder = AsyncWorkspaceBuilder(session_config=workspace, server=server)
+    asyncio.run(builder.build())
+
+    session = builder.session
+    for key, value in workspace["options"].items():
+        assert session.show_option(key) == value
+    assert session.windows[0].show_window_option("main-pane-height") == 7
+
+
+def test_build_before_script_fails(server: Server) -> None:
+    """Session is killed when before_script fails."""
+    yaml_workspace = test_utils.read_workspace_file(
+        "workspace/builder/config_script_fails.yaml"
+    ).format(script_failed=FIXTURE_PATH / "script_failed.sh")
+    workspace = loader.trickle(
+        loader.expand(ConfigReader._load(format="yaml", content=yaml_workspace))
+    )
+    builder = AsyncWorkspaceBuilder(session_config=workspace, server=server)
+
+    with pytest.raises(exc.BeforeLoadScriptError):
+        asyncio.run(builder.build())
+
+    assert not server.has_session(workspace["session_name"])
+
+
+def test_build_concurrent_sessions(server: Server) -> None:
+    """Several workspaces can be built on one event loop."""
+    workspace = load_workspace("two_windows.yaml")
+    builders = [
+        AsyncWorkspaceBuilder(
+            session_config={**workspace, "session_name": f"concurrent {i}"},
+            server=server,
+        )
+        for i in range(3)
+    ]
+
+    async def build_all() -> None:
+        await asyncio.gather(*[builder.build() for builder in builders])
+
+    asyncio.run(build_all())
+
+    for builder in builders:
+        assert len(builder.session.windows) == len(workspace["windows"])
@@ -0,0 +1,65 @@
+"""Tests for tmuxp's batched tmux command execution."""
+
+import typing as t
+
+import pytest
+from libtmux.test import retry_until
+
+from tmuxp import exc
+from tmuxp.workspace.batch import CommandBatch
+
+if t.TYPE_CHECKING:
+    from libtmux.session import Session
+
+
+def test_command_batch_single_invocation(session: "Session") -> None:
+    """Queued commands run in one tmux invocation, output returned in order."""
+    batch = CommandBatch(session.server)
+    for i in range(5):
+        batch.add("display-message", "-p", f"line {i}")
+
+    assert len(batch) == 5
+    assert batch.flush() == [f"line {i}" for i in range(5)]
+    assert batch.invocations == 1
+    assert len(batch) == 0
+    assert batch.flush() == []
+    assert batch.invocations == 1
+
+
+def test_command_batch_splits_when_too_large(session: "Session") -> None:
+    """Batches beyond ``max_size`` are sent early, output stays in order."""
+    batch = CommandBatch(session.server, max_size=100)
+    for i in range(10):
+        batch.add("display-message", "-p", f"line {i}")
+
+    assert batch.flush() == [f"line {i}" for i in range(10)]
+    assert batch.invocations > 1
+
+
+def test_command_batch_trailing_semicolon(session: "Session") -> None:
+    """Arguments ending in ``;`` are sent literally, not as command separator."""
+    pane = session.attached_pane
+    assert pane is not None
+
+    batch = CommandBatch(session.server)
+    batch.add("send-keys", "-t", pane.pane_id, "echo ___batch___;", "Enter")
+    batch.add("display-message", "-p", "done")
+    assert batch.flush() == ["done"]
+
+    def f() -> bool:
+        return "echo ___batch___;" in "\n".join(pane.capture_pane())
+
+    assert retry_until(f)
+
+
+def test_command_batch_error(session: "Session") -> None:
+    """Failing batches raise with the tmux error and commands."""
+    batch = CommandBatch(session.server)
+    batch.add("display-message", "-p", "before")
+    batch.add("select-window", "-t", "@999999")
+
+    with pytest.raises(exc.TmuxCommandBatchError) as excinfo:
+        batch.flush()
+
+    assert excinfo.value.commands[1] == ["select-window", "-t", "@999999"]
+    assert len(batch) == 0
@@ -1,7 +1,9 @@
 """Test for tmuxp workspace builder."""
+import concurrent.futures
 import functools
 import os
 import pathlib
+import re
 import textwrap
 import time
 import typing as t
@@ -20,8 +22,19 @@ from libtmux.window import Window
 from tmuxp import exc
 from tmuxp._internal.config_reader import ConfigReader
 from tmuxp.cli.load import load_plugins
-from tmuxp.workspace import loader
-from tmuxp.workspace.builder import WorkspaceBuilder
+from tmuxp.cli.materialize import CLIMaterializeNamespace, command_materialize
+from tmuxp.plugin import TmuxpPlugin
+from tmuxp.workspace import loader, paste, validation
+from tmuxp.workspace.builder import (
+    LAZY_PLUGINS_OPTION,
+    LAZY_WINDOW_HOOK,
+    LAZY_WINDOW_OPTION,
+    WorkspaceBuilder,
+)
+from tmuxp.workspace.events import BuildEvent, EventBus
+from tmuxp.workspace.journal import read_journal
+from tmuxp.workspace.layout import layout_string
+from tmuxp.workspace.planner import BatchedExecutor, ConcurrentExecutor, PlanExecutor
 
 from ..constants import EXAMPLE_PATH, FIXTURE_PATH
 from ..fixtures import utils as test_utils
@@ -1363,6 +1376,154 @@ def test_load_workspace_sleep(
     assert output in captured_pane
 
 
+@pytest.mark.parametrize("batch", [False, True])
+def test_load_workspace_wait_for(server: Server, batch: bool) -> None:
+    """Commands with ``wait_for`` are sent once the pane shows the pattern."""
+    workspace = ConfigReader._from_file(
+        test_utils.get_workspace_file("workspace/builder/wait_for.yaml")
+    )
+    workspace = loader.trickle(loader.expand(workspace))
+
+    builder = WorkspaceBuilder(session_config=workspace, server=server, batch=batch)
+    builder.build()
+
+    pane = builder.session.attached_pane
+    assert pane is not None
+    assert retry_until(lambda: "___5___" in "\n".join(pane.capture_pane()))
+
+    captured = "\n".join(pane.capture_pane())
+    assert captured.index("___4___") < captured.index("___5___")
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_load_workspace_nonblocking_delays(server: Server, batch: bool) -> None:
+    """Pane delays overlap, the build takes as long as the slowest pane."""
+    pane = {"shell_command": [{"cmd": "echo ___$((1 + 3))___", "sleep_before": 0.5}]}
+    workspace = loader.trickle(
+        loader.expand(
+            {
+                "session_name": "nonblocking",
+                "windows": [
+                    {"window_name": "first", "panes": [pane, pane]},
+                    {"window_name": "second", "panes": [pane, pane]},
+                ],
+            }
+        )
+    )
+
+    builder = WorkspaceBuilder(
+        session_config=workspace,
+        server=server,
+        batch=batch,
+        nonblocking_delays=True,
+    )
+    start_time = time.monotonic()
+    builder.build()
+    elapsed = time.monotonic() - start_time
+
+    assert 0.5 <= elapsed < 1.5
+    for window in builder.session.windows:
+        for p in window.panes:
+            assert retry_until(
+                functools.partial(lambda p: "___4___" in "\n".join(p.capture_pane()), p)
+            )
+
+
+def test_load_workspace_two_phase(server: Server) -> None:
+    """Commands are sent once all panes exist, concurrently and in order per pane."""
+    pane = {
+        "shell_command": [
+            {"cmd": "echo ___$(tmux list-panes -s | wc -l)___", "sleep_before": 0.5},
+            "echo ___done___",
+        ]
+    }
+    workspace = loader.trickle(
+        loader.expand(
+            {
+                "session_name": "two phase",
+                "windows": [
+                    {"window_name": "first", "panes": [pane, pane]},
+                    {"window_name": "second", "panes": [pane, pane]},
+                ],
+            }
+        )
+    )
+
+    builder = WorkspaceBuilder(session_config=workspace, server=server, two_phase=True)
+    start_time = time.monotonic()
+    builder.build()
+    elapsed = time.monotonic() - start_time
+
+    assert 0.5 <= elapsed < 1.5
+    for window in builder.session.windows:
+        for p in window.panes:
+            assert retry_until(
+                functools.partial(
+                    lambda p: "___done___" in "\n".join(p.capture_pane()), p
+                )
+            )
+            captured = "\n".join(p.capture_pane())
+            # every pane existed when the first command was sent
+            assert "___4___" in captured
+            assert captured.index("___4___") < captured.rindex("___done___")
+
+
+def test_load_workspace_wait_for_timeout(server: Server) -> None:
+    """Panes that never satisfy ``wait_for`` raise after the timeout."""
+    workspace = ConfigReader._from_file(
+        test_utils.get_workspace_file("workspace/builder/wait_for.yaml")
+    )
+    workspace = loader.trickle(loader.expand(workspace))
+    workspace["windows"][0]["panes"][0]["shell_command"][1]["wait_for"] = {
+        "pattern": "never printed",
+        "timeout": 0.2,
+    }
+
+    builder = WorkspaceBuilder(session_config=workspace, server=server)
+    with pytest.raises(exc.WaitForTimeout):
+        builder.build()
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_layout_spec(server: Server, batch: bool) -> None:
+    """Windows with layout specs get the computed layout."""
+    workspace = ConfigReader._from_file(
+        test_utils.get_workspace_file("workspace/builder/layout_spec.yaml")
+    )
+    workspace = loader.trickle(loader.expand(workspace))
+
+    builder = WorkspaceBuilder(session_config=workspace, server=server, batch=batch)
+    builder.build()
+
+    def geometry(layout: str) -> t.List[str]:
+        return re.findall(r"\d+x\d+,\d+,\d+", layout)
+
+    for window, window_config in zip(builder.session.windows, workspace["windows"]):
+        assert window.window_layout is not None
+        assert window.window_width is not None
+        assert window.window_height is not None
+        expected = layout_string(
+            window_config["layout"],
+            panes=len(window_config["panes"]),
+            width=int(window.window_width),
+            height=int(window.window_height),
+        )
+        assert geometry(window.window_layout) == geometry(expected)
+
+
+def test_layout_spec_invalid(server: Server) -> None:
+    """Layout specs have to match the window's panes."""
+    workspace = ConfigReader._from_file(
+        test_utils.get_workspace_file("workspace/builder/layout_spec.yaml")
+    )
+    workspace = loader.trickle(loader.expand(workspace))
+    workspace["windows"][0]["layout"] = {"grid": [2, 2]}
+
+    builder = WorkspaceBuilder(session_config=workspace, server=server)
+    with pytest.raises(validation.InvalidLayoutValidationError):
+        builder.build()
+
+
 def test_first_pane_start_directory(session: Session, tmp_path: pathlib.Path) -> None:
     """Test the first pane start_directory sticks."""
     yaml_workspace = test_utils.get_workspace_file(
@@ -1529,3 +1690,557 @@ def test_issue_800_default_size_many_windows(
 
     builder.build()
     assert len(server.sessions) == 1
+
+
+def test_build_batched(session: Session) -> None:
+    """Batched builds match the regular build with fewer tmux invocations."""
+    workspace = ConfigReader._from_file(
+        test_utils.get_workspace_file("workspace/builder/focus_and_pane.yaml")
+    )
+    workspace = loader.expand(workspace)
+    workspace = loader.trickle(workspace)
+
+    server = session.server
+    calls: t.List[t.Tuple[t.Any, ...]] = []
+    original_cmd = server.cmd
+
+    def counting_cmd(*args: t.Any, **kwargs: t.Any) -> t.Any:
+        calls.append(args)
+        return original_cmd(*args, **kwargs)
+
+    server.cmd = counting_cmd  # type: ignore
+
+    builder = WorkspaceBuilder(session_config=workspace, server=server)
+    builder.build()
+    unbatched_calls = len(calls)
+    calls.clear()
+
+    workspace["session_name"] = "batched"
+    batched_builder = WorkspaceBuilder(
+        session_config=workspace, server=server, batch=True
+    )
+    batched_builder.build()
+    batched_calls = len(calls)
+
+    assert batched_calls < unbatched_calls
+
+    def summarize(s: Session) -> t.List[t.Tuple[t.Any, ...]]:
+        return [
+            (w.window_name, w.window_active, [p.pane_active for p in w.panes])
+            for w in s.windows
+        ]
+
+    assert summarize(batched_builder.session) == summarize(builder.session)
+    assert batched_builder.session.attached_window.name == "focused window"
+
+    pane = batched_builder.session.attached_window.attached_pane
+    assert pane is not None
+    assert retry_until(lambda: pane.pane_current_path == "/usr")
+
+
+def test_build_batched_window_options(session: Session) -> None:
+    """Batched builds set window options and ``options_after``."""
+    workspace = ConfigReader._from_file(
+        test_utils.get_workspace_file("workspace/builder/window_options_after.yaml")
+    )
+    workspace = loader.expand(workspace)
+    workspace["windows"][0]["options"] = {"main-pane-height": 5}
+
+    builder = WorkspaceBuilder(
+        session_config=workspace, server=session.server, batch=True
+    )
+    builder.build(session=session)
+
+    window = session.attached_window
+    assert window.show_window_option("main-pane-height") == 5
+    assert window.show_window_option("synchronize-panes") == "on"
+
+
+PANE_STATE_FORMAT = " ".join(
+    f"#{{{field}}}"
+    for field in [
+        "window_index",
+        "window_name",
+        "window_active",
+        "pane_index",
+        "pane_active",
+        "pane_left",
+        "pane_top",
+        "pane_width",
+        "pane_height",
+        "pane_current_path",
+        "pane_start_command",
+    ]
+)
+
+
+def session_state(session: Session) -> t.Dict[str, t.Any]:
+    """Return what a build sets up in ``session``, without tmux object ids."""
+    windows = session.cmd("list-windows", "-F", "#{window_id} #{window_index}").stdout
+    return {
+        "panes": session.cmd("list-panes", "-s", "-F", PANE_STATE_FORMAT).stdout,
+        "options": session.cmd("show-options").stdout,
+        "environment": sorted(session.cmd("show-environment").stdout),
+        "window_options": {
+            index: session.cmd("show-window-options", "-t", window_id).stdout
+            for window_id, index in (line.split() for line in windows)
+        },
+    }
+
+
+@pytest.mark.parametrize(
+    "workspace_file",
+    [
+        "focus_and_pane.yaml",
+        "three_windows.yaml",
+        "window_index.yaml",
+        "window_options.yaml",
+        "window_options_after.yaml",
+        "window_shell.yaml",
+        "session_options.yaml",
+        "environment_vars.yaml",
+        "first_pane_start_directory.yaml",
+        "layout_spec.yaml",
+        "exec.yaml",
+        "lazy_windows.yaml",
+        "paste.yaml",
+    ],
+)
+def test_build_batched_same_session(server: Server, workspace_file: str) -> None:
+    """Batched builds set up the same session as the regular build."""
+    workspace = ConfigReader._from_file(
+        test_utils.get_workspace_file(f"workspace/builder/{workspace_file}")
+    )
+    workspace = loader.trickle(loader.expand(workspace))
+
+    builder = WorkspaceBuilder(session_config=workspace, server=server)
+    builder.build()
+
+    batched_workspace = {**workspace, "session_name": "batched"}
+    batched_builder = WorkspaceBuilder(
+        session_config=batched_workspace, server=server, batch=True
+    )
+    batched_builder.build()
+
+    # shells change directories and windows rename themselves as they start
+    retry_until(
+        lambda: session_state(batched_builder.session)
+        == session_state(builder.session),
+        raises=False,
+    )
+    assert session_state(batched_builder.session) == session_state(builder.session)
+
+
+def test_build_batched_unsupported(
+    session: Session, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Batched builds of workspaces plans can't express are built regularly."""
+    workspace = ConfigReader._from_file(
+        test_utils.get_workspace_file("workspace/builder/lazy_windows.yaml")
+    )
+    workspace = loader.trickle(loader.expand(workspace))
+
+    builder = WorkspaceBuilder(
+        session_config=workspace, server=session.server, batch=True
+    )
+    builder.build(session=session)
+
+    assert "BatchedExecutor can't build lazy windows" in caplog.text
+    assert [len(w.panes) for w in session.windows] == [1, 1, 1]
+    assert session.cmd("show-hooks", LAZY_WINDOW_HOOK).stdout
+
+
+def test_lazy_windows(session: Session) -> None:
+    """Lazy windows get their panes when they're first selected."""
+    workspace = ConfigReader._from_file(
+        test_utils.get_workspace_file("workspace/builder/lazy_windows.yaml")
+    )
+    workspace = loader.trickle(loader.expand(workspace))
+    assert [w["lazy"] for w in workspace["windows"]] == [False, True, True]
+
+    builder = WorkspaceBuilder(session_config=workspace, server=session.server)
+    builder.build(session=session)
+
+    first, services, logs = session.windows
+    assert [len(w.panes) for w in session.windows] == [1, 1, 1]
+    assert session.attached_window == first
+    # placeholders don't run the window's shell
+    assert services.panes[0].pane_current_command != "top"
+    assert session.cmd("show-hooks", LAZY_WINDOW_HOOK).stdout
+
+    services.select_window()
+    assert retry_until(lambda: len(services.panes) == 2)
+    assert retry_until(
+        lambda: all(pane.pane_current_command == "top" for pane in services.panes)
+    )
+    assert len(logs.panes) == 1
+    assert services.cmd("show-options", "-wqv", LAZY_WINDOW_OPTION).stdout == []
+
+    # built once
+    first.select_window()
+    services.select_window()
+    assert not builder.materialize_window(services)
+    assert builder.materialize_window(logs)
+    assert len(logs.panes) == 2
+    assert session.cmd("show-hooks", LAZY_WINDOW_HOOK).stdout == []
+
+
+def test_lazy_windows_claimed_once(session: Session) -> None:
+    """Concurrent materializations of a lazy window build its panes once."""
+    workspace = ConfigReader._from_file(
+        test_utils.get_workspace_file("workspace/builder/lazy_windows.yaml")
+    )
+    workspace = loader.trickle(loader.expand(workspace))
+
+    builder = WorkspaceBuilder(session_config=workspace, server=session.server)
+    builder.build(session=session)
+    services = session.windows[1]
+
+    builders = [
+        WorkspaceBuilder(session_config=workspace, server=session.server)
+        for _ in range(4)
+    ]
+    with concurrent.futures.ThreadPoolExecutor(len(builders)) as executor:
+        claimed = list(executor.map(lambda b: b.materialize_window(services), builders))
+
+    assert claimed.count(True) == 1
+    assert len(services.panes) == 2
+
+
+def test_build_sessions_in_threads(
+    server: Server, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Sessions built in parallel (``tmuxp load --jobs``) keep ``$TMUX`` intact."""
+    monkeypatch.setenv("TMUX", "/tmp/tmux-test/default,1,0")
+    running: t.List[str] = []
+    overlapped: t.List[str] = []
+    new_session = Server.new_session
+
+    def exclusive_new_session(
+        self: Server, session_name: str, *args: t.Any, **kwargs: t.Any
+    ) -> Session:
+        if running:
+            overlapped.append(session_name)
+        running.append(session_name)
+        try:
+            time.sleep(0.01)
+            return new_session(self, session_name, *args, **kwargs)
+        finally:
+            running.remove(session_name)
+
+    monkeypatch.setattr(Server, "new_session", exclusive_new_session)
+
+    def build(session_name: str) -> None:
+        workspace = loader.trickle(
+            loader.expand({"session_name": session_name, "windows": [{}]})
+        )
+        WorkspaceBuilder(session_config=workspace, server=server).build()
+
+    names = [f"parallel{i}" for i in range(8)]
+    with concurrent.futures.ThreadPoolExecutor(len(names)) as executor:
+        list(executor.map(build, names))
+
+    assert overlapped == []
+    assert os.environ["TMUX"] == "/tmp/tmux-test/default,1,0"
+    assert all(server.has_session(name) for name in names)
+
+
+FINISHED_WINDOWS: t.List[str] = []
+
+
+class FinishedWindowsPlugin(TmuxpPlugin):
+    """Plugin recording the windows it saw finished."""
+
+    def after_window_finished(self, window: Window) -> None:
+        """Record ``window`` as finished."""
+        assert window.window_id is not None
+        FINISHED_WINDOWS.append(window.window_id)
+
+
+def test_lazy_windows_plugins(session: Session) -> None:
+    """Plugins see lazy windows finished when ``tmuxp materialize`` builds them."""
+    workspace = ConfigReader._from_file(
+        test_utils.get_workspace_file("workspace/builder/lazy_windows.yaml")
+    )
+    workspace = loader.trickle(loader.expand(workspace))
+
+    FINISHED_WINDOWS.clear()
+    builder = WorkspaceBuilder(
+        session_config=workspace,
+        server=session.server,
+        plugins=[FinishedWindowsPlugin()],
+    )
+    builder.build(session=session)
+
+    first, services, logs = session.windows
+    assert [first.window_id] == FINISHED_WINDOWS
+    assert session.cmd("show-options", "-qv", LAZY_PLUGINS_OPTION).stdout
+
+    for window in (services, logs):
+        assert window.window_id is not None
+        args = CLIMaterializeNamespace(
+            window_id=window.window_id,
+            socket_name=session.server.socket_name,
+            socket_path=session.server.socket_path,
+        )
+        command_materialize(args)
+    assert [first.window_id, services.window_id, logs.window_id] == FINISHED_WINDOWS
+    assert session.cmd("show-options", "-qv", LAZY_PLUGINS_OPTION).stdout == []
+
+
+@pytest.mark.parametrize(
+    "executor",
+    [None, BatchedExecutor, ConcurrentExecutor],
+    ids=["builder", "batched", "concurrent"],
+)
+def test_build_events(
+    session: Session, executor: t.Optional[t.Type[PlanExecutor]]
+) -> None:
+    """Subscribers get events for each window, pane, command and layout."""
+    workspace = ConfigReader._from_file(
+        test_utils.get_workspace_file("workspace/builder/two_pane.yaml")
+    )
+    workspace = loader.trickle(loader.expand(workspace))
+
+    events: t.List[BuildEvent] = []
+    bus = EventBus()
+    bus.subscribe(events.append)
+    builder = WorkspaceBuilder(
+        session_config=workspace, server=session.server, events=bus, executor=executor
+    )
+    builder.build(session=session)
+    bus.flush()
+
+    kinds = [event.kind for event in events]
+    assert kinds.count("window_created") == len(workspace["windows"])
+    assert kinds.count("pane_created") == sum(
+        len(window["panes"]) for window in workspace["windows"]
+    )
+    assert kinds.count("command_sent") == sum(
+        len(pane["shell_command"])
+        for window in workspace["windows"]
+        for pane in window["panes"]
+    )
+    assert "layout_applied" in kinds
+    assert kinds[-1] == "build_finished"
+    assert all(event.session_name == session.session_name for event in events)
+
+    timestamps = [event.timestamp for event in events]
+    assert timestamps == sorted(timestamps)
+
+    window_ids = {window.window_id for window in session.windows}
+    assert {
+        event.window_id for event in events if event.kind == "window_created"
+    } == window_ids
+
+
+class ResumeFixture(t.NamedTuple):
+    """Test fixture for resuming builds of each mode."""
+
+    test_id: str
+    builder_kwargs: t.Dict[str, t.Any]
+    #: Windows completed by the failed build, the last one doesn't wait on flaky's
+    #: commands with deferred or non-blocking commands
+    expected_completed: t.List[int]
+
+
+RESUME_FIXTURES = [
+    ResumeFixture("default", {}, [1]),
+    ResumeFixture("batch", {"batch": True}, [1]),
+    ResumeFixture("two-phase", {"two_phase": True}, [1, 3]),
+    ResumeFixture("nonblocking-delays", {"nonblocking_delays": True}, [1, 3]),
+]
+
+
+@pytest.mark.parametrize(
+    list(ResumeFixture._fields),
+    RESUME_FIXTURES,
+    ids=[test.test_id for test in RESUME_FIXTURES],
+)
+def test_resume(
+    server: Server,
+    tmp_path: pathlib.Path,
+    test_id: str,
+    builder_kwargs: t.Dict[str, t.Any],
+    expected_completed: t.List[int],
+) -> None:
+    """A failed build continues from the window that failed."""
+    flag = tmp_path / "ready"
+    workspace = loader.trickle(
+        loader.expand(
+            {
+                "session_name": "resume",
+                "windows": [
+                    {"window_name": "first", "panes": ["echo first"]},
+                    {
+                        "window_name": "flaky",
+                        "panes": [
+                            {
+                                "shell_command": [
+                                    f"test -f {flag} && echo ___$((1 + 1))___",
+                                    {
+                                        "cmd": "echo ___resumed___",
+                                        "wait_for": {
+                                            "pattern": "___2___",
+                                            "timeout": 0.5,
+                                        },
+                                    },
+                                ]
+                            },
+                            "echo second pane",
+                        ],
+                    },
+                    {"window_name": "last", "panes": ["echo last"]},
+                ],
+            }
+        )
+    )
+
+    builder = WorkspaceBuilder(
+        session_config=workspace, server=server, **builder_kwargs
+    )
+    with pytest.raises(exc.WaitForTimeout):
+        builder.build()
+
+    session = builder.session
+    first = session.windows.get(window_name="first")
+    assert first is not None
+    journal = read_journal(session)
+    assert journal is not None
+    assert sorted(journal.completed) == expected_completed
+    flaky = session.windows.get(window_name="flaky")
+    assert flaky is not None
+    assert journal.partial == [flaky.window_id]
+
+    flag.touch()
+    builder = WorkspaceBuilder(
+        session_config=workspace, server=server, **builder_kwargs
+    )
+    assert builder.resume()
+
+    assert [w.window_name for w in session.windows] == ["first", "flaky", "last"]
+    assert session.windows[0].window_id == first.window_id
+    flaky = session.windows.get(window_name="flaky")
+    assert flaky is not None
+    assert len(flaky.panes) == 2
+    assert read_journal(session) is None
+    pane = flaky.panes[0]
+    assert retry_until(lambda: "___resumed___" in "\n".join(pane.capture_pane()))
+
+    assert not builder.resume()
+
+
+def test_reuse_initial_window(server: Server, tmp_path: pathlib.Path) -> None:
+    """The session's initial window becomes the first window, not replaced."""
+    workspace = loader.trickle(
+        loader.expand(
+            {
+                "session_name": "reuse initial window",
+                "windows": [
+                    {
+                        "window_name": "first",
+                        "window_index": 3,
+                        "start_directory": str(tmp_path),
+                        "panes": [{"shell_command": []}],
+                    },
+                    {"window_name": "second", "panes": [{"shell_command": []}]},
+                ],
+            }
+        )
+    )
+
+    builder = WorkspaceBuilder(session_config=workspace, server=server)
+    builder.build()
+
+    first = builder.session.windows.get(window_name="first")
+    second = builder.session.windows.get(window_name="second")
+    assert first is not None
+    assert second is not None
+    assert first.window_index == "3"
+    # no window was created for the first window and killed
+    assert first.window_id is not None
+    assert second.window_id is not None
+    assert int(second.window_id[1:]) == int(first.window_id[1:]) + 1
+
+    pane = first.panes[0]
+
+    def f() -> bool:
+        pane.refresh()
+        return pane.pane_current_path == str(tmp_path)
+
+    assert retry_until(f)
+
+
+def test_exec_panes(session: Session) -> None:
+    """Exec panes run their command as the pane process, without a shell."""
+    workspace = ConfigReader._from_file(
+        test_utils.get_workspace_file("workspace/builder/exec.yaml")
+    )
+    workspace = loader.trickle(loader.expand(workspace))
+
+    builder = WorkspaceBuilder(session_config=workspace, server=session.server)
+    builder.build(session=session)
+
+    sleeping, done, shell = session.windows[0].panes
+
+    def is_sleeping() -> bool:
+        sleeping.refresh()
+        return sleeping.pane_current_command == "sleep"
+
+    assert retry_until(is_sleeping)
+
+    def is_dead() -> bool:
+        proc = done.cmd("display-message", "-p", "#{pane_dead} #{pane_dead_status}")
+        return proc.stdout == ["1 0"]
+
+    # kept open, though the command exited right away
+    assert retry_until(is_dead)
+    assert retry_until(lambda: "___shell___" in "\n".join(shell.capture_pane()))
+    # shell_command_before is only typed into shells
+    assert "___before___" not in "\n".join(sleeping.capture_pane())
+    assert "___before___" in "\n".join(shell.capture_pane())
+
+
+@pytest.mark.parametrize("batch", [False, True], ids=["builder", "batched"])
+def test_paste_commands(
+    session: Session, monkeypatch: pytest.MonkeyPatch, batch: bool
+) -> None:
+    """Panes with ``paste`` get their commands through paste buffers."""
+    workspace = ConfigReader._from_file(
+        test_utils.get_workspace_file("workspace/builder/paste.yaml")
+    )
+    workspace = loader.trickle(loader.expand(workspace))
+    assert workspace["windows"][0]["paste"] is True
+
+    # a chunk per line
+    monkeypatch.setattr(paste, "CHUNK_SIZE", 8)
+    pasted: t.List[t.List[str]] = []
+    paste_commands = paste.paste_commands
+
+    def record_paste(
+        server: Server, pane_id: str, commands: t.List[str], **kwargs: t.Any
+    ) -> None:
+        pasted.append(commands)
+        paste_commands(server, pane_id, commands, **kwargs)
+
+    monkeypatch.setattr(paste, "paste_commands", record_paste)
+
+    builder = WorkspaceBuilder(
+        session_config=workspace, server=session.server, batch=batch
+    )
+    builder.build(session=session)
+
+    # pasted together until the delayed command
+    assert pasted == [
+        [" echo ___$((1 + 1))___", " echo ___$((2 + 2))___"],
+        [" echo ___$((3 + 3))___"],
+    ]
+    pasted_pane, typed_pane = session.windows[0].panes
+
+    def pasted_all() -> bool:
+        output = "\n".join(pasted_pane.capture_pane())
+        return all(marker in output for marker in ["___2___", "___4___", "___6___"])
+
+    assert retry_until(pasted_all)
+    assert retry_until(lambda: "___typed___" in "\n".join(typed_pane.capture_pane()))
+    assert not session.server.cmd("list-buffers").stdout
@@ -0,0 +1,108 @@
+"""Scaling benchmark for building workspaces with many windows.
+
+Counts the tmux commands a build runs, which must grow linearly with the number
+of windows. ``TMUXP_BENCHMARK_WINDOWS`` sets the size of the large workspace,
+e.g. ``TMUXP_BENCHMARK_WINDOWS=1000``.
+"""
+import collections
+import os
+import typing as t
+
+import libtmux.neo
+import libtmux.server
+import pytest
+from libtmux.common import tmux_cmd
+from libtmux.server import Server
+
+from tmuxp.workspace import loader
+from tmuxp.workspace.builder import WorkspaceBuilder
+from tmuxp.workspace.planner import BatchedExecutor, PlanExecutor, SequentialExecutor
+
+SMALL_WORKSPACE = 10
+LARGE_WORKSPACE = int(os.environ.get("TMUXP_BENCHMARK_WINDOWS", 60))
+
+
+class ScalingFixture(t.NamedTuple):
+    """Test fixture for builder scaling."""
+
+    test_id: str
+    executor: t.Optional[t.Type[PlanExecutor]]
+    #: tmux commands per window of one pane
+    queries_per_window: int
+
+
+SCALING_FIXTURES = [
+    # new-window, list-panes (first pane), send-keys (command and Enter)
+    ScalingFixture("default", None, 4),
+    # new-window, send-keys
+    ScalingFixture("sequential", SequentialExecutor, 2),
+    # send-keys of the previous window batched with new-window
+    ScalingFixture("batched", BatchedExecutor, 1),
+]
+
+
+@pytest.fixture
+def tmux_commands(monkeypatch: pytest.MonkeyPatch) -> t.List[str]:
+    """Return list recording each tmux invocation of libtmux, by its first command."""
+    commands: t.List[str] = []
+
+    class RecordingTmuxCmd(tmux_cmd):
+        def __init__(self, *args: t.Any) -> None:
+            commands.append(next(str(arg) for arg in args if str(arg)[0] != "-"))
+            super().__init__(*args)
+
+    monkeypatch.setattr(libtmux.server, "tmux_cmd", RecordingTmuxCmd)
+    monkeypatch.setattr(libtmux.neo, "tmux_cmd", RecordingTmuxCmd)
+    return commands
+
+
+def workspace(windows: int) -> t.Dict[str, t.Any]:
+    """Return workspace of ``windows`` windows with one pane each."""
+    return loader.trickle(
+        loader.expand(
+            {
+                "session_name": f"scaling {windows}",
+                "windows": [
+                    {
+                        "window_name": f"service {i}",
+                        "window_shell": "cat",
+                        "panes": ["echo ready"],
+                    }
+                    for i in range(windows)
+                ],
+            }
+        )
+    )
+
+
+@pytest.mark.parametrize(
+    list(ScalingFixture._fields),
+    SCALING_FIXTURES,
+    ids=[test.test_id for test in SCALING_FIXTURES],
+)
+def test_build_queries_linear(
+    server: Server,
+    tmux_commands: t.List[str],
+    test_id: str,
+    executor: t.Optional[t.Type[PlanExecutor]],
+    queries_per_window: int,
+) -> None:
+    """Building runs a fixed number of tmux commands per window."""
+    queries = {}
+    for windows in [SMALL_WORKSPACE, LARGE_WORKSPACE]:
+        tmux_commands.clear()
+        WorkspaceBuilder(
+            session_config=workspace(windows), server=server, executor=executor
+        ).build()
+        queries[windows] = collections.Counter(tmux_commands)
+
+    added = sum(queries[LARGE_WORKSPACE].values()) - sum(
+        queries[SMALL_WORKSPACE].values()
+    )
+    assert added == queries_per_window * (LARGE_WORKSPACE - SMALL_WORKSPACE)
+
+    # windows are tracked, not listed again for each one
+    assert (
+        queries[LARGE_WORKSPACE]["list-windows"]
+        == (queries[SMALL_WORKSPACE]["list-windows"])
+    )
@@ -0,0 +1,26 @@
+"""Tests for the cache of expanded workspaces."""
+import os
+import pathlib
+import typing as t
+
+import pytest
+
+from tmuxp.workspace import cache
+
+
+def test_load_read_only_cache(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Entries are loaded and kept when their mtime can't be updated."""
+    cache.store("key", {"session_name": "cached", "windows": []}, cache_dir=tmp_path)
+
+    def utime(*args: t.Any, **kwargs: t.Any) -> None:
+        raise PermissionError
+
+    monkeypatch.setattr(os, "utime", utime)
+
+    assert cache.load("key", cache_dir=tmp_path) == {
+        "session_name": "cached",
+        "windows": [],
+    }
+    assert (tmp_path / cache.CACHE_SUBDIR / "key.pickle").exists()
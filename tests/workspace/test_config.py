@@ -6,6 +6,7 @@ import pytest
 
 from tmuxp import exc
 from tmuxp._internal.config_reader import ConfigReader
+from tmuxp.capabilities import Capabilities
 from tmuxp.workspace import loader, validation
 
 from ..constants import EXAMPLE_PATH
@@ -174,6 +175,30 @@ def test_trickle_window_with_no_pane_workspace() -> None:
     }
 
 
+@pytest.mark.parametrize(
+    ("tmux_version", "scope"), [("2.9", "-w"), ("3.0", "-p")], ids=["2.9", "3.0"]
+)
+def test_trickle_exec_remain_on_exit(
+    monkeypatch: pytest.MonkeyPatch, tmux_version: str, scope: str
+) -> None:
+    """remain-on-exit is set for the window of exec panes before tmux 3.0."""
+    monkeypatch.setattr(
+        loader, "get_capabilities", lambda: Capabilities("/usr/bin/tmux", tmux_version)
+    )
+    workspace = loader.trickle(
+        loader.expand(
+            {
+                "session_name": "exec",
+                "windows": [{"panes": [{"exec": "make", "remain_on_exit": True}]}],
+            }
+        )
+    )
+
+    assert workspace["windows"][0]["panes"][0]["shell"] == (
+        f'tmux set-option {scope} -t "$TMUX_PANE" remain-on-exit on; make'
+    )
+
+
 def test_expands_blank_panes(config_fixture: "WorkspaceTestData") -> None:
     """Expand blank config into full form.
 
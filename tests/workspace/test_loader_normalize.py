@@ -0,0 +1,133 @@
+"""Tests of the one pass :func:`tmuxp.workspace.loader.normalize`.
+
+``normalize`` must return the same workspace as :func:`~tmuxp.workspace.loader.expand`
+followed by :func:`~tmuxp.workspace.loader.trickle`. ``TMUXP_BENCHMARK_PANES`` sets
+the number of panes of the large workspace, e.g. ``TMUXP_BENCHMARK_PANES=10000``.
+
+With ``TMUXP_BENCHMARK`` set, :func:`test_normalize_benchmark` also times both, run
+it with ``-s`` to see the timings::
+
+    TMUXP_BENCHMARK=1 pytest -s tests/workspace/test_loader_normalize.py -k benchmark
+"""
+import copy
+import os
+import pathlib
+import time
+import typing as t
+
+import pytest
+
+from tmuxp._internal.config_reader import ConfigReader
+from tmuxp.workspace import loader
+
+from ..constants import EXAMPLE_PATH, FIXTURE_PATH
+
+LARGE_WORKSPACE = int(os.environ.get("TMUXP_BENCHMARK_PANES", 1000))
+
+WORKSPACE_FILES = sorted(
+    [
+        *EXAMPLE_PATH.glob("*.yaml"),
+        *EXAMPLE_PATH.glob("*.json"),
+        *(FIXTURE_PATH / "workspace").glob("**/*.yaml"),
+    ]
+)
+
+
+def two_passes(
+    workspace: t.Dict[str, t.Any], cwd: t.Union[pathlib.Path, str]
+) -> t.Dict[str, t.Any]:
+    """Return workspace expanded, then trickled."""
+    return loader.trickle(loader.expand(workspace, cwd=cwd))
+
+
+@pytest.mark.parametrize(
+    "workspace_file",
+    WORKSPACE_FILES,
+    ids=[str(path.relative_to(path.parents[1])) for path in WORKSPACE_FILES],
+)
+def test_normalize_workspace_files(workspace_file: pathlib.Path) -> None:
+    """normalize() returns the same as expand() and trickle() for every file."""
+    raw_workspace = ConfigReader._from_file(workspace_file)
+    if not isinstance(raw_workspace, dict):
+        pytest.skip("not a workspace")
+
+    try:
+        expected = two_passes(copy.deepcopy(raw_workspace), workspace_file.parent)
+    except Exception as e:
+        with pytest.raises(type(e)):
+            loader.normalize(copy.deepcopy(raw_workspace), cwd=workspace_file.parent)
+        return
+
+    normalized = loader.normalize(
+        copy.deepcopy(raw_workspace), cwd=workspace_file.parent
+    )
+    assert normalized == expected
+
+
+def large_workspace(panes: int) -> t.Dict[str, t.Any]:
+    """Return workspace of ``panes`` panes, in windows of four panes."""
+    return {
+        "session_name": "normalize ${USER}",
+        "start_directory": "./",
+        "environment": {"PROJECT_ROOT": "./"},
+        "shell_command_before": ["source ~/.venv/bin/activate", "cd $HOME"],
+        "windows": [
+            {
+                "window_name": f"service {window}",
+                "start_directory": "./services",
+                "shell_command_before": "export SERVICE=$USER",
+                "panes": [
+                    "make run",
+                    {"shell_command": ["tail -f ~/log/app.log"], "focus": True},
+                    {
+                        "start_directory": "./logs",
+                        "shell_command_before": ["cd ~/logs"],
+                        "shell_command": "less +F app.log",
+                    },
+                    None,
+                ][: min(4, panes - window * 4)],
+            }
+            for window in range((panes + 3) // 4)
+        ],
+    }
+
+
+def test_normalize_large_workspace(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """normalize() matches expand() and trickle() on a large workspace."""
+    monkeypatch.chdir(tmp_path)
+    workspace = large_workspace(LARGE_WORKSPACE)
+
+    expected = two_passes(copy.deepcopy(workspace), tmp_path)
+    normalized = loader.normalize(copy.deepcopy(workspace), cwd=tmp_path)
+
+    assert normalized == expected
+    assert (
+        sum(len(window["panes"]) for window in normalized["windows"]) == LARGE_WORKSPACE
+    )
+
+
+@pytest.mark.skipif(
+    "TMUXP_BENCHMARK" not in os.environ, reason="set TMUXP_BENCHMARK to time normalize"
+)
+def test_normalize_benchmark(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """normalize() is faster than expand() and trickle() on a large workspace."""
+    monkeypatch.chdir(tmp_path)
+    workspace = large_workspace(LARGE_WORKSPACE)
+
+    start = time.perf_counter()
+    two_passes(copy.deepcopy(workspace), tmp_path)
+    two_passes_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    loader.normalize(copy.deepcopy(workspace), cwd=tmp_path)
+    normalize_elapsed = time.perf_counter() - start
+
+    print(
+        f"{LARGE_WORKSPACE} panes: expand and trickle {two_passes_elapsed:.3f}s, "
+        f"normalize {normalize_elapsed:.3f}s"
+    )
+    assert normalize_elapsed <= two_passes_elapsed
@@ -0,0 +1,156 @@
+"""Tests for tmuxp build plans and plan executors."""
+import logging
+import typing as t
+
+import pytest
+from libtmux.server import Server
+from libtmux.session import Session
+from libtmux.test import retry_until
+from libtmux.window import Window
+
+from tmuxp._internal.config_reader import ConfigReader
+from tmuxp.workspace import loader
+from tmuxp.workspace.builder import WorkspaceBuilder
+from tmuxp.workspace.planner import (
+    BatchedExecutor,
+    ConcurrentExecutor,
+    PlanExecutor,
+    SequentialExecutor,
+    compile_workspace,
+)
+
+from ..fixtures import utils as test_utils
+
+
+def load_workspace(name: str) -> t.Dict[str, t.Any]:
+    """Return expanded and trickled workspace fixture."""
+    workspace = ConfigReader._from_file(
+        test_utils.get_workspace_file(f"workspace/builder/{name}")
+    )
+    return loader.trickle(loader.expand(workspace))
+
+
+def test_compile_workspace() -> None:
+    """Plans contain one operation per tmux command, without redundant ones."""
+    plan = compile_workspace(load_workspace("focus_and_pane.yaml"))
+    lines = str(plan).splitlines()
+
+    assert lines[0] == "move-window -s {window 0} -t {session}:99"
+    assert [line.split()[0] for line in lines].count("new-window") == 3
+    assert [line.split()[0] for line in lines].count("split-window") == 6
+    assert lines.count("select-pane -t {window 1 pane 1}") == 1
+    assert lines[-1] == "select-window -t {window 1}"
+    assert [op.window for op in plan if op.creates] == [1, 2, 3]
+
+
+def test_compile_workspace_existing_session() -> None:
+    """Plans for existing sessions keep their windows."""
+    plan = compile_workspace(
+        load_workspace("focus_and_pane.yaml"), replace_first_window=False
+    )
+
+    assert not [op for op in plan if op.cmd in ["move-window", "kill-window"]]
+
+
+def test_compile_workspace_no_environment(caplog: pytest.LogCaptureFixture) -> None:
+    """Environment is left out, with a warning, if tmux doesn't support it."""
+    workspace = load_workspace("environment_vars.yaml")
+
+    with caplog.at_level(logging.WARNING):
+        plan = compile_workspace(workspace, environment=False)
+
+    assert not [arg for op in plan for arg in op.args if str(arg).startswith("-e")]
+    assert "You need tmux 3.0 or newer for this." in caplog.text
+
+
+def test_compile_workspace_wait_for() -> None:
+    """Pane conditions apply to the first command, command conditions to theirs."""
+    plan = compile_workspace(load_workspace("wait_for.yaml"))
+    lines = [line for line in str(plan).splitlines() if line.startswith("wait")]
+
+    assert lines == [
+        "wait {window 1 pane 0} prompt=True",
+        "wait {window 1 pane 0} pattern=___4___",
+    ]
+
+
+def test_compile_workspace_exec() -> None:
+    """Exec commands are the processes of their panes."""
+    plan = compile_workspace(load_workspace("exec.yaml"))
+    lines = str(plan).splitlines()
+
+    assert "new-window -d -n exec -t {session}: 'sleep 30' -> {window 1}" in lines
+    assert (
+        'split-window -t {window 1 pane 0} -v \'tmux set-option -p -t "$TMUX_PANE" '
+        "remain-on-exit on; echo ___done___'"
+    ) in lines
+    assert [line for line in lines if line.startswith("send-keys")] == [
+        "send-keys -t {window 1 pane 2} ' echo ___before___' Enter",
+        "send-keys -t {window 1 pane 2} ' echo ___shell___' Enter",
+    ]
+
+
+def test_compile_workspace_layout_spec() -> None:
+    """Layout specs size the splits and are applied once per window."""
+    plan = compile_workspace(load_workspace("layout_spec.yaml"))
+    lines = str(plan).splitlines()
+
+    assert not [line for line in lines if line.startswith("select-layout")]
+    assert [line for line in lines if line.startswith("layout")] == [
+        "layout {window 1} grid=2,3",
+        "layout {window 2} main=left size=60",
+    ]
+    assert "split-window -t {window 1 pane 0} -v -p 83" in lines
+
+
+@pytest.mark.parametrize(
+    "executor",
+    [SequentialExecutor, BatchedExecutor, ConcurrentExecutor],
+)
+def test_plan_executor(server: Server, executor: t.Type[PlanExecutor]) -> None:
+    """Executors build the same session as the regular build."""
+    workspace = load_workspace("focus_and_pane.yaml")
+
+    builder = WorkspaceBuilder(session_config=workspace, server=server)
+    builder.build()
+
+    workspace["session_name"] = "planned"
+    planned_builder = WorkspaceBuilder(
+        session_config=workspace, server=server, executor=executor
+    )
+    planned_builder.build()
+
+    def summarize(s: Session) -> t.List[t.Tuple[t.Any, ...]]:
+        return [
+            (w.window_index, w.window_name, w.window_active, len(w.panes))
+            for w in s.windows
+        ]
+
+    assert summarize(planned_builder.session) == summarize(builder.session)
+
+    window = planned_builder.session.attached_window
+    assert window.name == "focused window"
+    pane = window.attached_pane
+    assert pane is not None
+    assert retry_until(lambda: pane.pane_current_path == "/usr")
+
+
+def test_plan_executor_hooks(session: Session) -> None:
+    """Plugin hooks run with the created windows, in plan order."""
+    workspace = load_workspace("two_pane.yaml")
+    calls: t.List[t.Tuple[str, t.Optional[str]]] = []
+
+    def hook(name: str, window: Window) -> None:
+        calls.append((name, window.window_name))
+
+    plan = compile_workspace(workspace, replace_first_window=False)
+    BatchedExecutor(session=session, hook=hook).run(plan)
+
+    assert calls == [
+        ("on_window_create", "editor"),
+        ("after_window_finished", "editor"),
+        ("on_window_create", "logging"),
+        ("after_window_finished", "logging"),
+        ("on_window_create", "test"),
+        ("after_window_finished", "test"),
+    ]
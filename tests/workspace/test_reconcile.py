@@ -0,0 +1,151 @@
+"""Tests for syncing running sessions with their workspace."""
+import pathlib
+import typing as t
+
+import pytest
+from libtmux import exc as libtmux_exc
+from libtmux.server import Server
+from libtmux.test import retry_until
+
+from tmuxp._internal.config_reader import ConfigReader
+from tmuxp.workspace import loader
+from tmuxp.workspace.builder import WorkspaceBuilder
+from tmuxp.workspace.reconcile import apply_environment, apply_options, compile_sync
+
+from ..fixtures import utils as test_utils
+
+
+def load_workspace(name: str) -> t.Dict[str, t.Any]:
+    """Return expanded and trickled workspace fixture."""
+    workspace = ConfigReader._from_file(
+        test_utils.get_workspace_file(f"workspace/builder/{name}")
+    )
+    return loader.trickle(loader.expand(workspace))
+
+
+def test_compile_sync_unchanged(server: Server) -> None:
+    """Sessions matching their workspace need no changes."""
+    workspace = load_workspace("window_options.yaml")
+    builder = WorkspaceBuilder(session_config=workspace, server=server)
+    builder.build()
+
+    plan, windows = compile_sync(builder.session, workspace)
+
+    assert list(plan) == []
+    assert [window.window_name for window in windows.values()] == ["editor"]
+
+
+@pytest.mark.parametrize("batch", [False, True])
+def test_sync(server: Server, batch: bool) -> None:
+    """Missing windows and panes are created, changed options set."""
+    workspace = load_workspace("two_pane.yaml")
+    builder = WorkspaceBuilder(session_config=workspace, server=server)
+    builder.build()
+    session = builder.session
+    editor = session.windows.get(window_name="editor")
+    assert editor is not None
+    pane_ids = [pane.pane_id for pane in editor.panes]
+
+    workspace = load_workspace("two_pane.yaml")
+    workspace["options"] = {"display-time": 1234}
+    workspace["windows"][0]["options"] = {"main-pane-width": 30}
+    workspace["windows"][0]["panes"].append(
+        {"shell_command": [{"cmd": "echo ___$((40 + 2))___"}]}
+    )
+    workspace["windows"].append(
+        {"window_name": "added", "panes": [{"shell_command": []}]}
+    )
+
+    changes = WorkspaceBuilder(
+        session_config=workspace, server=server, batch=batch
+    ).sync(session)
+
+    assert [op.cmd for op in changes if op.kind == "tmux"].count("new-window") == 1
+    assert session.show_option("display-time") == 1234
+    assert editor.show_window_option("main-pane-width") == 30
+    assert [window.window_name for window in session.windows] == [
+        "editor",
+        "logging",
+        "test",
+        "added",
+    ]
+
+    panes = editor.panes
+    assert [pane.pane_id for pane in panes[:2]] == pane_ids
+    assert len(panes) == 3
+    assert retry_until(lambda: "___42___" in "\n".join(panes[2].capture_pane()))
+
+    plan, _ = compile_sync(session, workspace)
+    assert list(plan) == []
+
+
+def test_sync_start_directory(
+    server: Server, tmp_path: pathlib.Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Panes left in another directory than their start_directory are reported."""
+    before, after = tmp_path / "before", tmp_path / "after"
+    before.mkdir()
+    after.mkdir()
+
+    def workspace(start_directory: pathlib.Path) -> t.Dict[str, t.Any]:
+        return loader.trickle(
+            loader.expand(
+                {
+                    "session_name": "start directory",
+                    "start_directory": str(start_directory),
+                    "windows": [{"window_name": "dir", "panes": [{}, {}]}],
+                }
+            )
+        )
+
+    builder = WorkspaceBuilder(session_config=workspace(before), server=server)
+    builder.build()
+
+    plan, _ = compile_sync(builder.session, workspace(before))
+    assert list(plan) == []
+    assert "sync:" not in caplog.text
+
+    plan, _ = compile_sync(builder.session, workspace(after))
+    assert list(plan) == []
+    assert caplog.text.count(f"not {after}; leaving it there") == 2
+
+
+def test_apply_options(server: Server) -> None:
+    """Only changed options are set, in one tmux invocation."""
+    session = server.new_session(session_name="apply options")
+    assert session.session_id is not None
+    show = ["show-options", "-t", session.session_id]
+    set_ = ["set-option", "-t", session.session_id]
+    session.set_option("display-time", 1500)
+
+    commands: t.List[t.Tuple[str, ...]] = []
+    original_cmd = server.cmd
+
+    def cmd(*args: t.Any, **kwargs: t.Any) -> t.Any:
+        commands.append(args)
+        return original_cmd(*args, **kwargs)
+
+    server.cmd = cmd  # type:ignore
+
+    options = {"display-time": 1500, "mouse": True, "status-left": "tmuxp"}
+    assert apply_options(server, options, show, set_) == 2
+    assert [args[0] for args in commands] == ["show-options", "set-option"]
+    assert session.show_option("mouse") == "on"
+    assert session.show_option("status-left") == "tmuxp"
+
+    assert apply_options(server, options, show, set_) == 0
+
+    with pytest.raises(libtmux_exc.OptionError):
+        apply_options(server, {"no-such-option": 1}, show, set_)
+
+
+def test_apply_environment(server: Server) -> None:
+    """Only changed environment variables are set."""
+    session = server.new_session(session_name="apply environment")
+    assert session.session_id is not None
+
+    environment = {"FOO": "bar", "BAZ": 1}
+    assert apply_environment(server, session.session_id, environment) == 2
+    assert session.getenv("FOO") == "bar"
+    assert session.getenv("BAZ") == "1"
+    assert apply_environment(server, session.session_id, environment) == 0